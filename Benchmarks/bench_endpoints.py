@@ -0,0 +1,204 @@
+import contextlib
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from harness import bench, client, lifecycle, teardown
+from harness.bench import benchmark
+
+API_URL = client.API_URL
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+# Helpers (untimed setup and cleanup)
+
+# Everything a benchmark creates is registered here and deleted after each call,
+# also when an assert fails, so the collections keep their size between calls
+cleanup = teardown.TeardownRegistry(API_URL)
+
+@contextlib.contextmanager
+def cleaned_up():
+    try:
+        yield
+    finally:
+        cleanup.flush(wait=True)
+
+def created(kind, response):
+    """Register the entity a POST created (if it did) for cleanup."""
+    if response.status_code == 201:
+        cleanup.defer(kind, response.json()["id"])
+
+def create_project(title="Bench Project", description="Bench Description"):
+    response = client.post(API_URL + "/projects", json={"title": title, "description": description})
+    created("projects", response)
+    assert response.status_code == 201, "Failed to create project"
+    return response.json()["id"]
+
+def create_todo(title="Bench Todo", description="Bench Description"):
+    response = client.post(API_URL + "/todos", json={"title": title, "description": description})
+    created("todos", response)
+    assert response.status_code == 201, "Failed to create todo"
+    return response.json()["id"]
+
+
+#### PROJECTS ####
+
+@benchmark("POST /projects")
+def bench_post_projects(timer):
+    with cleaned_up():
+        with timer:
+            response = client.post(API_URL + "/projects", json={"title": "Bench Project", "description": "Bench"})
+        created("projects", response)
+        assert response.status_code == 201, "POST /projects failed"
+
+@benchmark("GET /projects")
+def bench_get_projects(timer):
+    with timer:
+        response = client.get(API_URL + "/projects")
+    assert response.status_code == 200, "GET /projects failed"
+
+@benchmark("GET /projects/:id")
+def bench_get_projects_id(timer):
+    with cleaned_up():
+        project_id = create_project()
+        with timer:
+            response = client.get(API_URL + f"/projects/{project_id}")
+        assert response.status_code == 200, f"GET /projects/{project_id} failed"
+
+@benchmark("PUT /projects/:id")
+def bench_put_projects_id(timer):
+    with cleaned_up():
+        project_id = create_project()
+        with timer:
+            response = client.put(API_URL + f"/projects/{project_id}",
+                                  json={"title": "Updated Project", "description": "Updated description"})
+        assert response.status_code in [200, 204], f"PUT /projects/{project_id} failed"
+
+@benchmark("POST /projects/:id")
+def bench_post_projects_id(timer):
+    with cleaned_up():
+        project_id = create_project()
+        with timer:
+            response = client.post(API_URL + f"/projects/{project_id}", json={"title": "Modified Project Title"})
+        assert response.status_code in [200, 204], f"POST /projects/{project_id} failed"
+
+@benchmark("DELETE /projects/:id")
+def bench_delete_projects_id(timer):
+    with cleaned_up():
+        project_id = create_project()
+        with timer:
+            response = client.delete(API_URL + f"/projects/{project_id}")
+        assert response.status_code in [200, 204], f"DELETE /projects/{project_id} failed"
+
+
+#### TODOS ####
+
+@benchmark("POST /todos")
+def bench_post_todos(timer):
+    with cleaned_up():
+        with timer:
+            response = client.post(API_URL + "/todos", json={"title": "Bench Todo", "description": "Bench"})
+        created("todos", response)
+        assert response.status_code == 201, "POST /todos failed"
+
+@benchmark("GET /todos?title=")
+def bench_get_todos_with_query(timer):
+    with timer:
+        response = client.get(API_URL + "/todos?title=Test Todo")
+    assert response.status_code == 200, "GET /todos?title= failed"
+
+@benchmark("GET /todos/:id")
+def bench_get_todos_id(timer):
+    with cleaned_up():
+        todo_id = create_todo()
+        with timer:
+            response = client.get(API_URL + f"/todos/{todo_id}")
+        assert response.status_code == 200, f"GET /todos/{todo_id} failed"
+
+
+#### RELATIONSHIPS ####
+
+@benchmark("POST /projects/:id/tasks")
+def bench_post_projects_id_tasks(timer):
+    with cleaned_up():
+        project_id = create_project()
+        with timer:
+            response = client.post(API_URL + f"/projects/{project_id}/tasks",
+                                   json={"title": "Bench Task", "description": "Task description"})
+        created("todos", response)
+        assert response.status_code == 201, f"POST /projects/{project_id}/tasks failed"
+
+@benchmark("GET /projects/:id/tasks")
+def bench_get_projects_id_tasks(timer):
+    with cleaned_up():
+        project_id = create_project()
+        with timer:
+            response = client.get(API_URL + f"/projects/{project_id}/tasks")
+        assert response.status_code == 200, f"GET /projects/{project_id}/tasks failed"
+
+@benchmark("DELETE /projects/:id/tasks/:id")
+def bench_delete_projects_id_tasks_id(timer):
+    with cleaned_up():
+        project_id = create_project()
+        todo_id = create_todo()
+        link = client.post(API_URL + f"/projects/{project_id}/tasks", json={"id": todo_id})
+        assert link.status_code == 201, "Failed to link task to project"
+        with timer:
+            response = client.delete(API_URL + f"/projects/{project_id}/tasks/{todo_id}")
+        assert response.status_code in [200, 204], f"DELETE /projects/{project_id}/tasks/{todo_id} failed"
+
+@benchmark("POST /projects/:id/categories")
+def bench_post_projects_id_categories(timer):
+    with cleaned_up():
+        project_id = create_project()
+        with timer:
+            response = client.post(API_URL + f"/projects/{project_id}/categories",
+                                   json={"title": "Bench Category", "description": "Category description"})
+        created("categories", response)
+        assert response.status_code == 201, f"POST /projects/{project_id}/categories failed"
+
+@benchmark("GET /projects/:id/categories")
+def bench_get_projects_id_categories(timer):
+    with cleaned_up():
+        project_id = create_project()
+        with timer:
+            response = client.get(API_URL + f"/projects/{project_id}/categories")
+        assert response.status_code == 200, f"GET /projects/{project_id}/categories failed"
+
+@benchmark("POST /todos/:id/tasksof")
+def bench_post_todos_id_tasksof(timer):
+    with cleaned_up():
+        todo_id = create_todo()
+        project_id = create_project()
+        with timer:
+            response = client.post(API_URL + f"/todos/{todo_id}/tasksof", json={"id": project_id})
+        assert response.status_code == 201, f"POST /todos/{todo_id}/tasksof failed"
+
+@benchmark("GET /todos/:id/tasksof")
+def bench_get_todos_id_tasksof(timer):
+    with cleaned_up():
+        todo_id = create_todo()
+        with timer:
+            response = client.get(API_URL + f"/todos/{todo_id}/tasksof")
+        assert response.status_code == 200, f"GET /todos/{todo_id}/tasksof failed"
+
+@benchmark("GET /todos/:id/categories")
+def bench_get_todos_id_categories(timer):
+    with cleaned_up():
+        todo_id = create_todo()
+        with timer:
+            response = client.get(API_URL + f"/todos/{todo_id}/categories")
+        assert response.status_code == 200, f"GET /todos/{todo_id}/categories failed"
+
+
+if __name__ == "__main__":
+    try:
+        lifecycle.session_server()
+    except AssertionError as e:
+        print(f"System not ready: {e}")
+        sys.exit(2)
+    try:
+        status = bench.main(globals(), BASELINE)
+    finally:
+        cleanup.finish()
+    print(cleanup.report())
+    sys.exit(status)
@@ -0,0 +1,23 @@
+import pytest
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from harness import cassette, contract, lifecycle
+
+# Route x method status contract (see harness/contract.py for the matrix)
+
+def test_contract_matrix():
+    """Every route x method pair in contract.MATRIX returns its expected status"""
+    if cassette.replaying():
+        pytest.skip("The contract matrix sends its requests directly, not through a cassette")
+    lifecycle.session_server()
+    outcomes = contract.check()
+    print(contract.format_grid(outcomes))
+    failed = contract.failures(outcomes)
+    assert not failed, f"{len(failed)} contract violations: {failed}\n{contract.format_grid(outcomes)}"
+
+
+if __name__ == "__main__":
+    lifecycle.session_server()
+    sys.exit(contract.main())
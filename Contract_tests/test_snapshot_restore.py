@@ -0,0 +1,58 @@
+import pytest
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from harness import cassette, client, lifecycle, snapshot, teardown
+
+# Snapshot restore after bulk deletes sent through harness.aio (see harness/snapshot.py)
+
+SEED_TITLE = "Snapshot sweep project"
+
+
+def graph(captured):
+    """Entities and links of a snapshot, with the links as one set."""
+    return captured.entities, set().union(*captured.links.values())
+
+
+def seed_project():
+    # A project with a task, so the sweep has a project and a link to bring back
+    response = client.post(client.API_URL + "/projects", json={"title": SEED_TITLE})
+    assert response.status_code == 201, "Failed to create project"
+    response = client.post(client.API_URL + f"/projects/{response.json()['id']}/tasks",
+                           json={"title": SEED_TITLE})
+    assert response.status_code == 201, "Failed to create the project's task"
+
+
+def cleanup_seeded():
+    # The restore recreated the seeded project under a new id; its task kept its id
+    for (kind, entity_id), fields in snapshot.current.entities.items():
+        if kind in ("projects", "todos") and fields.get("title") == SEED_TITLE:
+            teardown.defer(kind, entity_id)
+
+
+def test_restore_after_sweep():
+    """Projects deleted by teardown.sweep come back, with their task links, on a plain restore"""
+    if cassette.replaying():
+        pytest.skip("Restoring needs a server, not a cassette")
+    lifecycle.session_server()
+    saved = snapshot.current, snapshot.tracker
+    try:
+        if snapshot.current is None:
+            seed_project()
+            snapshot.capture(client.API_URL)
+        else:
+            snapshot.restore()  # start from the session's snapshot
+        projects = [key for key in snapshot.current.entities if key[0] == "projects"]
+        assert projects, "the snapshot has no projects to delete"
+
+        teardown.sweep("projects")
+        assert client.get(client.API_URL + "/projects").json()["projects"] == []
+
+        result = snapshot.restore()
+        assert result.recreated == len(projects)
+        assert graph(snapshot.Snapshot.capture(client.API_URL)) == graph(snapshot.current)
+    finally:
+        if saved[0] is None and snapshot.current is not None:
+            cleanup_seeded()
+        snapshot.current, snapshot.tracker = saved
@@ -1,36 +1,34 @@
 
-import pytest
-import requests
-import random
+import os
 import sys
 
-API_URL = "http://localhost:4567"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from harness import client, runner, teardown
 
-# Documented Capabilities Tests
+API_URL = client.API_URL
 
-def ensure_system_ready():
-    try:
-        response = requests.get(API_URL)
-        assert response.status_code == 200, "API is not active"
-    except requests.exceptions.ConnectionError:
-        raise AssertionError("API is not active or could not connect")
+# Documented Capabilities Tests
 
 # Create a project
 def create_project(title="Default Project", description="Default Description"):
     data = {"title": title, "description": description}
-    response = requests.post(API_URL + "/projects", json=data)
+    response = client.post(API_URL + "/projects", json=data)
     assert response.status_code == 201, "Failed to create project"
     return response.json()["id"]
 
 # delete a project
 def delete_project(project_id):
-    response = requests.delete(API_URL + f"/projects/{project_id}")
+    response = client.delete(API_URL + f"/projects/{project_id}")
     assert response.status_code in [200, 204], f"DELETE /projects/{project_id} failed"
 
+# Queue a project for deletion at the end of the module instead of deleting it inline
+def cleanup_project(project_id):
+    teardown.defer("projects", project_id)
+
 # Helper function for creating a category for a project
 def create_category_for_project(project_id, title="Default Category", description="Default Description"):
     category_data = {"title": title, "description": description}
-    response = requests.post(API_URL + f"/projects/{project_id}/categories", json=category_data)
+    response = client.post(API_URL + f"/projects/{project_id}/categories", json=category_data)
     assert response.status_code == 201, "Failed to create category linked to the project"
     return response.json()["id"]
 
@@ -43,57 +41,23 @@ def test_delete_projects_id_categories_id():
     
     # Create category
     category_data = {"title": "Category to Delete", "description": "Category to be removed"}
-    category_response = requests.post(API_URL + "/categories", json=category_data)
+    category_response = client.post(API_URL + "/categories", json=category_data)
     assert category_response.status_code == 201, "Failed to create category for deletion"
     category_id = category_response.json()["id"]
 
     # Associate category with project
-    link_response = requests.post(API_URL + f"/projects/{project_id}/categories", json={"id": category_id})
+    link_response = client.post(API_URL + f"/projects/{project_id}/categories", json={"id": category_id})
     assert link_response.status_code == 201, "Failed to associate category with project"
 
     # Attempt to delete the category from the project
-    response = requests.delete(API_URL + f"/projects/{project_id}/categories/{category_id}")
+    response = client.delete(API_URL + f"/projects/{project_id}/categories/{category_id}")
     assert response.status_code in [200, 204], f"DELETE /projects/{project_id}/categories/{category_id} failed"
 
     # Cleanup
-    delete_project(project_id)
-
-def test_delete_projects_id_categories_id_fail():
-    """Test deleting a non-existent category under a project using DELETE /projects/:id/categories/:id (should return 404)"""
-    response = requests.delete(API_URL + "/projects/99999/categories/99999")
-    assert response.status_code == 404, "Expected 404 when deleting a non-existent category"
-
-### Testing Unsupported HTTP Methods for /projects/:id/categories/:id ###
-
-def test_get_projects_id_categories_id():
-    """Test GET /projects/:id/categories/:id (should return 404)"""
-    response = requests.get(API_URL + "/projects/99999/categories/99999")
-    assert response.status_code == 404, "Expected 404 when retrieving a non-existent category"
+    cleanup_project(project_id)
 
-def test_put_projects_id_categories_id():
-    """Test PUT /projects/:id/categories/:id (should return 405)"""
-    response = requests.put(API_URL + "/projects/99999/categories/99999", json={"title": "Updated Category"})
-    assert response.status_code == 405, "Expected 405 Method Not Allowed for PUT on categories/:id"
 
-def test_post_projects_id_categories_id():
-    """Test POST /projects/:id/categories/:id (should return 404)"""
-    response = requests.post(API_URL + "/projects/99999/categories/99999")
-    assert response.status_code == 404, "Expected 404 when posting to a non-existent category"
-
-def test_options_projects_id_categories_id():
-    """Test OPTIONS /projects/:id/categories/:id (should return 200 OK)"""
-    response = requests.options(API_URL + "/projects/1/categories/1")
-    assert response.status_code in [200, 204], "Expected 200 or 204 for OPTIONS on categories/:id"
-
-def test_patch_projects_id_categories_id():
-    """Test PATCH /projects/:id/categories/:id (should return 405)"""
-    response = requests.patch(API_URL + "/projects/99999/categories/99999", json={"title": "Patched Category"})
-    assert response.status_code == 405, "Expected 405 Method Not Allowed for PATCH on categories/:id"
-
-def test_head_projects_id_categories_id():
-    """Test HEAD /projects/:id/categories/:id (should return 404)"""
-    response = requests.head(API_URL + "/projects/99999/categories/99999")
-    assert response.status_code == 404, "Expected 404 when sending HEAD request to a non-existent category"
+### Unsupported HTTP Methods for /projects/:id/categories/:id are checked by harness/contract.py (MATRIX)
 
 #Extra tests
 # Testing ID generation logic for categories linked to projects
@@ -125,7 +89,7 @@ def test_post_projects_id_categories_id_generation():
 
     finally:
         # Cleanup
-        delete_project(project_id_2)
+        cleanup_project(project_id_2)
     
 def test_post_projects_id_categories_id_generation_allow_pass():
     try:
@@ -164,77 +128,9 @@ def test_post_projects_id_categories_id_generation_allow_pass():
 
     finally:
         # Cleanup
-        delete_project(project_id_2)
-
-### Summary Function to Track Tests
-def test_summary(random_order = False):
-    ensure_system_ready()
-
-    test_functions = [
-        test_delete_projects_id_categories_id,
-        test_delete_projects_id_categories_id_fail,
-        test_get_projects_id_categories_id,
-        test_put_projects_id_categories_id,
-        test_post_projects_id_categories_id,
-        test_options_projects_id_categories_id, 
-        test_patch_projects_id_categories_id,
-        test_head_projects_id_categories_id,
-        test_post_projects_id_categories_id_generation,
-        test_post_projects_id_categories_id_generation_allow_pass,
-
-
-    ]
-    if random_order:
-        random.seed(42)  # Set a fixed seed for reproducibility
-        random.shuffle(test_functions)
-
-    passed_tests = 0
-    failed_tests = 0
-
-    print("\nExecuting tests" + (" in random order" if random_order else " in default order") + ":\n")
-   
-    for test in test_functions:
-        try:
-            test()
-            print(f"Test {test.__name__}: PASSED")
-            passed_tests += 1
-        except AssertionError as e:
-            print(f"Test {test.__name__}: FAILED - {e}")
-            failed_tests += 1
-
-    print("\nSummary:")
-    print(f"Total tests run: {len(test_functions)}")
-    print(f"Passed: {passed_tests}")
-    print(f"Failed: {failed_tests}")
-
+        cleanup_project(project_id_2)
 
 # Running all the tests
 if __name__ == "__main__":
-    try:
-        ensure_system_ready()
-        run_tests = True
-    except AssertionError as e:
-        print(f"System not ready: {e}")
-        run_tests = False
-
-    if run_tests:
-        # Check if --random was provided as a command-line argument
-        random_mode = "--random" in sys.argv
-        test_summary(random_mode)
-
-    # Run tests using pytest
-    if run_tests:
-        pytest_args = ["-s"]
-        if random_mode:
-            pytest_args.extend(["--random-order", "--randomly-seed=42"])
-
-        pytest.main([__file__, *pytest_args])
-
-        response = requests.get(API_URL)
-        assert response.status_code == 200, "API is already shutdown"
-        try:
-            response = requests.get(API_URL + "/shutdown")
-        except requests.exceptions.ConnectionError:
-            assert True
-    else:
-        print("Tests skipped: API is not running or could not be reached.")
\ No newline at end of file
+    # Runs each test of this module once (see harness/runner.py for the options)
+    sys.exit(runner.main([__file__] + sys.argv[1:]))
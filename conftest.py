@@ -0,0 +1,79 @@
+"""pytest hooks shared by Projects_tests, Todos_tests and Contract_tests.
+
+The server is started (or a warm one reused) once for the whole pytest
+session and shut down once at the end, instead of once per module. Cleanup
+deferred by the tests is deleted in one background batch per module and
+waited for at the end of the session. Test durations are added to the
+scheduler's timing history. With TODO_RESTORE=test or module, the server's
+data is snapshotted at the start and restored after every test or module
+(harness.snapshot), which also takes care of the deferred cleanup.
+"""
+import os
+
+import pytest
+
+from harness import cassette, client, latency, lifecycle, scheduler, snapshot, suite, teardown, trace
+
+timings = scheduler.TimingHistory()
+rootpath = suite.ROOT
+RESTORE = os.environ.get("TODO_RESTORE")
+
+
+def pytest_sessionstart(session):
+    global rootpath
+    rootpath = str(session.config.rootpath)
+    timings.load()
+    try:
+        lifecycle.session_server()
+    except AssertionError:
+        return  # every test will fail with the connection error instead
+    if RESTORE and not cassette.replaying():
+        snapshot.capture(client.API_URL)
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_call(item):
+    with trace.span(item.nodeid):
+        yield
+
+
+def pytest_runtest_teardown(item, nextitem):
+    module_end = nextitem is None or nextitem.module is not item.module
+    if snapshot.current is not None and (RESTORE == "test" or module_end):
+        teardown.discard()
+        snapshot.restore()
+    elif module_end:
+        teardown.flush()
+
+
+def pytest_runtest_logreport(report):
+    if report.when != "call" or cassette.replaying():
+        return
+    path, _, name = report.nodeid.partition("::")
+    path = os.path.relpath(os.path.join(rootpath, path), suite.ROOT)
+    timings.record(f"{path.replace(os.sep, '/')}::{name}", report.duration)
+
+
+def pytest_sessionfinish(session, exitstatus):
+    teardown.finish()
+    lifecycle.stop_session_server()
+    if timings.durations:
+        timings.save()
+
+
+def pytest_terminal_summary(terminalreporter):
+    report = lifecycle.session_report()
+    if report:
+        terminalreporter.write_line(report)
+    terminalreporter.write_line(f"Connections: {client.stats()}")
+    terminalreporter.write_line(latency.report())
+    terminalreporter.write_line(teardown.report())
+    timeline = trace.report()
+    if timeline:
+        terminalreporter.write_line(timeline)
+    restores = snapshot.report()
+    if restores:
+        terminalreporter.write_line(restores)
+    replay = cassette.report()
+    if replay:
+        terminalreporter.write_line(replay)
@@ -0,0 +1 @@
+"""Shared helpers used by the Projects_tests and Todos_tests modules."""
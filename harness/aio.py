@@ -0,0 +1,150 @@
+"""Asyncio HTTP helpers for the tools that need many requests in flight.
+
+AsyncConnection is a minimal HTTP/1.1 keep-alive connection on asyncio
+streams (the suite has no async HTTP dependency); run_requests() pushes a
+list of requests through a fixed number of such connections and returns the
+responses in order. Writes are reported to the snapshot tracker like those
+sent through harness.client, so a snapshot restore also undoes the bulk
+deletes of harness.teardown and the seeding tools.
+"""
+import asyncio
+import json
+import time
+from urllib.parse import urlsplit
+
+from harness import latency, snapshot, trace
+from harness.endpoints import route_template
+
+DEFAULT_CONCURRENCY = 64
+DEFAULT_TIMEOUT = 30.0
+
+
+class AsyncConnection:
+    """Minimal HTTP/1.1 keep-alive connection on asyncio streams."""
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.reader = None
+        self.writer = None
+
+    async def open(self):
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except OSError:
+                pass
+        self.reader = self.writer = None
+
+    async def request(self, method, path, body=None):
+        """Send one request and return (status, body bytes)."""
+        if self.writer is None:
+            await self.open()
+        payload = json.dumps(body).encode("utf-8") if body is not None else b""
+        head = (f"{method} {path} HTTP/1.1\r\nHost: {self.host}:{self.port}\r\n"
+                f"Accept: application/json\r\nContent-Length: {len(payload)}\r\n")
+        if body is not None:
+            head += "Content-Type: application/json\r\n"
+        self.writer.write(head.encode("ascii") + b"\r\n" + payload)
+        await self.writer.drain()
+
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionError("server closed the connection")
+        status = int(status_line.split()[1])
+        headers = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        if method == "HEAD" or status in (204, 304) or status < 200:
+            data = b""
+        elif headers.get("transfer-encoding", "").lower() == "chunked":
+            data = await self.read_chunked()
+        elif "content-length" in headers:
+            data = await self.reader.readexactly(int(headers["content-length"]))
+        else:
+            data = await self.reader.read()
+            headers["connection"] = "close"
+        if headers.get("connection", "").lower() == "close":
+            await self.close()
+        return status, data
+
+    async def read_chunked(self):
+        parts = []
+        while True:
+            size = int((await self.reader.readline()).split(b";")[0], 16)
+            if size == 0:
+                await self.reader.readline()
+                return b"".join(parts)
+            parts.append(await self.reader.readexactly(size))
+            await self.reader.readline()
+
+
+class AsyncResponse:
+    __slots__ = ("status", "content")
+
+    def __init__(self, status, content):
+        self.status = status
+        self.content = content
+
+    def json(self):
+        return json.loads(self.content)
+
+
+async def _drain(host, port, requests, responses, cursor, timeout, track):
+    connection = AsyncConnection(host, port)
+    try:
+        while cursor[0] < len(requests):
+            index = cursor[0]
+            cursor[0] += 1
+            method, path, body = requests[index]
+            start = time.perf_counter()
+            try:
+                status, content = await asyncio.wait_for(connection.request(method, path, body), timeout)
+                responses[index] = AsyncResponse(status, content)
+                if track and snapshot.tracker is not None:
+                    snapshot.tracker.observe(method, path, body, status, content)
+            except (OSError, ConnectionError, asyncio.IncompleteReadError, asyncio.TimeoutError, ValueError) as e:
+                responses[index] = e
+                await connection.close()
+            elapsed = time.perf_counter() - start
+            latency.recorder.record(method, path, elapsed)
+            if trace.tracer is not None:
+                end = trace.now()
+                status = getattr(responses[index], "status", None)
+                trace.tracer.add(f"{method} {route_template(path)}", "http", end - int(elapsed * 1e6), end,
+                                 {"url": path, "status": status, "caller": "aio"})
+    finally:
+        await connection.close()
+
+
+async def run_requests_async(url, requests, concurrency=DEFAULT_CONCURRENCY, timeout=DEFAULT_TIMEOUT, track=True):
+    parts = urlsplit(url)
+    responses = [None] * len(requests)
+    cursor = [0]
+    workers = max(1, min(concurrency, len(requests)))
+    await asyncio.gather(*[
+        _drain(parts.hostname, parts.port or 80, requests, responses, cursor, timeout, track)
+        for _ in range(workers)
+    ])
+    return responses
+
+
+def run_requests(url, requests, concurrency=DEFAULT_CONCURRENCY, timeout=DEFAULT_TIMEOUT, track=True):
+    """Send (method, path, body) requests over `concurrency` connections.
+
+    Returns one AsyncResponse per request, in the same order, or the exception
+    raised for that request. track=False keeps the writes from the snapshot
+    tracker (the restore's own requests).
+    """
+    if not requests:
+        return []
+    return asyncio.run(run_requests_async(url, requests, concurrency, timeout, track))
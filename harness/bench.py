@@ -0,0 +1,164 @@
+"""Micro-benchmark runner with stored baselines and regression gating.
+
+A benchmark is a function that does its own setup and cleanup and wraps the
+operation being measured in `with timer:`:
+
+    @benchmark("DELETE /projects/:id")
+    def bench_delete_projects_id(timer):
+        project_id = create_project()
+        with timer:
+            response = client.delete(API_URL + f"/projects/{project_id}")
+        assert response.status_code == 200
+
+Each benchmark runs `warmup` untimed iterations, then `iterations` timed
+ones. Results can be saved as a baseline JSON file; a later run compared
+against it fails when a benchmark's median is slower than the baseline's by
+more than the threshold (a fraction, 0.2 = 20%).
+"""
+import argparse
+import json
+import os
+import platform
+import time
+
+from harness import client
+from harness.stats import format_table, percentile
+
+DEFAULT_WARMUP = 5
+DEFAULT_ITERATIONS = 50
+DEFAULT_THRESHOLD = 0.2
+
+
+class Timer:
+    """Context manager accumulating the time spent inside `with timer:` blocks."""
+
+    def __init__(self):
+        self.elapsed = 0.0
+        self._start = None
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.elapsed += time.perf_counter() - self._start
+        return False
+
+
+def benchmark(name):
+    def decorate(func):
+        func.benchmark_name = name
+        return func
+    return decorate
+
+
+def collect(namespace):
+    """Benchmarks defined in a module namespace, in definition order."""
+    functions = [value for value in namespace.values() if callable(value) and hasattr(value, "benchmark_name")]
+    return sorted(functions, key=lambda func: func.__code__.co_firstlineno)
+
+
+def run_benchmark(func, warmup=DEFAULT_WARMUP, iterations=DEFAULT_ITERATIONS):
+    for _ in range(warmup):
+        func(Timer())
+    samples = []
+    for _ in range(iterations):
+        timer = Timer()
+        func(timer)
+        samples.append(timer.elapsed)
+    samples.sort()
+    return {
+        "iterations": iterations,
+        "min": samples[0],
+        "median": percentile(samples, 50),
+        "p95": percentile(samples, 95),
+        "mean": sum(samples) / len(samples),
+    }
+
+
+def run_all(functions, warmup=DEFAULT_WARMUP, iterations=DEFAULT_ITERATIONS, only=()):
+    results = {}
+    for func in functions:
+        if only and not any(text in func.benchmark_name for text in only):
+            continue
+        results[func.benchmark_name] = run_benchmark(func, warmup, iterations)
+    return results
+
+
+def save_baseline(results, path):
+    data = {
+        "meta": {
+            "url": client.API_URL,
+            "python": platform.python_version(),
+            "host": platform.node(),
+            "recorded": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "benchmarks": results,
+    }
+    with open(path, "w") as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+
+
+def load_baseline(path):
+    with open(path) as f:
+        return json.load(f)["benchmarks"]
+
+
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """Rows of (name, baseline median, current median, change, regressed)."""
+    rows = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            rows.append((name, None, result["median"], None, False))
+            continue
+        change = result["median"] / base["median"] - 1 if base["median"] else 0.0
+        rows.append((name, base["median"], result["median"], change, change > threshold))
+    return rows
+
+
+def format_results(results):
+    rows = [[name, result["iterations"]] + [f"{result[key] * 1000:.2f}" for key in ("min", "median", "p95", "mean")]
+            for name, result in results.items()]
+    return format_table(["benchmark", "iterations", "min ms", "median ms", "p95 ms", "mean ms"], rows)
+
+
+def format_comparison(rows, threshold):
+    table = []
+    for name, base, current, change, regressed in rows:
+        table.append([
+            name,
+            "-" if base is None else f"{base * 1000:.2f}",
+            f"{current * 1000:.2f}",
+            "new" if change is None else f"{change * 100:+.1f}%",
+            "REGRESSION" if regressed else "ok",
+        ])
+    return (format_table(["benchmark", "baseline ms", "median ms", "change", "status"], table)
+            + f"\n(threshold {threshold * 100:.0f}% on the median)")
+
+
+def main(namespace, default_baseline, argv=None):
+    """Command line entry point shared by the benchmark modules."""
+    parser = argparse.ArgumentParser(description="Benchmark the todo manager endpoints")
+    parser.add_argument("--warmup", type=int, default=DEFAULT_WARMUP)
+    parser.add_argument("--iterations", type=int, default=DEFAULT_ITERATIONS)
+    parser.add_argument("--baseline", default=default_baseline, help="baseline JSON file")
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the new baseline")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="allowed slowdown of the median before failing (0.2 = 20%%)")
+    parser.add_argument("--only", action="append", default=[], help="only benchmarks whose name contains this")
+    args = parser.parse_args(argv)
+
+    results = run_all(collect(namespace), args.warmup, args.iterations, args.only)
+    print(format_results(results))
+    if args.save_baseline:
+        save_baseline(results, args.baseline)
+        print(f"\nBaseline saved to {args.baseline}")
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f"\nNo baseline at {args.baseline}; run with --save-baseline to record one")
+        return 0
+    rows = compare(results, load_baseline(args.baseline), args.threshold)
+    print()
+    print(format_comparison(rows, args.threshold))
+    return 1 if any(row[4] for row in rows) else 0
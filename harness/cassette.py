@@ -0,0 +1,179 @@
+"""Record/replay of the suite's HTTP traffic.
+
+With TODO_CASSETTE_MODE=record every request made through harness.client is
+sent to the real server and its response stored; with TODO_CASSETTE_MODE=replay
+the stored responses are served back without any server, so assertion logic
+can be re-run in milliseconds.
+
+Requests are keyed by method, path (with query string) and a hash of the
+body. The same key can be recorded several times (POST /projects returns a new
+id each time, GET /projects changes as tests run), so each key keeps its
+responses in order and replay hands them out in that order; once a key's
+recording is used up its last response is repeated. Requests never recorded
+are cassette misses: they raise CassetteMiss and are listed in the report, so
+you can see when a test starts sending new requests.
+
+A stream=True response is recorded as the test reads it, not up front, so
+streamed decoding keeps its constant memory; its body is stored once the
+test has read it all or closed it, as far as it was read.
+
+The cassette is a gzip-compressed JSON file, TODO_CASSETTE (default
+cassettes/suite.json.gz). Record from a single process; parallel workers
+would overwrite each other's file.
+"""
+import atexit
+import gzip
+import hashlib
+import json
+import os
+import sys
+import threading
+from urllib.parse import urlsplit
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_PATH = os.path.join(ROOT, "cassettes", "suite.json.gz")
+
+
+class CassetteMiss(requests.exceptions.ConnectionError):
+    pass
+
+
+def request_key(method, url, kwargs):
+    parts = urlsplit(url)
+    path = parts.path or "/"
+    if parts.query:
+        path += "?" + parts.query
+    if kwargs.get("json") is not None:
+        body = json.dumps(kwargs["json"], sort_keys=True).encode("utf-8")
+    else:
+        body = kwargs.get("data") or b""
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+    digest = hashlib.sha1(body).hexdigest()[:12] if body else "-"
+    return f"{method.upper()} {path} {digest}"
+
+
+class Cassette:
+    def __init__(self, path, mode):
+        self.path = path
+        self.mode = mode
+        self.entries = {}
+        self.cursors = {}
+        self.hits = 0
+        self.repeats = 0
+        self.misses = []
+        self.reported = False
+        self._lock = threading.Lock()
+        if mode == "replay":
+            self.load()
+
+    @property
+    def replaying(self):
+        return self.mode == "replay"
+
+    @property
+    def recording(self):
+        return self.mode == "record"
+
+    def load(self):
+        with gzip.open(self.path, "rt", encoding="utf-8") as f:
+            self.entries = json.load(f)
+
+    def save(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with gzip.open(self.path, "wt", encoding="utf-8") as f:
+            json.dump(self.entries, f, separators=(",", ":"))
+
+    def record(self, method, url, kwargs, response):
+        entry = {"status": response.status_code, "headers": dict(response.headers), "body": ""}
+        if kwargs.get("stream"):
+            _record_stream(entry, response)
+        else:
+            entry["body"] = response.content.decode("utf-8", errors="replace")
+        with self._lock:
+            self.entries.setdefault(request_key(method, url, kwargs), []).append(entry)
+
+    def replay(self, method, url, kwargs):
+        key = request_key(method, url, kwargs)
+        with self._lock:
+            recorded = self.entries.get(key)
+            if not recorded:
+                self.misses.append(key)
+                raise CassetteMiss(f"Cassette miss: {key}")
+            index = self.cursors.get(key, 0)
+            self.cursors[key] = index + 1
+            if index < len(recorded):
+                self.hits += 1
+            else:
+                self.repeats += 1
+            entry = recorded[min(index, len(recorded) - 1)]
+        response = requests.models.Response()
+        response.status_code = entry["status"]
+        response.headers = CaseInsensitiveDict(entry["headers"])
+        response._content = entry["body"].encode("utf-8")
+        # Already read: iter_content() serves it from _content (stream=True requests)
+        response._content_consumed = True
+        response.encoding = "utf-8"
+        response.url = url
+        return response
+
+    def report(self):
+        self.reported = True
+        if self.recording:
+            total = sum(len(responses) for responses in self.entries.values())
+            return f"Cassette: recorded {total} responses for {len(self.entries)} requests to {self.path}"
+        line = f"Cassette: {self.hits} hits, {self.repeats} repeats, {len(self.misses)} misses"
+        if self.misses:
+            line += "\n" + "\n".join(f"  miss: {key}" for key in sorted(set(self.misses)))
+        return line
+
+    def close(self):
+        if self.recording:
+            self.save()
+        if not self.reported:
+            print(self.report(), file=sys.stderr)
+
+
+def _record_stream(entry, response):
+    """Fill the entry's body from the chunks the caller reads, when it has read them all or closes the response."""
+    chunks = []
+    iter_content, close = response.iter_content, response.close
+
+    def fill():
+        entry["body"] = b"".join(chunks).decode("utf-8", errors="replace")
+
+    def iter_recorded(*args, **kwargs):
+        for chunk in iter_content(*args, **kwargs):
+            chunks.append(chunk)
+            yield chunk
+        fill()
+
+    def close_recorded():
+        fill()
+        close()
+
+    response.iter_content = iter_recorded
+    response.close = close_recorded
+
+
+def _open_from_environment():
+    mode = os.environ.get("TODO_CASSETTE_MODE", "off")
+    if mode not in ("record", "replay"):
+        return None
+    opened = Cassette(os.environ.get("TODO_CASSETTE", DEFAULT_PATH), mode)
+    atexit.register(opened.close)
+    return opened
+
+
+current = _open_from_environment()
+
+
+def replaying():
+    return current is not None and current.replaying
+
+
+def report():
+    return current.report() if current is not None else None
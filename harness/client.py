@@ -0,0 +1,229 @@
+"""Shared HTTP client for the todo manager test modules.
+
+Every request made by the suite goes through one keep-alive requests.Session,
+so consecutive calls reuse the same TCP connection instead of opening a new
+one each time, and every call is timed into harness.latency (and traced
+with harness.trace, or recorded to / replayed from a cassette with
+harness.cassette, when those are enabled), and its writes are tracked for
+harness.snapshot once a snapshot is taken. The pool size and the default
+timeout can be changed with configure() or through the TODO_POOL_SIZE /
+TODO_TIMEOUT environment variables.
+
+API_URL is the server every module talks to. It comes from TODO_API_URL
+(default http://localhost:4567), or, with TODO_SERVER=stub, from an in-memory
+stand-in server started in this process.
+"""
+import os
+import threading
+import time
+from urllib.request import getproxies
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from harness import cassette, latency, snapshot, trace
+
+DEFAULT_API_URL = "http://localhost:4567"
+DEFAULT_POOL_SIZE = int(os.environ.get("TODO_POOL_SIZE", "10"))
+DEFAULT_TIMEOUT = float(os.environ.get("TODO_TIMEOUT", "10"))
+
+stub = None
+
+
+def _resolve_api_url():
+    global stub
+    if os.environ.get("TODO_SERVER", "jar") == "stub":
+        from harness import stub_server
+        stub = stub_server.start()
+        return stub.url
+    return os.environ.get("TODO_API_URL", DEFAULT_API_URL).rstrip("/")
+
+
+API_URL = _resolve_api_url()
+
+
+class PoolStats:
+    """Counts requests sent and TCP connections opened by the shared pool.
+
+    server_time adds up the processing time servers report in a
+    Server-Timing header (the stand-in server sends one).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.new_connections = 0
+        self.server_time = 0.0
+
+    def record_request(self):
+        with self._lock:
+            self.requests += 1
+
+    def record_new_connection(self):
+        with self._lock:
+            self.new_connections += 1
+
+    def record_server_time(self, seconds):
+        with self._lock:
+            self.server_time += seconds
+
+    @property
+    def reused_connections(self):
+        return max(self.requests - self.new_connections, 0)
+
+    def reset(self):
+        with self._lock:
+            self.requests = 0
+            self.new_connections = 0
+            self.server_time = 0.0
+
+    def __str__(self):
+        return (f"{self.requests} requests, {self.new_connections} new connections, "
+                f"{self.reused_connections} reused")
+
+
+_stats = PoolStats()
+
+
+class _CountingHTTPConnectionPool(HTTPConnectionPool):
+    def _new_conn(self):
+        _stats.record_new_connection()
+        return super()._new_conn()
+
+
+class _CountingHTTPSConnectionPool(HTTPSConnectionPool):
+    def _new_conn(self):
+        _stats.record_new_connection()
+        return super()._new_conn()
+
+
+class PooledAdapter(HTTPAdapter):
+    """HTTPAdapter whose connection pools report every new connection to PoolStats."""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _CountingHTTPConnectionPool,
+            "https": _CountingHTTPSConnectionPool,
+        }
+
+
+_lock = threading.Lock()
+_session = None
+_session_pid = None
+_pool_size = DEFAULT_POOL_SIZE
+_timeout = DEFAULT_TIMEOUT
+
+
+def _new_session():
+    new_session = requests.Session()
+    # Without proxies configured, skip re-reading the environment on every request (~0.4ms each)
+    new_session.trust_env = bool(getproxies())
+    adapter = PooledAdapter(pool_connections=4, pool_maxsize=_pool_size)
+    new_session.mount("http://", adapter)
+    new_session.mount("https://", adapter)
+    return new_session
+
+
+def session():
+    """Return the shared session, creating it on first use (and again after a fork)."""
+    global _session, _session_pid
+    if _session is None or _session_pid != os.getpid():
+        with _lock:
+            if _session is None or _session_pid != os.getpid():
+                _session = _new_session()
+                _session_pid = os.getpid()
+    return _session
+
+
+def configure(pool_size=None, timeout=None):
+    """Change the pool size and/or default timeout; the pool is rebuilt on next use."""
+    global _pool_size, _timeout
+    with _lock:
+        if pool_size is not None:
+            _pool_size = pool_size
+        if timeout is not None:
+            _timeout = timeout
+    close()
+
+
+def close():
+    """Close every pooled connection."""
+    global _session
+    with _lock:
+        if _session is not None:
+            _session.close()
+        _session = None
+
+
+def stats():
+    return _stats
+
+
+def server_time(response):
+    """Processing time in seconds reported by the response's Server-Timing header (0 when absent)."""
+    total = 0.0
+    for metric in response.headers.get("Server-Timing", "").split(","):
+        for parameter in metric.split(";")[1:]:
+            name, _, value = parameter.strip().partition("=")
+            if name == "dur":
+                try:
+                    total += float(value) / 1000
+                except ValueError:
+                    pass
+    return total
+
+
+def request(method, url, **kwargs):
+    if cassette.replaying():
+        return cassette.current.replay(method, url, kwargs)
+    kwargs.setdefault("timeout", _timeout)
+    _stats.record_request()
+    start = time.perf_counter()
+    response = None
+    try:
+        response = session().request(method, url, **kwargs)
+    finally:
+        elapsed = time.perf_counter() - start
+        latency.recorder.record(method, url, elapsed)
+        if trace.tracer is not None:
+            end = trace.now()
+            trace.tracer.http(method, url, end - int(elapsed * 1e6), end, getattr(response, "status_code", None))
+    _stats.record_server_time(server_time(response))
+    if cassette.current is not None:
+        cassette.current.record(method, url, kwargs, response)
+    # Only writes are tracked; reading .content here would buffer a stream=True GET
+    if snapshot.tracker is not None and method.upper() not in snapshot.READ_ONLY:
+        snapshot.tracker.observe(method, url, kwargs.get("json"), response.status_code, response.content)
+    return response
+
+
+def get(url, **kwargs):
+    return request("GET", url, **kwargs)
+
+
+def post(url, **kwargs):
+    return request("POST", url, **kwargs)
+
+
+def put(url, **kwargs):
+    return request("PUT", url, **kwargs)
+
+
+def patch(url, **kwargs):
+    return request("PATCH", url, **kwargs)
+
+
+def delete(url, **kwargs):
+    return request("DELETE", url, **kwargs)
+
+
+def head(url, **kwargs):
+    # Same default as requests.head
+    kwargs.setdefault("allow_redirects", False)
+    return request("HEAD", url, **kwargs)
+
+
+def options(url, **kwargs):
+    return request("OPTIONS", url, **kwargs)
@@ -0,0 +1,169 @@
+"""Declarative route x method status contract, checked concurrently.
+
+Many tests only check that a verb is refused (405) or that an unknown id is
+not found (404). MATRIX states those contracts as data, route -> {method:
+expected status}, and check() fires every pair at once over concurrent
+keep-alive connections, then format_grid() shows the result as one compact
+grid. Only requests that leave the server state unchanged belong here: 405s,
+requests against ids that do not exist, and reads of links.
+
+The test modules no longer check these statuses one request at a time; a
+hand-written test is only kept when it asserts more than the status.
+
+An expected value may be a tuple when the server's behaviour is accepted
+either way (GET on the relationships of a missing project answers 200 with
+an empty list). "{missing}" in a route stands for an id that does not exist.
+"{project}", "{todo}" and "{category}" stand for entities check() creates
+before firing and deletes afterwards: a project with the todo as its task
+and the category, which is also linked to the todo. Other tests may delete
+the seed data or give it new ids, so the matrix never relies on id 1.
+
+    python -m harness.contract
+"""
+import argparse
+import sys
+import time
+
+from harness import aio, client, seeding, teardown
+from harness.stats import format_table
+
+MISSING = "99999"
+METHODS = ("GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS")
+BODY = {"title": "Contract Check"}
+# Placeholder in a route -> kind of the entity check() creates for it
+FIXTURES = {"project": "projects", "todo": "todos", "category": "categories"}
+
+MATRIX = {
+    "/projects": {"PUT": 405, "PATCH": 405, "DELETE": 405, "OPTIONS": 200},
+    "/projects/{missing}": {"GET": 404, "HEAD": 404, "POST": 404, "PUT": 404, "DELETE": (404, 204)},
+    "/projects/{project}": {"PATCH": 405, "OPTIONS": 200},
+    "/projects/{project}/tasks": {"PUT": 405, "PATCH": 405, "DELETE": 405, "OPTIONS": 200},
+    "/projects/{missing}/tasks": {"GET": (200, 404), "HEAD": (200, 404), "POST": 404,
+                                  "PUT": 405, "PATCH": 405, "DELETE": 405},
+    "/projects/{project}/categories": {"PUT": 405, "PATCH": 405, "DELETE": 405, "OPTIONS": 200},
+    "/projects/{missing}/categories": {"GET": (200, 404), "HEAD": (200, 404), "POST": 404,
+                                       "PUT": 405, "PATCH": 405, "DELETE": 405},
+    "/projects/{missing}/tasks/{missing}": {"GET": 404, "HEAD": 404, "POST": 404,
+                                            "PUT": 405, "PATCH": 405, "DELETE": 404},
+    "/projects/{missing}/categories/{missing}": {"GET": 404, "HEAD": 404, "POST": 404,
+                                                 "PUT": 405, "PATCH": 405, "DELETE": 404},
+    "/projects/{project}/tasks/{todo}": {"OPTIONS": (200, 204)},
+    "/projects/{project}/categories/{category}": {"OPTIONS": (200, 204)},
+    "/todos": {"PUT": 405, "PATCH": 405, "DELETE": 405, "OPTIONS": 200},
+    "/todos/{missing}": {"GET": 404, "HEAD": 404, "POST": 404, "PUT": 404, "DELETE": 404},
+    "/todos/{todo}/tasksof": {"PUT": 405, "PATCH": 405, "DELETE": 405, "OPTIONS": 200},
+    "/todos/{todo}/categories": {"PUT": 405, "PATCH": 405, "DELETE": 405, "OPTIONS": 200},
+    "/todos/{todo}/tasksof/{project}": {"GET": 404, "HEAD": 404, "POST": 404, "PUT": 405, "PATCH": 405, "OPTIONS": 200},
+    "/todos/{todo}/categories/{category}": {"GET": 404, "HEAD": 404, "POST": 404, "PUT": 405, "PATCH": 405, "OPTIONS": 200},
+    "/todos/{todo}/tasksof/{missing}": {"DELETE": 404},
+    "/todos/{missing}/tasksof/{missing}": {"DELETE": 404},
+    "/todos/{missing}/categories/{missing}": {"DELETE": 404},
+    "/categories": {"PUT": 405, "PATCH": 405, "DELETE": 405, "OPTIONS": 200},
+    "/categories/{missing}": {"GET": 404, "HEAD": 404, "POST": 404, "PUT": 404, "DELETE": 404},
+}
+
+
+class Contract:
+    __slots__ = ("route", "method", "expected")
+
+    def __init__(self, route, method, expected):
+        self.route = route
+        self.method = method
+        self.expected = expected if isinstance(expected, tuple) else (expected,)
+
+    def path(self, ids):
+        return self.route.format(missing=MISSING, **ids)
+
+    def body(self):
+        return BODY if self.method in ("POST", "PUT", "PATCH") else None
+
+    def __repr__(self):
+        return f"{self.method} {self.route} -> {'/'.join(map(str, self.expected))}"
+
+
+class Outcome:
+    __slots__ = ("contract", "status", "error")
+
+    def __init__(self, contract, status=None, error=None):
+        self.contract = contract
+        self.status = status
+        self.error = error
+
+    @property
+    def passed(self):
+        return self.status in self.contract.expected
+
+
+def contracts(matrix=MATRIX):
+    return [Contract(route, method, expected)
+            for route, methods in matrix.items() for method, expected in methods.items()]
+
+
+def create_fixtures(url, concurrency):
+    """Create the entities the matrix routes refer to; returns their ids by placeholder name."""
+    seeded = seeding.seed(projects=1, todos=1, categories=1, link_categories_to_todos=True,
+                          url=url, concurrency=concurrency, prefix="Contract")
+    return {"project": seeded.projects[0], "todo": seeded.todos[0], "category": seeded.categories[0]}
+
+
+def check(matrix=MATRIX, url=None, concurrency=aio.DEFAULT_CONCURRENCY):
+    """Send every contract's request concurrently and return one Outcome per contract."""
+    url = (url or client.API_URL).rstrip("/")
+    cases = contracts(matrix)
+    cleanup = teardown.TeardownRegistry(url, concurrency)
+    try:
+        ids = create_fixtures(url, concurrency)
+        for name, entity_id in ids.items():
+            cleanup.defer(FIXTURES[name], entity_id)
+        responses = aio.run_requests(url, [(case.method, case.path(ids), case.body()) for case in cases],
+                                     concurrency)
+    finally:
+        cleanup.finish()
+    outcomes = []
+    for case, response in zip(cases, responses):
+        if isinstance(response, Exception):
+            outcomes.append(Outcome(case, error=str(response) or type(response).__name__))
+        else:
+            outcomes.append(Outcome(case, response.status))
+    return outcomes
+
+
+def failures(outcomes):
+    return [outcome for outcome in outcomes if not outcome.passed]
+
+
+def format_grid(outcomes):
+    """One row per route, one column per method; a failing cell shows 'expected!actual'."""
+    cells = {}
+    for outcome in outcomes:
+        case = outcome.contract
+        expected = "/".join(map(str, case.expected))
+        if outcome.passed:
+            cells[(case.route, case.method)] = str(outcome.status)
+        else:
+            cells[(case.route, case.method)] = f"{expected}!{outcome.status or 'ERR'}"
+    routes = list(dict.fromkeys(outcome.contract.route for outcome in outcomes))
+    rows = [[route] + [cells.get((route, method), "") for method in METHODS] for route in routes]
+    failed = failures(outcomes)
+    summary = f"{len(outcomes) - len(failed)}/{len(outcomes)} contracts passed"
+    return format_table(["route"] + list(METHODS), rows) + "\n" + summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check the route x method status contract")
+    parser.add_argument("-c", "--concurrency", type=int, default=aio.DEFAULT_CONCURRENCY)
+    parser.add_argument("--url", default=client.API_URL)
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    outcomes = check(url=args.url, concurrency=args.concurrency)
+    print(format_grid(outcomes))
+    print(f"Checked in {time.perf_counter() - start:.3f}s")
+    for outcome in failures(outcomes):
+        if outcome.error:
+            print(f"  {outcome.contract!r}: {outcome.error}")
+    return 1 if failures(outcomes) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,96 @@
+"""Catalog of the endpoints and payload shapes exercised by the test modules.
+
+The payload helpers build the same bodies the tests send (create_project's
+title/description, the {"title", "description"} todo body, ...), and
+CATALOG lists the method/route pairs the suite covers so that the load,
+benchmark and contract tools can reuse them instead of re-typing URLs.
+Routes use "{id}" for the owning entity; Endpoint.path() fills it in from a
+dict keyed by the route's first segment ("projects", "todos", "categories"),
+and `creates` names the collection a successful request adds an entity to.
+"""
+from urllib.parse import urlsplit
+
+COLLECTIONS = ("todos", "projects", "categories")
+
+# Field name -> (type, mandatory) of each entity type's payload
+FIELDS = {
+    "todos": {"title": ("string", True), "doneStatus": ("boolean", False), "description": ("string", False)},
+    "projects": {"title": ("string", False), "completed": ("boolean", False), "active": ("boolean", False),
+                 "description": ("string", False)},
+    "categories": {"title": ("string", True), "description": ("string", False)},
+}
+
+
+def route_template(url):
+    """Route of a concrete URL or path with ids replaced: /projects/99999/categories -> /projects/{id}/categories."""
+    parts = [part for part in urlsplit(url).path.split("/") if part]
+    if parts and parts[0] in COLLECTIONS:
+        parts = ["{id}" if index % 2 else part for index, part in enumerate(parts)]
+    return "/" + "/".join(parts)
+
+
+def project_payload(title="Default Project", description="Default Description"):
+    return {"title": title, "description": description}
+
+
+def todo_payload(title="Test Todo", description="Description of new todo"):
+    return {"title": title, "description": description}
+
+
+def category_payload(title="Test Category", description="Category description"):
+    return {"title": title, "description": description}
+
+
+def task_payload(title="Test Task", description="Task description"):
+    return {"title": title, "description": description}
+
+
+class Endpoint:
+    __slots__ = ("method", "route", "payload", "query", "creates")
+
+    def __init__(self, method, route, payload=None, query=None, creates=None):
+        self.method = method
+        self.route = route
+        self.payload = payload
+        self.query = query
+        self.creates = creates
+
+    @property
+    def name(self):
+        return f"{self.method} {self.route}" + (f"?{self.query}" if self.query else "")
+
+    @property
+    def resource(self):
+        return self.route.strip("/").split("/")[0]
+
+    @property
+    def read_only(self):
+        return self.method in ("GET", "HEAD", "OPTIONS")
+
+    def path(self, ids=None):
+        path = self.route.replace("{id}", str((ids or {}).get(self.resource, "")))
+        return f"{path}?{self.query}" if self.query else path
+
+    def body(self):
+        return self.payload() if self.payload else None
+
+
+CATALOG = [
+    Endpoint("GET", "/projects"),
+    Endpoint("HEAD", "/projects"),
+    Endpoint("POST", "/projects", project_payload, creates="projects"),
+    Endpoint("GET", "/projects/{id}"),
+    Endpoint("PUT", "/projects/{id}", lambda: project_payload("Updated Project", "Updated description")),
+    Endpoint("POST", "/projects/{id}", lambda: {"title": "Modified Project Title"}),
+    Endpoint("GET", "/projects/{id}/tasks"),
+    Endpoint("POST", "/projects/{id}/tasks", task_payload, creates="todos"),
+    Endpoint("GET", "/projects/{id}/categories"),
+    Endpoint("POST", "/projects/{id}/categories", category_payload, creates="categories"),
+    Endpoint("GET", "/todos"),
+    Endpoint("HEAD", "/todos"),
+    Endpoint("GET", "/todos", query="title=Test%20Todo"),
+    Endpoint("POST", "/todos", todo_payload, creates="todos"),
+    Endpoint("GET", "/todos/{id}"),
+    Endpoint("GET", "/todos/{id}/tasksof"),
+    Endpoint("GET", "/todos/{id}/categories"),
+]
@@ -0,0 +1,201 @@
+"""Benchmark and check GET /todos?field=value filtering at scale.
+
+test_get_todos_with_query checks ?title=Test Todo against a handful of
+todos. This tool seeds a large dataset with controlled value distributions:
+
+- title: "Filter 50%", "Filter 10%", "Filter 1%" and "Filter 0.1%" on those
+  shares of the todos, every other todo a unique title;
+- doneStatus: true on --done-fraction of the todos;
+- description: one of 100 values, Zipf-distributed (a few common, a long tail).
+
+It then reads the whole collection once, streamed, into a client-side index
+(field -> value -> ids) and picks queries at several selectivities for each
+field (50% down to a single match, plus a value that matches nothing) and a
+few two-field combinations. Each query is:
+
+- checked: the ids the server returns must be exactly the index's;
+- timed server-side (GET /todos?field=value) against fetching every todo
+  and filtering on the client, both decoded with harness.streaming.
+
+Any wrong result fails the run. The seeded todos are deleted at the end,
+also when seeding or a query fails partway.
+
+    python -m harness.filters --size 10000
+    TODO_SERVER=stub python -m harness.filters --size 100000 --repeats 3
+"""
+import argparse
+import random
+import sys
+import time
+from array import array
+from urllib.parse import quote, urlencode
+
+from harness import aio, client, lifecycle, seeding, streaming, teardown
+from harness.stats import format_table, percentile
+
+FIELDS = ("title", "doneStatus", "description")
+TITLE_SHARES = (("Filter 50%", 0.5), ("Filter 10%", 0.1), ("Filter 1%", 0.01), ("Filter 0.1%", 0.001))
+DESCRIPTIONS = 100
+SELECTIVITIES = (0.5, 0.1, 0.01, 0.001)
+MISSING_VALUE = "No Such Value"
+
+
+def generate(size, done_fraction=0.3, seed=0):
+    """Payloads of `size` todos with the distributions described above."""
+    rng = random.Random(seed)
+    order = list(range(size))
+    rng.shuffle(order)
+    titles = [f"Filter Todo {i}" for i in range(size)]
+    start = 0
+    for title, share in TITLE_SHARES:
+        count = round(size * share)
+        for i in order[start:start + count]:
+            titles[i] = title
+        start += count
+    weights = [1 / rank for rank in range(1, DESCRIPTIONS + 1)]
+    descriptions = rng.choices([f"Description {rank}" for rank in range(1, DESCRIPTIONS + 1)], weights, k=size)
+    return [{"title": titles[i], "doneStatus": rng.random() < done_fraction, "description": descriptions[i]}
+            for i in range(size)]
+
+
+class Index:
+    """field -> rendered value -> ids of the todos with that value."""
+
+    def __init__(self, fields=FIELDS):
+        self.fields = fields
+        self.values = {field: {} for field in fields}
+        self.size = 0
+
+    @classmethod
+    def build(cls, entities, fields=FIELDS):
+        index = cls(fields)
+        for entity in entities:
+            entity_id = int(entity["id"])
+            for field in fields:
+                index.values[field].setdefault(entity.get(field), array("q")).append(entity_id)
+            index.size += 1
+        return index
+
+    def ids(self, field, value):
+        return self.values[field].get(value, ())
+
+    def expected(self, filters):
+        """Ids matching every field=value filter."""
+        sets = sorted((set(self.ids(field, value)) for field, value in filters.items()), key=len)
+        return set.intersection(*sets) if sets else set()
+
+    def value_near(self, field, selectivity):
+        """The value of a field whose share of the todos is closest to selectivity."""
+        counts = {value: len(ids) for value, ids in self.values[field].items()}
+        return min(counts, key=lambda value: abs(counts[value] / self.size - selectivity))
+
+
+def pick_queries(index):
+    """Filters over each field at several selectivities, a non-matching value and two-field combinations."""
+    queries = []
+    for field in FIELDS:
+        chosen = []
+        for selectivity in SELECTIVITIES + (1 / max(index.size, 1),):
+            value = index.value_near(field, selectivity)
+            if value not in chosen:
+                chosen.append(value)
+        queries.extend({field: value} for value in chosen)
+        queries.append({field: MISSING_VALUE})
+    for title, _ in TITLE_SHARES[:2]:
+        queries.append({"title": title, "doneStatus": "true"})
+        queries.append({"title": title, "description": index.value_near("description", 0.1)})
+    return queries
+
+
+class QueryResult:
+    __slots__ = ("filters", "expected", "returned", "missing", "extra", "server", "client")
+
+    def __init__(self, filters, expected, returned, server, client_side):
+        self.filters = filters
+        self.expected = len(expected)
+        self.returned = len(returned)
+        self.missing = len(expected - returned)
+        self.extra = len(returned - expected)
+        self.server = server
+        self.client = client_side
+
+    @property
+    def correct(self):
+        return not self.missing and not self.extra
+
+
+def _timed(function, repeats):
+    samples = []
+    value = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        value = function()
+        samples.append(time.perf_counter() - start)
+    return value, percentile(sorted(samples), 50)
+
+
+def run_query(url, index, filters, repeats=3):
+    query = urlencode(filters, quote_via=quote)
+
+    def server_side():
+        return {int(todo["id"]) for todo in streaming.get_entities(f"{url}/todos?{query}", "todos")}
+
+    def client_side():
+        return {int(todo["id"]) for todo in streaming.get_entities(f"{url}/todos", "todos")
+                if all(todo.get(field) == value for field, value in filters.items())}
+
+    returned, server = _timed(server_side, repeats)
+    _, client_time = _timed(client_side, repeats)
+    return QueryResult(filters, index.expected(filters), returned, server, client_time)
+
+
+def format_results(results, size):
+    rows = []
+    for result in results:
+        name = "&".join(f"{field}={value}" for field, value in result.filters.items())
+        verdict = "ok" if result.correct else f"WRONG ({result.missing} missing, {result.extra} extra)"
+        rows.append([name, f"{result.expected / size:.2%}", result.expected, f"{result.server * 1000:.2f}",
+                     f"{result.client * 1000:.2f}", f"{result.client / result.server:.1f}x" if result.server else "-",
+                     verdict])
+    return format_table(["filter", "selectivity", "matches", "server ms", "fetch-all ms", "server speedup",
+                         "result"], rows)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark and verify GET /todos?field=value filtering")
+    parser.add_argument("--size", type=int, default=10000, help="todos to seed")
+    parser.add_argument("--done-fraction", type=float, default=0.3)
+    parser.add_argument("--repeats", type=int, default=3, help="timed runs per query and strategy")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-c", "--concurrency", type=int, default=aio.DEFAULT_CONCURRENCY)
+    parser.add_argument("--url", default=client.API_URL)
+    args = parser.parse_args(argv)
+
+    url = args.url.rstrip("/")
+    if url == client.API_URL:
+        lifecycle.session_server()
+    cleanup = teardown.TeardownRegistry(url, args.concurrency)
+    try:
+        # A seeding that fails partway deletes what it created itself
+        start = time.perf_counter()
+        ids = seeding.create_all("todos", generate(args.size, args.done_fraction, args.seed), url, args.concurrency)
+        for todo_id in ids:
+            cleanup.defer("todos", todo_id)
+        print(f"Seeded {len(ids)} todos in {time.perf_counter() - start:.2f}s")
+
+        start = time.perf_counter()
+        index = Index.build(streaming.get_entities(f"{url}/todos", "todos"))
+        print(f"Indexed {index.size} todos in {time.perf_counter() - start:.2f}s")
+        results = [run_query(url, index, filters, args.repeats) for filters in pick_queries(index)]
+    finally:
+        cleanup.finish()
+
+    print()
+    print(format_results(results, index.size))
+    wrong = [result for result in results if not result.correct]
+    print(f"\n{len(results)} queries on {index.size} todos, {len(wrong)} wrong")
+    return 1 if wrong else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
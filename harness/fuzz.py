@@ -0,0 +1,447 @@
+"""Property-based payload fuzzing of the POST and PUT routes.
+
+The boundary tests try a few hand-picked bodies: "A" * 255 titles and
+"B" * 1000 descriptions in test_post_todos_maximum_data, a numeric against
+a string id in test_post_projects_id_categories_with_different_id_formats,
+{"category_id": 999999999}. This tool generates bodies for every POST/PUT
+route the suite touches, from the payload shapes in harness.endpoints:
+boundary and random strings, wrong types, booleans as strings, unknown and
+forbidden fields, existing, missing and non-string ids, and mutations of the
+suite's own payloads. They are sent in batches over concurrent keep-alive
+connections, and every response is checked against these properties:
+
+- the server answers, and never with a 5xx;
+- the status is the route's success status or 400/404;
+- a body the schema says is valid is accepted, one it says is invalid
+  (unknown field, id on create, wrong type, empty mandatory title, numeric
+  link id, missing parent) is refused; bodies the API may coerce either way
+  (a number for a string field, "true" for a boolean) are not judged;
+- an accepted entity comes back with the string and boolean values it was
+  sent, and a refusal carries errorMessages.
+
+Each distinct failure (route and property) is then shrunk: keys are
+dropped and values simplified while the failure persists, down to a
+minimal reproducer. Entities created by the fuzzer are deleted as it goes.
+
+    python -m harness.fuzz -d 15m
+    TODO_SERVER=stub python -m harness.fuzz -d 30s --route "POST /todos"
+"""
+import argparse
+import json
+import random
+import string
+import sys
+import time
+
+from harness import aio, client, endpoints, lifecycle, teardown
+from harness.endpoints import FIELDS
+from harness.soak import format_elapsed, parse_duration
+from harness.stats import format_table
+
+MISSING = "99999"
+BATCH_SIZE = 2000
+ACCEPT, REJECT = "accept", "reject"
+REJECT_STATUSES = (400, 404)
+SUCCESS_STATUSES = {"create": 201, "link": 201, "amend": 200, "replace": 200}
+
+BOUNDARY_STRINGS = ("", " ", "a", "A" * 255, "A" * 256, "B" * 1000, "B" * 1001, "x" * 10000,
+                    "Ünïcödé 漢字 🙂", "\x00", "line\nbreak\ttab", "<script>alert(1)</script>", "' OR '1'='1",
+                    "%s%n%x", "null", "true", "15", "  padded  ")
+OTHER_VALUES = (None, 0, -1, 15, 999999999, 2 ** 63, 1.5, 1e308, True, False, [], ["a"], {}, {"id": "1"})
+BOOLEAN_LIKE = ("true", "false", "TRUE", "yes", "", 1, 0)
+LINK_IDS = (15, 999999999, -1, 0, 1.5, None, [], {"id": "1"}, "15", "999999999", "abc", "", "-1")
+# String ids no entity can have: a link POST with one of them creates a new entity from the body
+NEVER_IDS = ("999999999", "abc", "", "-1")
+EXTRA_FIELDS = ("id", "category_id", "unknownField", "", "Title", "tasks", "categories", "doneStatus", "completed")
+ALPHABET = string.ascii_letters + string.digits + string.punctuation + " \t\néü漢🙂"
+# The suite's own boundary payloads, mutated as well as generated from scratch
+CORPUS = (
+    {"title": "A" * 255, "description": "B" * 1000},
+    {"title": "Minimal Todo"},
+    {"description": "Missing title"},
+    {"category_id": 999999999},
+    {"id": 15, "title": "Category with Numeric ID", "description": "Testing numeric ID input"},
+    {"id": "15", "title": "Category with String ID", "description": "Testing string ID input"},
+    {"title": "Updated Project", "description": "Updated description", "completed": False, "active": True},
+)
+
+
+class Target:
+    """A POST/PUT route; kind is the entity type its body describes."""
+
+    __slots__ = ("method", "route", "kind", "mode")
+
+    def __init__(self, method, route, kind, mode):
+        self.method = method
+        self.route = route
+        self.kind = kind
+        self.mode = mode
+
+    @property
+    def name(self):
+        return f"{self.method} {self.route}"
+
+    @property
+    def missing_parent(self):
+        return "{missing}" in self.route
+
+    def path(self, fixtures):
+        owner = self.route.strip("/").split("/")[0]
+        return self.route.replace("{id}", fixtures.get(owner, MISSING)).replace("{missing}", MISSING)
+
+
+TARGETS = [
+    Target("POST", "/todos", "todos", "create"),
+    Target("POST", "/projects", "projects", "create"),
+    Target("POST", "/categories", "categories", "create"),
+    Target("POST", "/todos/{id}", "todos", "amend"),
+    Target("PUT", "/todos/{id}", "todos", "replace"),
+    Target("POST", "/projects/{id}", "projects", "amend"),
+    Target("PUT", "/projects/{id}", "projects", "replace"),
+    Target("POST", "/categories/{id}", "categories", "amend"),
+    Target("PUT", "/categories/{id}", "categories", "replace"),
+    Target("POST", "/projects/{id}/tasks", "todos", "link"),
+    Target("POST", "/projects/{id}/categories", "categories", "link"),
+    Target("POST", "/todos/{id}/tasksof", "projects", "link"),
+    Target("POST", "/todos/{id}/categories", "categories", "link"),
+    Target("POST", "/projects/{missing}", "projects", "amend"),
+    Target("PUT", "/projects/{missing}", "projects", "replace"),
+    Target("POST", "/projects/{missing}/tasks", "todos", "link"),
+    Target("POST", "/projects/{missing}/categories", "categories", "link"),
+]
+
+
+class Generator:
+    def __init__(self, rng, fixtures):
+        self.rng = rng
+        self.fixtures = fixtures
+
+    def text(self):
+        return "".join(self.rng.choice(ALPHABET) for _ in range(self.rng.randint(1, 40)))
+
+    def value(self, field_type):
+        roll = self.rng.random()
+        if field_type == "boolean":
+            if roll < 0.75:
+                return self.rng.random() < 0.5
+            return self.rng.choice(BOOLEAN_LIKE + OTHER_VALUES)
+        if roll < 0.45:
+            return self.rng.choice(BOUNDARY_STRINGS)
+        if roll < 0.85:
+            return self.text()
+        return self.rng.choice(OTHER_VALUES)
+
+    def link_id(self, kind):
+        if self.rng.random() < 0.4:
+            return self.fixtures[kind]
+        return self.rng.choice(LINK_IDS)
+
+    def payload(self, target):
+        rng = self.rng
+        if rng.random() < 0.03:
+            return rng.choice(([], ["x"], "text", 7, True))
+        if rng.random() < 0.2:
+            return self.mutate(target, dict(rng.choice(CORPUS)))
+        body = {name: self.value(field_type) for name, (field_type, _) in FIELDS[target.kind].items()
+                if rng.random() < 0.6}
+        if target.mode == "link" and rng.random() < 0.7:
+            body["id"] = self.link_id(target.kind)
+        while rng.random() < 0.15:
+            body[rng.choice(EXTRA_FIELDS)] = rng.choice(OTHER_VALUES + (self.text(),))
+        return body
+
+    def mutate(self, target, body):
+        """Change one thing in a corpus payload: a value, a dropped key, or an extra field."""
+        rng = self.rng
+        roll = rng.random()
+        if roll < 0.5:
+            name, (field_type, _) = rng.choice(list(FIELDS[target.kind].items()))
+            body[name] = self.value(field_type)
+        elif roll < 0.75 and body:
+            del body[rng.choice(list(body))]
+        elif target.mode == "link":
+            body["id"] = self.link_id(target.kind)
+        else:
+            body[rng.choice(EXTRA_FIELDS)] = rng.choice(OTHER_VALUES)
+        return body
+
+
+def _fields_verdict(kind, body, creating):
+    """ACCEPT or REJECT by the schema, or None when the API may go either way."""
+    schema = FIELDS[kind]
+    unsure = False
+    for name, value in body.items():
+        if name not in schema:
+            return REJECT
+        if schema[name][0] == "boolean":
+            if isinstance(value, bool):
+                continue
+            if value not in ("true", "false"):
+                return REJECT
+            unsure = True
+        elif value is None or isinstance(value, (list, dict)):
+            return REJECT
+        elif not isinstance(value, str) or not value.strip():
+            unsure = True
+    for name, (_, mandatory) in schema.items():
+        if mandatory and (creating or name in body) and body.get(name) in (None, ""):
+            return REJECT
+    return None if unsure else ACCEPT
+
+
+def expect(target, body, fixtures):
+    """What the API should do with a body sent to a target: ACCEPT, REJECT or None (not judged)."""
+    if target.missing_parent or not isinstance(body, dict):
+        return REJECT
+    if target.mode == "create":
+        return REJECT if "id" in body else _fields_verdict(target.kind, body, True)
+    rest = {name: value for name, value in body.items() if name != "id"}
+    if target.mode != "link":
+        verdict = _fields_verdict(target.kind, rest, target.mode == "replace")
+        return None if verdict == ACCEPT and "id" in body else verdict
+    if "id" not in body:
+        return _fields_verdict(target.kind, rest, True)
+    link_id = body["id"]
+    if link_id is None:
+        return None
+    if not isinstance(link_id, str):
+        return REJECT
+    if link_id == fixtures[target.kind]:
+        return None if rest else ACCEPT
+    return _fields_verdict(target.kind, rest, True) if link_id in NEVER_IDS else None
+
+
+def _json(content):
+    try:
+        return json.loads(content)
+    except ValueError:
+        return None
+
+
+def check(target, body, response, fixtures):
+    """(property, detail) of the first property a response breaks, or None."""
+    if isinstance(response, Exception):
+        return "no-response", str(response) or type(response).__name__
+    status = response.status
+    if status >= 500:
+        return "server-error", f"{status}"
+    accepted = status == SUCCESS_STATUSES[target.mode]
+    if not accepted and status not in REJECT_STATUSES:
+        return "unexpected-status", f"{status}"
+    expected = expect(target, body, fixtures)
+    document = _json(response.content) if response.content else None
+    if not accepted:
+        if expected == ACCEPT:
+            return "rejected-valid", f"{status}: {document}"
+        if not isinstance(document, dict) or not document.get("errorMessages"):
+            return "bad-error-body", f"{status} without errorMessages"
+        return None
+    if expected == REJECT:
+        return "accepted-invalid", f"{status}"
+    if not response.content:
+        # Linking an existing entity answers 201 without a body
+        return None if target.mode == "link" else ("bad-body", f"{status} with an empty body")
+    if not isinstance(document, dict) or "id" not in document:
+        return "bad-body", f"{status}: {response.content[:80]!r}"
+    for name, value in body.items():
+        field_type = FIELDS[target.kind].get(name, (None,))[0]
+        if field_type == "boolean" and isinstance(value, bool):
+            want = "true" if value else "false"
+        elif field_type == "string" and isinstance(value, str):
+            want = value
+        else:
+            continue
+        if document.get(name) != want:
+            return "not-echoed", f"{name}: sent {want!r:.40}, got {document.get(name)!r:.40}"
+    return None
+
+
+class Outcome:
+    __slots__ = ("target", "body", "status", "failure", "detail")
+
+    def __init__(self, target, body, response, failure):
+        self.target = target
+        self.body = body
+        self.status = getattr(response, "status", None)
+        self.failure, self.detail = failure or (None, None)
+
+    @property
+    def signature(self):
+        return self.target.name, self.failure
+
+
+def send(url, cases, fixtures, concurrency, cleanup):
+    """Send (target, body) cases concurrently; returns their Outcomes and defers what they created to cleanup."""
+    requests = [(target.method, target.path(fixtures), body) for target, body in cases]
+    outcomes = []
+    for (target, body), response in zip(cases, aio.run_requests(url, requests, concurrency)):
+        outcomes.append(Outcome(target, body, response, check(target, body, response, fixtures)))
+        if getattr(response, "status", None) == 201 and response.content:
+            document = _json(response.content)
+            if isinstance(document, dict) and "id" in document:
+                cleanup.defer(target.kind, document["id"])
+    return outcomes
+
+
+def _simpler(value):
+    if isinstance(value, str):
+        if value:
+            yield ""
+        if len(value) > 1:
+            yield value[:1]
+        if len(value) > 2:
+            yield value[:len(value) // 2]
+    elif isinstance(value, bool) or value is None:
+        return
+    elif isinstance(value, (int, float)):
+        if value != 0:
+            yield 0
+    elif isinstance(value, list):
+        if value:
+            yield []
+        if len(value) > 1:
+            yield value[:1]
+    elif isinstance(value, dict):
+        if value:
+            yield {}
+        for key in value:
+            yield {name: item for name, item in value.items() if name != key}
+
+
+def candidates(body):
+    """Smaller variants of a body, most aggressive first: dropped keys, then simpler values."""
+    if not isinstance(body, dict):
+        yield {}
+        yield from _simpler(body)
+        return
+    for key in body:
+        yield {name: value for name, value in body.items() if name != key}
+    for key, value in body.items():
+        for simpler in _simpler(value):
+            yield {**body, key: simpler}
+
+
+def shrink(url, outcome, fixtures, concurrency, cleanup, max_rounds=200):
+    """Outcome of the smallest body found that breaks the same property on the same route, and the steps taken."""
+    steps = 0
+    for _ in range(max_rounds):
+        smaller = [candidate for candidate in candidates(outcome.body) if candidate != outcome.body]
+        if not smaller:
+            break
+        results = send(url, [(outcome.target, candidate) for candidate in smaller], fixtures, concurrency, cleanup)
+        found = next((result for result in results if result.failure == outcome.failure), None)
+        if found is None:
+            break
+        outcome, steps = found, steps + 1
+    return outcome, steps
+
+
+def setup(url):
+    fixtures = {
+        "projects": client.post(f"{url}/projects", json=endpoints.project_payload("Fuzz Project")).json()["id"],
+        "todos": client.post(f"{url}/todos", json=endpoints.todo_payload("Fuzz Todo")).json()["id"],
+        "categories": client.post(f"{url}/categories", json=endpoints.category_payload("Fuzz Category")).json()["id"],
+    }
+    return fixtures
+
+
+class FuzzRun:
+    def __init__(self):
+        self.cases = 0
+        self.elapsed = 0.0
+        self.counts = {}
+        self.first = {}
+
+    def add(self, outcomes):
+        for outcome in outcomes:
+            self.cases += 1
+            counts = self.counts.setdefault(outcome.target.name, {"cases": 0, "accepted": 0, "refused": 0,
+                                                                   "failed": 0})
+            counts["cases"] += 1
+            if outcome.failure is not None:
+                counts["failed"] += 1
+                self.first.setdefault(outcome.signature, outcome)
+            elif outcome.status in REJECT_STATUSES:
+                counts["refused"] += 1
+            else:
+                counts["accepted"] += 1
+
+
+def run_fuzz(url, targets, fixtures, cleanup, duration, max_cases=0, seed=0, batch_size=BATCH_SIZE,
+             concurrency=aio.DEFAULT_CONCURRENCY):
+    run = FuzzRun()
+    start = time.perf_counter()
+    batch = 0
+    while time.perf_counter() - start < duration and not (max_cases and run.cases >= max_cases):
+        generator = Generator(random.Random(seed * 1000003 + batch), fixtures)
+        size = min(batch_size, max_cases - run.cases) if max_cases else batch_size
+        cases = []
+        for _ in range(size):
+            target = generator.rng.choice(targets)
+            cases.append((target, generator.payload(target)))
+        run.add(send(url, cases, fixtures, concurrency, cleanup))
+        # Delete what the batch created in the background while the next one runs
+        cleanup.flush()
+        run.elapsed = time.perf_counter() - start
+        batch += 1
+    return run
+
+
+def format_counts(run):
+    rows = [[name, counts["cases"], counts["accepted"], counts["refused"], counts["failed"]]
+            for name, counts in sorted(run.counts.items())]
+    return format_table(["route", "cases", "accepted", "refused", "failed"], rows)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fuzz the POST/PUT payloads and shrink the failures")
+    parser.add_argument("-d", "--duration", type=parse_duration, default=parse_duration("60s"),
+                        help="how long to fuzz, e.g. 90s, 15m")
+    parser.add_argument("-n", "--cases", type=int, default=0, help="stop after this many cases (0: no limit)")
+    parser.add_argument("--route", action="append", dest="routes",
+                        help='only this route, e.g. "POST /todos" (repeatable)')
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--batch", type=int, default=BATCH_SIZE, help="cases sent per concurrent batch")
+    parser.add_argument("-c", "--concurrency", type=int, default=aio.DEFAULT_CONCURRENCY)
+    parser.add_argument("--output", default="", help="write the minimal reproducers to this JSON file")
+    parser.add_argument("--url", default=client.API_URL)
+    args = parser.parse_args(argv)
+
+    targets = [target for target in TARGETS if not args.routes or target.name in args.routes]
+    if not targets:
+        parser.error(f"no such route; choose from: {', '.join(target.name for target in TARGETS)}")
+    url = args.url.rstrip("/")
+    if url == client.API_URL:
+        lifecycle.session_server()
+    fixtures = setup(url)
+    cleanup = teardown.TeardownRegistry(url, args.concurrency)
+    try:
+        run = run_fuzz(url, targets, fixtures, cleanup, args.duration, args.cases, args.seed, args.batch,
+                       args.concurrency)
+        reproducers = [(outcome,) + shrink(url, outcome, fixtures, args.concurrency, cleanup)
+                       for outcome in run.first.values()]
+    finally:
+        # Registered only now: the flushes during the run must not delete the fixtures
+        for kind, entity_id in fixtures.items():
+            cleanup.defer(kind, entity_id)
+        cleanup.finish()
+
+    print(format_counts(run))
+    print(f"\n{run.cases} cases on {len(targets)} routes in {format_elapsed(run.elapsed)} "
+          f"({run.cases / max(run.elapsed, 1e-9):.0f}/s)")
+    for original, minimal, steps in reproducers:
+        print(f"FAILED {minimal.failure}: {minimal.target.name} {json.dumps(minimal.body)} -> {minimal.detail} "
+              f"(shrunk from {len(json.dumps(original.body))} to {len(json.dumps(minimal.body))} bytes "
+              f"in {steps} steps)")
+    if not reproducers:
+        print("No property failed")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump([{"route": minimal.target.name, "property": minimal.failure, "detail": minimal.detail,
+                        "body": minimal.body, "original": original.body} for original, minimal, _ in reproducers],
+                      f, indent=1)
+    return 1 if reproducers else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,119 @@
+"""Per-route latency histograms for every request the suite makes.
+
+harness.client times each call and records it here under (method, route
+template), where the template replaces ids in the concrete path:
+/projects/99999/categories -> /projects/{id}/categories. Samples go into
+log-scale buckets (5% wide), so memory stays constant however long the run
+and p50/p95/p99 are accurate to within a bucket; max is exact.
+"""
+import math
+import threading
+
+from harness import endpoints
+from harness.stats import format_table
+
+MIN_LATENCY = 1e-5
+GROWTH = 1.05
+_LOG_GROWTH = math.log(GROWTH)
+
+
+class LatencyHistogram:
+    __slots__ = ("buckets", "count", "total", "max")
+
+    def __init__(self):
+        self.buckets = {}
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        index = 0 if seconds <= MIN_LATENCY else int(math.log(seconds / MIN_LATENCY) / _LOG_GROWTH) + 1
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, q):
+        """Upper bound of the bucket holding the q-th percentile (capped at max)."""
+        if not self.count:
+            return 0.0
+        rank = max(1, math.ceil(q / 100 * self.count))
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                return min(MIN_LATENCY * GROWTH ** index, self.max)
+        return self.max
+
+    def merge(self, other):
+        for index, count in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def to_dict(self):
+        return {"buckets": self.buckets, "count": self.count, "total": self.total, "max": self.max}
+
+    @classmethod
+    def from_dict(cls, data):
+        histogram = cls()
+        histogram.buckets = {int(index): count for index, count in data["buckets"].items()}
+        histogram.count = data["count"]
+        histogram.total = data["total"]
+        histogram.max = data["max"]
+        return histogram
+
+
+class LatencyRecorder:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.histograms = {}
+
+    def record(self, method, url, seconds):
+        key = (method.upper(), endpoints.route_template(url))
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = LatencyHistogram()
+            histogram.add(seconds)
+
+    def reset(self):
+        with self._lock:
+            self.histograms = {}
+
+    def merge(self, other):
+        with self._lock:
+            for key, histogram in other.histograms.items():
+                self.histograms.setdefault(key, LatencyHistogram()).merge(histogram)
+
+    def to_dict(self):
+        return {f"{method} {route}": histogram.to_dict()
+                for (method, route), histogram in self.histograms.items()}
+
+    @classmethod
+    def from_dict(cls, data):
+        recorder = cls()
+        for key, histogram in data.items():
+            method, route = key.split(" ", 1)
+            recorder.histograms[(method, route)] = LatencyHistogram.from_dict(histogram)
+        return recorder
+
+    def report(self):
+        if not self.histograms:
+            return "Latency: no requests recorded"
+        rows = []
+        for (method, route), histogram in sorted(self.histograms.items(), key=lambda item: (item[0][1], item[0][0])):
+            rows.append([f"{method} {route}", histogram.count] + [
+                f"{value * 1000:.1f}" for value in (
+                    histogram.percentile(50), histogram.percentile(95), histogram.percentile(99), histogram.max)
+            ])
+        return "Latency per route:\n" + format_table(["route", "count", "p50 ms", "p95 ms", "p99 ms", "max ms"], rows)
+
+
+recorder = LatencyRecorder()
+
+
+def report():
+    return recorder.report()
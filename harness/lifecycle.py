@@ -0,0 +1,210 @@
+"""Session-scoped lifecycle of the todo manager server.
+
+One ServerManager per process (see session_server()) makes sure the server is
+up before the first test, and every module shares that warm server:
+
+- if a server already answers on client.API_URL it is reused as is;
+- otherwise, when TODO_SERVER_JAR points at the thingifier jar, the jar is
+  launched once on API_URL's port;
+- readiness is polled with exponential backoff instead of a single GET;
+- the server is shut down exactly once, at process exit, and only if this
+  session launched it (set TODO_SHUTDOWN=always to also stop a server that
+  was already running, as the old per-module __main__ blocks did).
+
+Cold-start time (launch until the port accepts connections) and
+time-to-first-200 are recorded so startup regressions show up in the reports.
+
+Parallel runs use start_instances(n) instead: n servers on consecutive ports
+from API_URL's port (4567, 4568, ...), each reused if already up or launched
+from the jar, all started concurrently, one per worker.
+"""
+import atexit
+import os
+import socket
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit, urlunsplit
+
+import requests
+
+from harness import cassette, client, trace
+
+DEFAULT_READY_TIMEOUT = float(os.environ.get("TODO_READY_TIMEOUT", "5"))
+LAUNCH_READY_TIMEOUT = 60.0
+
+
+class ServerManager:
+    def __init__(self, url=None, jar=None, java="java", ready_timeout=None):
+        self.url = (url or client.API_URL).rstrip("/")
+        self.jar = jar if jar is not None else os.environ.get("TODO_SERVER_JAR")
+        self.java = java
+        self.ready_timeout = ready_timeout
+        self.process = None
+        self.launched = False
+        self.reused = False
+        self.cold_start = None
+        self.time_to_first_200 = None
+        self.error = None
+        self.started = False
+        self.stopped = False
+
+    @property
+    def port(self):
+        return urlsplit(self.url).port or 80
+
+    @property
+    def host(self):
+        return urlsplit(self.url).hostname or "localhost"
+
+    def is_up(self):
+        try:
+            return client.get(self.url, timeout=1).status_code == 200
+        except requests.RequestException:
+            return False
+
+    def port_open(self):
+        try:
+            with socket.create_connection((self.host, self.port), timeout=0.2):
+                return True
+        except OSError:
+            return False
+
+    def launch(self):
+        command = [self.java, "-jar", self.jar, f"-port={self.port}"]
+        self.process = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        self.launched = True
+
+    def start(self):
+        """Reuse or launch the server and wait until it answers 200. Idempotent."""
+        if self.started:
+            if self.error:
+                raise AssertionError(self.error)
+            return self
+        self.started = True
+        atexit.register(self.stop)
+        begin = time.perf_counter()
+        try:
+            if self.is_up():
+                self.reused = True
+                return self
+            if self.jar:
+                self.launch()
+            self.wait_until_ready(begin)
+        except AssertionError as e:
+            self.error = str(e)
+            raise
+        return self
+
+    def wait_until_ready(self, begin, initial_delay=0.05, max_delay=1.0):
+        timeout = self.ready_timeout
+        if timeout is None:
+            timeout = LAUNCH_READY_TIMEOUT if self.launched else DEFAULT_READY_TIMEOUT
+        deadline = begin + timeout
+        delay = initial_delay
+        while True:
+            if self.cold_start is None and self.port_open():
+                self.cold_start = time.perf_counter() - begin
+            if self.is_up():
+                self.time_to_first_200 = time.perf_counter() - begin
+                if self.cold_start is None:
+                    self.cold_start = self.time_to_first_200
+                return
+            if self.process is not None and self.process.poll() is not None:
+                raise AssertionError(f"Server process exited with code {self.process.returncode}")
+            if time.perf_counter() + delay > deadline:
+                raise AssertionError("API is not active or could not connect")
+            trace.sleep(delay)
+            delay = min(delay * 2, max_delay)
+
+    def stop(self):
+        """Shut the server down once; later calls do nothing."""
+        if self.stopped or not self.started:
+            return
+        self.stopped = True
+        if not self.launched and os.environ.get("TODO_SHUTDOWN") != "always":
+            return
+        try:
+            client.get(self.url + "/shutdown", timeout=2)
+        except requests.RequestException:
+            pass
+        if self.process is not None:
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+
+    def report(self):
+        if cassette.replaying():
+            return f"Server {self.url}: replayed from {cassette.current.path}"
+        if self.error:
+            return f"Server {self.url}: not ready ({self.error})"
+        if client.stub is not None and self.url == client.stub.url:
+            return f"Server {self.url}: in-memory stand-in"
+        if self.reused:
+            return f"Server {self.url}: reused warm server"
+        if self.cold_start is None:
+            return f"Server {self.url}: not started"
+        how = "launched" if self.launched else "became ready"
+        return (f"Server {self.url}: {how}, cold start {self.cold_start:.2f}s, "
+                f"first 200 after {self.time_to_first_200:.2f}s")
+
+
+_session = None
+
+
+def session_server():
+    """The process-wide ServerManager, started on first call."""
+    global _session
+    if _session is None:
+        _session = ServerManager()
+    return _session.start()
+
+
+def stop_session_server():
+    if _session is not None:
+        _session.stop()
+
+
+def session_report():
+    return _session.report() if _session is not None else None
+
+
+_instances = {}
+
+
+def instance_urls(count, base_url=None):
+    """URLs of `count` servers on consecutive ports, starting at base_url's port."""
+    parts = urlsplit((base_url or client.API_URL).rstrip("/"))
+    host, port = parts.hostname or "localhost", parts.port or 80
+    return [urlunsplit((parts.scheme, f"{host}:{port + offset}", "", "", "")) for offset in range(count)]
+
+
+def start_instances(count, base_url=None):
+    """Reuse or launch `count` servers on consecutive ports concurrently; returns their URLs.
+
+    Raises AssertionError naming every instance that did not become ready.
+    """
+    urls = instance_urls(count, base_url)
+    managers = [_instances.setdefault(url, ServerManager(url)) for url in urls]
+    errors = []
+    with ThreadPoolExecutor(max_workers=count) as pool:
+        for manager, error in zip(managers, pool.map(_start_quietly, managers)):
+            if error:
+                errors.append(f"{manager.url}: {error}")
+    if errors:
+        raise AssertionError("; ".join(errors))
+    return urls
+
+
+def _start_quietly(manager):
+    try:
+        manager.start()
+    except AssertionError as e:
+        return str(e)
+    return None
+
+
+def instances_report():
+    return [manager.report() for manager in _instances.values()]
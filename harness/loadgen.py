@@ -0,0 +1,159 @@
+"""Asyncio load generator driven by the endpoint catalog.
+
+Opens one keep-alive connection per concurrent client coroutine and has every
+client pick endpoints from harness.endpoints.CATALOG in a random mix, so
+thousands of requests can be in flight from a single process. The report
+gives throughput and p50/p95/p99/max latency per method and route. The
+entities created by the POST endpoints are deleted when the run ends.
+
+    python -m harness.loadgen -c 1000 -d 30
+    python -m harness.loadgen -c 200 -n 50000 --read-only
+"""
+import argparse
+import asyncio
+import json
+import random
+import resource
+import sys
+import time
+from urllib.parse import urlsplit
+
+from harness import client, endpoints, teardown
+from harness.aio import AsyncConnection
+from harness.stats import format_table, summarize
+
+
+class LoadStats:
+    def __init__(self):
+        self.latencies = {}
+        self.errors = {}
+        self.statuses = {}
+
+    def record(self, name, status, latency):
+        self.latencies.setdefault(name, []).append(latency)
+        counts = self.statuses.setdefault(name, {})
+        counts[status] = counts.get(status, 0) + 1
+
+    def record_error(self, name):
+        self.errors[name] = self.errors.get(name, 0) + 1
+
+    @property
+    def total(self):
+        return sum(len(values) for values in self.latencies.values())
+
+    def report(self, elapsed):
+        rows = []
+        for name in sorted(set(self.latencies) | set(self.errors)):
+            summary = summarize(self.latencies.get(name, []))
+            statuses = ",".join(f"{status}x{count}" for status, count in sorted(self.statuses.get(name, {}).items()))
+            rows.append([
+                name, summary["count"], self.errors.get(name, 0), f"{summary['count'] / elapsed:.0f}",
+                f"{summary['p50'] * 1000:.1f}", f"{summary['p95'] * 1000:.1f}",
+                f"{summary['p99'] * 1000:.1f}", f"{summary['max'] * 1000:.1f}", statuses,
+            ])
+        table = format_table(
+            ["endpoint", "requests", "errors", "req/s", "p50 ms", "p95 ms", "p99 ms", "max ms", "statuses"], rows)
+        return f"{table}\n\nTotal: {self.total} requests in {elapsed:.2f}s ({self.total / elapsed:.0f} req/s)"
+
+
+def seed_ids(url, cleanup):
+    """Create the project and todo that the {id} routes point at, deferring them to cleanup."""
+    project = client.post(url + "/projects", json=endpoints.project_payload("Load Project"))
+    todo = client.post(url + "/todos", json=endpoints.todo_payload("Load Todo"))
+    for kind, response in (("projects", project), ("todos", todo)):
+        if response.status_code == 201:
+            cleanup.defer(kind, response.json()["id"])
+    assert project.status_code == 201 and todo.status_code == 201, "Failed to seed load test data"
+    return {"projects": project.json()["id"], "todos": todo.json()["id"]}
+
+
+def raise_file_limit(needed):
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    wanted = needed + 64
+    if soft != resource.RLIM_INFINITY and soft < wanted:
+        limit = wanted if hard == resource.RLIM_INFINITY else min(wanted, hard)
+        resource.setrlimit(resource.RLIMIT_NOFILE, (limit, hard))
+
+
+async def _client(host, port, mix, ids, stats, cleanup, deadline, remaining, rng, timeout):
+    connection = AsyncConnection(host, port)
+    try:
+        while time.perf_counter() < deadline:
+            if remaining is not None:
+                if remaining[0] <= 0:
+                    break
+                remaining[0] -= 1
+            endpoint = rng.choice(mix)
+            start = time.perf_counter()
+            try:
+                status, data = await asyncio.wait_for(
+                    connection.request(endpoint.method, endpoint.path(ids), endpoint.body()), timeout)
+            except (OSError, ConnectionError, asyncio.IncompleteReadError, asyncio.TimeoutError, ValueError):
+                stats.record_error(endpoint.name)
+                await connection.close()
+                continue
+            stats.record(endpoint.name, status, time.perf_counter() - start)
+            if endpoint.creates and status == 201:
+                cleanup.defer(endpoint.creates, json.loads(data)["id"])
+    finally:
+        await connection.close()
+
+
+async def run_load(url, concurrency=100, duration=10.0, total_requests=None, mix=None, seed=None,
+                   timeout=client.DEFAULT_TIMEOUT):
+    """Drive `concurrency` clients until `duration` elapses or `total_requests` are sent.
+
+    Everything the run creates is deleted before it returns.
+    """
+    parts = urlsplit(url)
+    mix = mix or endpoints.CATALOG
+    stats = LoadStats()
+    rng = random.Random(seed)
+    remaining = [total_requests] if total_requests is not None else None
+    cleanup = teardown.TeardownRegistry(url)
+    try:
+        ids = seed_ids(url, cleanup)
+        start = time.perf_counter()
+        deadline = start + (duration if duration else float("inf"))
+        await asyncio.gather(*[
+            _client(parts.hostname, parts.port or 80, mix, ids, stats, cleanup, deadline, remaining,
+                    random.Random(rng.random()), timeout)
+            for _ in range(concurrency)
+        ])
+        elapsed = time.perf_counter() - start
+    finally:
+        cleanup.finish()
+    return stats, elapsed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Concurrent load generator for the todo manager API")
+    parser.add_argument("-c", "--concurrency", type=int, default=100, help="clients / connections in flight")
+    parser.add_argument("-d", "--duration", type=float, default=10.0, help="seconds to run (0: until -n is reached)")
+    parser.add_argument("-n", "--requests", type=int, default=None, help="stop after this many requests")
+    parser.add_argument("--read-only", action="store_true", help="only GET/HEAD endpoints")
+    parser.add_argument("--endpoint", action="append", default=[],
+                        help="only endpoints whose name contains this text (repeatable)")
+    parser.add_argument("--timeout", type=float, default=client.DEFAULT_TIMEOUT, help="per-request timeout in seconds")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--url", default=client.API_URL)
+    args = parser.parse_args(argv)
+
+    mix = [endpoint for endpoint in endpoints.CATALOG
+           if (not args.read_only or endpoint.read_only)
+           and (not args.endpoint or any(text in endpoint.name for text in args.endpoint))]
+    if not mix:
+        print("No endpoints selected")
+        return 2
+    if not args.duration and args.requests is None:
+        print("Give a --duration or a --requests limit")
+        return 2
+    raise_file_limit(args.concurrency)
+    stats, elapsed = asyncio.run(run_load(args.url.rstrip("/"), args.concurrency, args.duration,
+                                          args.requests, mix, args.seed, args.timeout))
+    print(stats.report(elapsed))
+    return 1 if stats.errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
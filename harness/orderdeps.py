@@ -0,0 +1,146 @@
+"""Find tests whose outcome depends on the order the tests run in.
+
+The runners shuffle (harness.runner --random, pytest's --random-order), and
+the Todos tests share /todos/1, so an order bug only shows up for some seeds. This
+tool runs many seeded permutations at once, each on its own fresh server,
+and compares every test's outcome with the default suite order.
+
+Each test that changes outcome is then bisected down to the smallest pair,
+in whichever of the two orders it failed in:
+
+- polluted: it passes alone, so some test before it in the failing order
+  breaks it, which the bisection narrows to one polluter (A then B fails,
+  B alone passes);
+- dependent: it fails alone, so it needs a test that runs before it in the
+  order where it passed (A then B passes, B alone fails).
+
+Every bisection step runs both halves concurrently on fresh servers. A
+fresh server per run needs the in-memory stand-in (TODO_SERVER=stub): a
+server that is already running cannot be reset between runs.
+
+    TODO_SERVER=stub python -m harness.orderdeps -n 8 --seeds 32
+    TODO_SERVER=stub python -m harness.orderdeps Todos_tests/tests_todos_id.py --seeds 100
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+from harness import parallel, suite
+
+
+class OrderDependency:
+    __slots__ = ("victim", "culprit", "kind", "seed")
+
+    def __init__(self, victim, culprit, kind, seed):
+        self.victim = victim
+        self.culprit = culprit
+        self.kind = kind
+        self.seed = seed
+
+    def __str__(self):
+        if self.culprit is None:
+            return f"{self.victim}: {self.kind} (seed {self.seed}), no single culprit found"
+        if self.kind == "polluted":
+            return (f"{self.victim}: fails after {self.culprit} (seed {self.seed})\n"
+                    f"  reproduce: {self.culprit} then {self.victim}")
+        return (f"{self.victim}: fails unless {self.culprit} runs first (seed {self.seed})\n"
+                f"  reproduce: {self.victim} alone")
+
+
+def _failed(result):
+    return result.outcome in ("failed", "error")
+
+
+class Detector:
+    def __init__(self, test_ids, workers):
+        self.test_ids = list(test_ids)
+        self.workers = max(1, workers)
+        self.runs = 0
+
+    def run_sequences(self, sequences):
+        """Run each sequence of test ids on a fresh server; one {test_id: failed} dict per sequence."""
+        outcomes = []
+        for start in range(0, len(sequences), self.workers):
+            wave = sequences[start:start + self.workers]
+            for results in parallel.run_batches(wave, len(wave), pinned=True, grouped=True):
+                outcomes.append({result.test_id: _failed(result) for result in results})
+        self.runs += len(sequences)
+        return outcomes
+
+    def permutation(self, seed):
+        order = list(self.test_ids)
+        random.Random(seed).shuffle(order)
+        return order
+
+    def victims(self, seeds, reference):
+        """(test_id, seed, failing order, passing order) for every test whose outcome differs from the reference."""
+        permutations = [self.permutation(seed) for seed in seeds]
+        found = {}
+        for seed, order, outcome in zip(seeds, permutations, self.run_sequences(permutations)):
+            for test_id, failed in outcome.items():
+                if failed != reference[test_id] and test_id not in found:
+                    found[test_id] = (seed, order, self.test_ids) if failed else (seed, self.test_ids, order)
+        return [(test_id,) + found[test_id] for test_id in found]
+
+    def bisect(self, candidates, victim, fails_with_culprit):
+        """Narrow candidates to the one test whose presence before victim gives fails_with_culprit."""
+        while len(candidates) > 1:
+            half = len(candidates) // 2
+            halves = [candidates[:half], candidates[half:]]
+            outcomes = self.run_sequences([part + [victim] for part in halves])
+            for part, outcome in zip(halves, outcomes):
+                if outcome[victim] == fails_with_culprit:
+                    candidates = part
+                    break
+            else:
+                return None  # only a combination of tests reproduces it
+        return candidates[0] if candidates else None
+
+    def explain(self, victim, seed, failing, passing):
+        alone = self.run_sequences([[victim]])[0][victim]
+        if not alone:
+            # Passes alone: a test before it in the failing order breaks it
+            prefix = failing[:failing.index(victim)]
+            return OrderDependency(victim, self.bisect(prefix, victim, True), "polluted", seed)
+        # Fails alone: a test before it in the passing order sets it up
+        prefix = passing[:passing.index(victim)]
+        return OrderDependency(victim, self.bisect(prefix, victim, False), "dependent", seed)
+
+    def detect(self, seeds):
+        reference = self.run_sequences([self.test_ids])[0]
+        return [self.explain(*victim) for victim in self.victims(seeds, reference)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Find order-dependent tests with seeded permutations")
+    parser.add_argument("modules", nargs="*", help="module paths or directories (default: every test module)")
+    parser.add_argument("-n", "--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--seeds", type=int, default=16, help="number of permutations to run")
+    parser.add_argument("--first-seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    try:
+        args.modules = suite.module_paths(args.modules)
+    except ValueError as e:
+        parser.error(str(e))
+
+    if os.environ.get("TODO_SERVER") != "stub":
+        print("Every run needs a fresh server: set TODO_SERVER=stub")
+        return 2
+    start = time.perf_counter()
+    detector = Detector(suite.discover_tests(args.modules), args.workers)
+    try:
+        dependencies = detector.detect(range(args.first_seed, args.first_seed + args.seeds))
+    except parallel.IsolationError as e:
+        print(f"Cannot run in parallel: {e}")
+        return 2
+    for dependency in dependencies:
+        print(dependency)
+    print(f"\n{len(dependencies)} order-dependent tests in {args.seeds} permutations "
+          f"({detector.runs} runs, {time.perf_counter() - start:.1f}s)")
+    return 1 if dependencies else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,226 @@
+"""Run the test modules in parallel across worker processes.
+
+Each worker is a separate process with its own server, so tests that wipe
+global state (test_get_projects_fail deletes every project, the Todos modules
+unlink /todos/1/...) only see their own worker's data:
+
+- with TODO_SERVER=stub every worker starts its own in-memory stand-in;
+- otherwise worker i gets the server on API_URL's port + i (4567, 4568, ...),
+  reused if it is already up or launched from TODO_SERVER_JAR;
+- or pass one --url per worker explicitly.
+
+Each worker's API_URL (and so every module's API_URL / BASE_URL) is its own
+server's URL.
+
+Modules are handed out from a shared queue, so a worker that finishes early
+picks up the next module. Within a module tests keep their definition order.
+
+    TODO_SERVER=stub python -m harness.parallel -n 8
+    TODO_SERVER_JAR=runTodoManagerRestAPI-1.5.5.jar python -m harness.parallel -n 4
+    python -m harness.parallel -n 2 --url http://localhost:4567 --url http://localhost:4568
+"""
+import argparse
+import multiprocessing
+import os
+import queue
+import sys
+import time
+
+from harness import latency, suite, trace
+
+# Seconds between checks that the workers are still alive while waiting for results
+POLL_INTERVAL = 1.0
+
+
+class IsolationError(Exception):
+    pass
+
+
+def _worker(number, url, tasks, results):
+    # TODO_API_URL was already set when this process was spawned (see _spawn)
+    from harness import lifecycle, teardown
+    try:
+        lifecycle.session_server()
+    except AssertionError:
+        pass  # the tests themselves will report the unreachable server
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        index, batch = task
+        results.put(("started", index, number))
+        batch_results = []
+        for test_id in batch:
+            batch_results.append(suite.run_test(test_id).to_dict())
+        teardown.flush()
+        results.put(("results", index, batch_results))
+    teardown.finish()
+    if trace.tracer is not None:
+        results.put(("trace", None, (trace.tracer.events, trace.tracer.thread_names())))
+        trace.tracer.path = None
+    results.put(("latency", number, latency.recorder.to_dict()))
+
+
+def worker_urls(workers, urls=()):
+    """The server URL of each worker: the given ones, none for stand-ins, else consecutive instances."""
+    urls = list(urls)
+    if urls or workers <= 1 or os.environ.get("TODO_SERVER") == "stub":
+        return urls
+    from harness import lifecycle
+    try:
+        return lifecycle.start_instances(workers)
+    except AssertionError as e:
+        raise IsolationError(
+            f"could not start {workers} server instances ({e}); set TODO_SERVER_JAR, "
+            "start them yourself on consecutive ports, or use TODO_SERVER=stub") from None
+
+
+def check_isolation(workers, urls):
+    if workers > 1 and os.environ.get("TODO_SERVER") != "stub" and len(urls) < workers:
+        raise IsolationError(
+            f"{workers} workers need TODO_SERVER=stub or {workers} server URLs (got {len(urls)}); "
+            "workers sharing a server would wipe each other's data")
+
+
+def _spawn(context, number, url, tasks, results):
+    """Start a worker with TODO_API_URL set to its server.
+
+    The URL has to be in the environment the process starts with: a spawned
+    child re-imports the parent's __main__ (harness.runner imports
+    harness.client) before _worker runs, and client.API_URL is fixed on import.
+    """
+    saved = os.environ.get("TODO_API_URL")
+    if url:
+        os.environ["TODO_API_URL"] = url
+    try:
+        process = context.Process(target=_worker, args=(number, url, tasks, results), daemon=True)
+        process.start()
+    finally:
+        if saved is None:
+            os.environ.pop("TODO_API_URL", None)
+        else:
+            os.environ["TODO_API_URL"] = saved
+    return process
+
+
+def run_batches(batches, workers, urls=(), pinned=False, grouped=False):
+    """Run each batch of test ids, in order, on one of `workers` isolated processes.
+
+    Batches are pulled from a shared queue; with pinned=True batch i runs on
+    worker i instead (one worker per batch, each on a fresh server), for
+    callers that already balanced the batches. Returns every TestResult, or
+    with grouped=True one list of results per batch, in batch order. The
+    workers' latency histograms are merged into harness.latency.recorder.
+    """
+    workers = len(batches) if pinned else max(1, min(workers, len(batches)))
+    urls = worker_urls(workers, urls)
+    check_isolation(workers, urls)
+    context = multiprocessing.get_context("spawn")
+    shared = context.Queue()
+    results = context.Queue()
+    if not pinned:
+        for index, batch in enumerate(batches):
+            shared.put((index, batch))
+    processes = []
+    # Per-worker queues stay referenced here until the workers have unpickled them
+    queues = []
+    for index in range(workers):
+        url = urls[index % len(urls)] if urls else None
+        tasks = shared
+        if pinned:
+            tasks = context.Queue()
+            tasks.put((index, batches[index]))
+            queues.append(tasks)
+        processes.append(_spawn(context, index, url, tasks, results))
+        tasks.put(None)
+
+    collected = [None] * len(batches)
+    running = {}  # worker number -> index of the batch it took last
+    finished = set()
+    while None in collected or len(finished) < workers:
+        try:
+            kind, index, data = results.get(timeout=POLL_INTERVAL)
+        except queue.Empty:
+            _reap(processes, finished, running, batches, collected)
+            continue
+        if kind == "started":
+            running[data] = index
+        elif kind == "results":
+            collected[index] = [suite.TestResult.from_dict(result) for result in data]
+        elif kind == "trace":
+            if trace.tracer is not None:
+                trace.tracer.extend(*data)
+        else:
+            latency.recorder.merge(latency.LatencyRecorder.from_dict(data))
+            finished.add(index)
+    for process in processes:
+        process.join()
+    if grouped:
+        return collected
+    return [result for batch_results in collected for result in batch_results]
+
+
+def _lost(batch, message):
+    return [suite.TestResult(test_id, "error", 0.0, message) for test_id in batch]
+
+
+def _reap(processes, finished, running, batches, collected):
+    """Fail the batch of every worker that died; with no worker left, fail every batch not run."""
+    for number, process in enumerate(processes):
+        if number in finished or process.is_alive():
+            continue
+        finished.add(number)
+        index = running.pop(number, None)
+        if index is not None and collected[index] is None:
+            collected[index] = _lost(batches[index], f"worker exited with code {process.exitcode}")
+    if len(finished) == len(processes):
+        codes = ", ".join(str(process.exitcode) for process in processes)
+        for index, batch in enumerate(batches):
+            if collected[index] is None:
+                collected[index] = _lost(batch, f"every worker exited (codes {codes}) before reporting it")
+
+
+def module_batches(paths=None):
+    """One batch of test ids per module that has tests."""
+    batches = [suite.module_test_ids(path) for path in paths or suite.discover_modules()]
+    return [batch for batch in batches if batch]
+
+
+def run_parallel(paths=None, workers=None, urls=()):
+    """Run whole modules in parallel and return every TestResult."""
+    return run_batches(module_batches(paths), workers or os.cpu_count() or 1, urls)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the test modules across worker processes")
+    parser.add_argument("modules", nargs="*", help="module paths or directories (default: every test module)")
+    parser.add_argument("-n", "--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--url", action="append", default=[], dest="urls",
+                        help="server URL for one worker (repeat once per worker)")
+    args = parser.parse_args(argv)
+    try:
+        args.modules = suite.module_paths(args.modules)
+    except ValueError as e:
+        parser.error(str(e))
+
+    start = time.perf_counter()
+    batches = module_batches(args.modules)
+    # No more workers are started than there are modules
+    workers = max(1, min(args.workers, len(batches)))
+    try:
+        results = run_batches(batches, workers, args.urls)
+    except IsolationError as e:
+        print(f"Cannot run in parallel: {e}")
+        return 2
+    suite.print_results(results)
+    suite.print_summary(results)
+    print(latency.report())
+    from harness import lifecycle
+    for line in lifecycle.instances_report():
+        print(line)
+    print(f"Wall time: {time.perf_counter() - start:.2f}s on {workers} workers")
+    return 0 if all(result.passed for result in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
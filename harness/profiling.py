@@ -0,0 +1,174 @@
+"""Per-test profiling: where does a test's time go?
+
+Each test runs under cProfile while a sampler thread records its call
+stacks. The test's wall time is split into:
+
+- client: Python work in the harness and the test (building requests,
+  urllib3, response.json() decoding, assertions), everything not below;
+- network: time blocked in socket calls, minus the server's share;
+- server: processing time the server reports in Server-Timing headers
+  (the stand-in server sends them; 0 for a server that does not);
+- idle: time.sleep().
+
+The split uses cProfile's own time per socket call, so the profiler's
+overhead lands in the client share; compare tests with each other rather
+than with an unprofiled run. The sampled stacks are written in the folded
+format read by flamegraph.pl, speedscope and inferno, one root per test.
+
+    python -m harness.runner --profile
+    python -m harness.runner Todos_tests --profile --stacks todos.folded
+"""
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+
+from harness import client, suite
+from harness.stats import format_table
+
+DEFAULT_STACKS = "profile.folded"
+SAMPLE_INTERVAL = 0.0005
+
+
+def _is_wait(function):
+    filename, _, name = function
+    return filename == "~" and ("_socket.socket" in name or "getaddrinfo" in name or "select" in name)
+
+
+def _is_idle(function):
+    filename, _, name = function
+    return filename == "~" and name == "<built-in method time.sleep>"
+
+
+class TestProfile:
+    __test__ = False
+    __slots__ = ("test_id", "outcome", "total", "wait", "server", "idle", "requests")
+
+    def __init__(self, test_id, outcome, total, wait, server, idle, requests):
+        self.test_id = test_id
+        self.outcome = outcome
+        self.total = total
+        self.wait = wait
+        self.server = server
+        self.idle = idle
+        self.requests = requests
+
+    @property
+    def network(self):
+        return max(self.wait - self.server, 0.0)
+
+    @property
+    def client(self):
+        return max(self.total - self.wait - self.idle, 0.0)
+
+
+class StackSampler(threading.Thread):
+    """Samples one thread's Python stack every `interval` seconds into folded stacks."""
+
+    def __init__(self, thread_id, root, stacks, interval=SAMPLE_INTERVAL):
+        super().__init__(name="stack-sampler", daemon=True)
+        self.thread_id = thread_id
+        self.root = root
+        self.stacks = stacks
+        self.interval = interval
+        self.done = threading.Event()
+
+    def run(self):
+        while not self.done.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            names = []
+            # Keep the frames below suite.run_test, i.e. the test itself
+            while frame is not None and frame.f_code is not suite.run_test.__code__:
+                names.append(f"{os.path.basename(frame.f_code.co_filename)}:{frame.f_code.co_name}")
+                frame = frame.f_back
+            if frame is not None:
+                self.stacks[";".join([self.root] + names[::-1])] += 1
+
+    def stop(self):
+        self.done.set()
+        self.join()
+
+
+def profile_test(test_id, stacks, functions=None):
+    """Run one test under the profiler; returns (TestResult, TestProfile)."""
+    stats = client.stats()
+    requests_before, server_before = stats.requests, stats.server_time
+    profiler = cProfile.Profile()
+    sampler = StackSampler(threading.get_ident(), test_id.split("::")[-1], stacks)
+    sampler.start()
+    start = time.perf_counter()
+    profiler.enable()
+    try:
+        result = suite.run_test(test_id)
+    finally:
+        profiler.disable()
+        total = time.perf_counter() - start
+        sampler.stop()
+
+    profile = pstats.Stats(profiler, stream=io.StringIO())
+    wait = sum(row[2] for function, row in profile.stats.items() if _is_wait(function))
+    idle = sum(row[2] for function, row in profile.stats.items() if _is_idle(function))
+    if functions is not None:
+        functions.add(profile)
+    return result, TestProfile(test_id, result.outcome, total, wait, stats.server_time - server_before,
+                               idle, stats.requests - requests_before)
+
+
+def run_profiled(test_ids, stacks_path=DEFAULT_STACKS):
+    """Profile each test in turn; returns (results, profiles, aggregated pstats.Stats)."""
+    stacks = Counter()
+    functions = pstats.Stats(stream=io.StringIO())
+    results, profiles = [], []
+    switch_interval = sys.getswitchinterval()
+    # Let the sampler thread in at least as often as it wants to sample
+    sys.setswitchinterval(SAMPLE_INTERVAL)
+    try:
+        for test_id in test_ids:
+            result, profile = profile_test(test_id, stacks, functions)
+            results.append(result)
+            profiles.append(profile)
+    finally:
+        sys.setswitchinterval(switch_interval)
+    if stacks_path:
+        with open(stacks_path, "w") as f:
+            for stack, count in sorted(stacks.items()):
+                f.write(f"{stack} {count}\n")
+    return results, profiles, functions
+
+
+def format_profiles(profiles, limit=None):
+    """Tests sorted by client time, slowest first."""
+    ordered = sorted(profiles, key=lambda profile: -profile.client)[:limit]
+    rows = []
+    for profile in ordered:
+        share = profile.client / profile.total if profile.total else 0.0
+        rows.append([profile.test_id.split("/")[-1], profile.requests] + [
+            f"{value * 1000:.2f}" for value in (profile.total, profile.client, profile.network,
+                                                 profile.server, profile.idle)
+        ] + [f"{share:.0%}"])
+    totals = [sum(getattr(profile, name) for profile in profiles)
+              for name in ("total", "client", "network", "server", "idle")]
+    rows.append(["total", sum(profile.requests for profile in profiles)]
+                + [f"{value * 1000:.2f}" for value in totals]
+                + [f"{totals[1] / totals[0]:.0%}" if totals[0] else "-"])
+    return format_table(["test", "requests", "total ms", "client ms", "network ms", "server ms",
+                         "idle ms", "client %"], rows)
+
+
+def format_functions(functions, limit=15):
+    """The Python functions with the most own time across all profiled tests."""
+    rows = []
+    ranked = sorted(functions.stats.items(), key=lambda item: -item[1][2])
+    for function, (_, calls, own, cumulative, _) in ranked:
+        if _is_wait(function) or _is_idle(function):
+            continue
+        filename, line, name = function
+        where = name if filename == "~" else f"{os.path.basename(filename)}:{line}({name})"
+        rows.append([where, calls, f"{own * 1000:.2f}", f"{cumulative * 1000:.2f}"])
+        if len(rows) == limit:
+            break
+    return format_table(["client function", "calls", "own ms", "cumulative ms"], rows)
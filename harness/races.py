@@ -0,0 +1,394 @@
+"""Concurrent link churn with a linearizability check of the outcome.
+
+The relationship routes (/projects/:id/tasks, /todos/:id/tasksof,
+/projects/:id/categories, /todos/:id/categories) are only ever changed by
+one client at a time in the tests. This tool creates one project, a few
+todos and categories, and has many workers add, remove and read the same
+few links at once, from both ends of the tasks/tasksof relationship, while
+one more client deletes the project halfway through. Every operation is
+recorded with its invocation and completion time and its outcome.
+
+Each link is a register in the model: present or absent, and gone for good
+once the project it belongs to is deleted. Adds answer 201, removes 200 if
+the link was there and 404 if not, reads show it or not, and every
+operation on a deleted project's link answers 404. Linearizability is
+local, so each link's history is checked on its own (Wing & Gong search):
+is there an order of the operations, consistent with their real-time order,
+in which every answer matches the model? The final link lists are read
+after the churn and are part of the history. A failing link is reported as:
+
+- lost: the final read misses a link that every valid order ends with;
+- dangling: the final read shows a link that cannot exist (e.g. to the
+  deleted project);
+- non-linearizable: some answer during the churn matches no valid order.
+
+An add from the todo side that races the delete (POST /todos/:id/tasksof
+with the deleted project's id) makes the server create a new project, as
+it does for any unknown id; these are counted as phantom projects, not
+violations. The tool also reports the link churn throughput per operation.
+
+    python -m harness.races -w 32 -d 10
+    TODO_SERVER=stub python -m harness.races -w 64 -d 5 --history races.json
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from urllib.parse import urlsplit
+
+from harness import aio, client, endpoints, lifecycle, teardown
+from harness.stats import format_table, summarize
+
+INFINITY = float("inf")
+INITIAL = (False, True)  # (link present, parent project alive)
+
+
+class Op:
+    __slots__ = ("worker", "action", "key", "side", "invoke", "complete", "status", "observed", "created")
+
+    def __init__(self, worker, action, key, side, invoke, complete, status, observed=None, created=None):
+        self.worker = worker
+        self.action = action
+        self.key = key
+        self.side = side
+        self.invoke = invoke
+        self.complete = complete
+        self.status = status
+        self.observed = observed
+        self.created = created
+
+    def to_dict(self):
+        data = {name: getattr(self, name) for name in self.__slots__}
+        data["key"] = "/".join(self.key) if self.key else None
+        data["complete"] = None if self.complete == INFINITY else self.complete
+        return data
+
+
+def step(state, op):
+    """The states the model can be in after op, given the answer op got (empty: impossible)."""
+    present, alive = state
+    status = op.status
+    if op.action == "read":
+        return [state] if op.observed == (present and alive) else []
+    if op.action == "delete":
+        if status is None:
+            return [state, (False, False)]
+        if alive:
+            return [(False, False)] if status == 200 else []
+        return [state] if status == 404 else []
+    if op.action == "add":
+        if not alive:
+            # A todo-side add of the deleted project creates a new project instead
+            phantom = status == 201 and op.created is not None and op.side == "target"
+            return [state] if status in (None, 404) or phantom else []
+        if status is None:
+            return [state, (True, True)]
+        return [(True, True)] if status == 201 and op.created is None else []
+    # remove
+    if status is None:
+        return [state, (False, alive)]
+    if alive and present:
+        return [(False, True)] if status == 200 else []
+    return [state] if status == 404 else []
+
+
+def _search(ops, initial, collect):
+    """Wing & Gong search over one link's history; the end states reached (first one only unless collect)."""
+    ops = sorted(ops, key=lambda op: op.invoke)
+    full = (1 << len(ops)) - 1
+    stack = [(0, initial)]
+    seen = set()
+    ends = set()
+    while stack:
+        done, state = stack.pop()
+        if done == full:
+            ends.add(state)
+            if not collect:
+                return ends
+            continue
+        if (done, state) in seen:
+            continue
+        seen.add((done, state))
+        # Ops that may go next: invoked before every other pending op completed
+        first = (~done & (done + 1)).bit_length() - 1
+        horizon = INFINITY
+        candidates = []
+        for index in range(first, len(ops)):
+            if done >> index & 1:
+                continue
+            if ops[index].invoke > horizon:
+                break
+            candidates.append(index)
+            horizon = min(horizon, ops[index].complete)
+        for index in candidates:
+            if ops[index].invoke <= horizon:
+                for next_state in step(state, ops[index]):
+                    stack.append((done | 1 << index, next_state))
+    return ends
+
+
+def linearizable(ops, initial=INITIAL):
+    return bool(_search(ops, initial, collect=False))
+
+
+def classify(ops, initial=INITIAL):
+    """lost, dangling or non-linearizable, for a history that is not linearizable."""
+    final = [op for op in ops if op.action == "read" and op.worker == "final"]
+    churn = [op for op in ops if not (op.action == "read" and op.worker == "final")]
+    if not final or not linearizable(churn, initial):
+        return "non-linearizable"
+    possible = {present and alive for present, alive in _search(churn, initial, collect=True)}
+    return "dangling" if final[0].observed and True not in possible else "lost"
+
+
+class Workload:
+    """The entities under churn and the requests for each link operation."""
+
+    def __init__(self, project, todos, categories):
+        self.project = project
+        self.todos = todos
+        self.categories = categories
+        self.keys = ([("projects", project, "tasks", todo) for todo in todos]
+                     + [("projects", project, "categories", category) for category in categories]
+                     + [("todos", todo, "categories", category) for todo in todos for category in categories])
+
+    def depends_on_project(self, key):
+        return key[0] == "projects"
+
+    def request(self, action, key, side):
+        """(method, path, body) of an add or remove from the owner or, for tasks, the target side."""
+        kind, owner, rel, target = key
+        if side == "target":
+            kind, owner, rel, target = "todos", target, "tasksof", owner
+        if action == "add":
+            return "POST", f"/{kind}/{owner}/{rel}", {"id": target}
+        return "DELETE", f"/{kind}/{owner}/{rel}/{target}", None
+
+    def reads(self, rng):
+        """(path, keys it shows, id of each key's other end in the list) for a random list read."""
+        todo = rng.choice(self.todos)
+        choices = [
+            (f"/projects/{self.project}/tasks", [key for key in self.keys if key[2] == "tasks"], 3),
+            (f"/projects/{self.project}/categories",
+             [key for key in self.keys if key[0] == "projects" and key[2] == "categories"], 3),
+            (f"/todos/{todo}/tasksof", [key for key in self.keys if key[2] == "tasks" and key[3] == todo], 1),
+            (f"/todos/{todo}/categories", [key for key in self.keys if key[0] == "todos" and key[1] == todo], 3),
+        ]
+        return rng.choice(choices)
+
+    def final_reads(self):
+        reads = [(f"/projects/{self.project}/tasks", [key for key in self.keys if key[2] == "tasks"], 3),
+                 (f"/projects/{self.project}/categories",
+                  [key for key in self.keys if key[0] == "projects" and key[2] == "categories"], 3)]
+        for todo in self.todos:
+            reads.append((f"/todos/{todo}/categories",
+                          [key for key in self.keys if key[0] == "todos" and key[1] == todo], 3))
+        return reads
+
+
+def _now(start):
+    return time.perf_counter_ns() - start
+
+
+def _listed_ids(content):
+    try:
+        data = json.loads(content)
+    except ValueError:
+        return set()
+    return {entity["id"] for entities in data.values() if isinstance(entities, list) for entity in entities}
+
+
+def _created_id(content):
+    """Id of the entity a relationship POST created (linking an existing one answers with no body)."""
+    try:
+        return json.loads(content)["id"] if content else None
+    except (ValueError, KeyError, TypeError):
+        return None
+
+
+async def _read(connection, workload, worker, path, keys, end, start, history):
+    invoke = _now(start)
+    status, content = await connection.request("GET", path)
+    complete = _now(start)
+    ids = _listed_ids(content) if status == 200 else set()
+    for key in keys:
+        history.append(Op(worker, "read", key, "owner", invoke, complete, status, observed=key[end] in ids))
+
+
+async def _worker(host, port, workload, worker, deadline, seed, read_share, history, timeout):
+    rng = random.Random(seed)
+    connection = aio.AsyncConnection(host, port)
+    start = history.start
+    try:
+        while time.perf_counter() < deadline:
+            if rng.random() < read_share:
+                path, keys, end = workload.reads(rng)
+                try:
+                    await asyncio.wait_for(_read(connection, workload, worker, path, keys, end, start, history.ops),
+                                           timeout)
+                except (OSError, ConnectionError, asyncio.IncompleteReadError, asyncio.TimeoutError, ValueError):
+                    await connection.close()
+                continue
+            key = rng.choice(workload.keys)
+            action = rng.choice(("add", "remove"))
+            side = rng.choice(("owner", "target")) if key[2] == "tasks" else "owner"
+            method, path, body = workload.request(action, key, side)
+            invoke = _now(start)
+            try:
+                status, content = await asyncio.wait_for(connection.request(method, path, body), timeout)
+            except (OSError, ConnectionError, asyncio.IncompleteReadError, asyncio.TimeoutError, ValueError):
+                # Unknown outcome: it may or may not have taken effect, at any time from now on
+                history.ops.append(Op(worker, action, key, side, invoke, INFINITY, None))
+                await connection.close()
+                continue
+            created = _created_id(content)
+            history.ops.append(Op(worker, action, key, side, invoke, _now(start), status, created=created))
+    finally:
+        await connection.close()
+
+
+async def _deleter(host, port, workload, delay, history):
+    await asyncio.sleep(delay)
+    connection = aio.AsyncConnection(host, port)
+    try:
+        invoke = _now(history.start)
+        status, _ = await connection.request("DELETE", f"/projects/{workload.project}")
+        history.ops.append(Op("deleter", "delete", None, "owner", invoke, _now(history.start), status))
+    finally:
+        await connection.close()
+
+
+class History:
+    def __init__(self):
+        self.start = time.perf_counter_ns()
+        self.ops = []
+
+
+async def run_churn(url, workload, workers, duration, delete_at=0.5, read_share=0.2, seed=0,
+                    timeout=client.DEFAULT_TIMEOUT, history=None):
+    """Churn the workload's links and return the History (filled in place when one is given)."""
+    parts = urlsplit(url)
+    host, port = parts.hostname, parts.port or 80
+    history = history or History()
+    deadline = time.perf_counter() + duration
+    tasks = [_worker(host, port, workload, worker, deadline, seed * 1000 + worker, read_share, history, timeout)
+             for worker in range(workers)]
+    if delete_at is not None:
+        tasks.append(_deleter(host, port, workload, duration * delete_at, history))
+    await asyncio.gather(*tasks)
+    connection = aio.AsyncConnection(host, port)
+    try:
+        for path, keys, end in workload.final_reads():
+            await _read(connection, workload, "final", path, keys, end, history.start, history.ops)
+    finally:
+        await connection.close()
+    return history
+
+
+def histories(workload, ops):
+    """Each link's sub-history; the project delete belongs to every link of the project."""
+    per_key = {key: [] for key in workload.keys}
+    deletes = [op for op in ops if op.action == "delete"]
+    for op in ops:
+        if op.key is not None:
+            per_key[op.key].append(op)
+    for key in workload.keys:
+        if workload.depends_on_project(key):
+            per_key[key].extend(deletes)
+    return per_key
+
+
+def _create(url, kind, payload, cleanup):
+    entity_id = client.post(f"{url}/{kind}", json=payload).json()["id"]
+    cleanup.defer(kind, entity_id)
+    return entity_id
+
+
+def setup(url, todos, categories, cleanup):
+    """Create the race entities, registering each with cleanup as soon as it exists."""
+    project = _create(url, "projects", endpoints.project_payload("Race Project"), cleanup)
+    todo_ids = [_create(url, "todos", endpoints.todo_payload(f"Race Todo {i}"), cleanup) for i in range(todos)]
+    category_ids = [_create(url, "categories", endpoints.category_payload(f"Race Category {i}"), cleanup)
+                    for i in range(categories)]
+    return Workload(project, todo_ids, category_ids)
+
+
+def format_throughput(ops, duration):
+    rows = []
+    for action in ("add", "remove", "read", "delete"):
+        done = [op for op in ops if op.action == action and op.worker != "final" and op.complete != INFINITY]
+        if action == "read":
+            # One list read records an op per link it shows
+            done = list({(op.worker, op.invoke): op for op in done}.values())
+        if not done:
+            continue
+        summary = summarize([(op.complete - op.invoke) / 1e9 for op in done])
+        statuses = {}
+        for op in done:
+            statuses[op.status] = statuses.get(op.status, 0) + 1
+        rows.append([action, len(done), f"{len(done) / duration:.0f}", f"{summary['p50'] * 1000:.2f}",
+                     f"{summary['p99'] * 1000:.2f}",
+                     ",".join(f"{status}x{count}" for status, count in sorted(statuses.items(), key=str))])
+    return format_table(["operation", "count", "per s", "p50 ms", "p99 ms", "statuses"], rows)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Churn the same links from many workers and check the outcome")
+    parser.add_argument("-w", "--workers", type=int, default=32)
+    parser.add_argument("-d", "--duration", type=float, default=5.0, help="seconds of churn")
+    parser.add_argument("--todos", type=int, default=3)
+    parser.add_argument("--categories", type=int, default=2)
+    parser.add_argument("--delete-at", type=float, default=0.5,
+                        help="when to delete the project, as a fraction of the duration (negative: never)")
+    parser.add_argument("--read-share", type=float, default=0.2, help="share of the operations that are reads")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--history", default="", help="write the operation history to this JSON file")
+    parser.add_argument("--url", default=client.API_URL)
+    args = parser.parse_args(argv)
+
+    url = args.url.rstrip("/")
+    if url == client.API_URL:
+        lifecycle.session_server()
+    cleanup = teardown.TeardownRegistry(url)
+    history = None
+    try:
+        workload = setup(url, args.todos, args.categories, cleanup)
+        delete_at = args.delete_at if args.delete_at >= 0 else None
+        history = History()
+        asyncio.run(run_churn(url, workload, args.workers, args.duration, delete_at, args.read_share,
+                              args.seed, history=history))
+    finally:
+        # Also when the churn fails or is interrupted: the phantoms recorded so far
+        phantoms = {op.created for op in (history.ops if history else ())
+                    if op.created is not None and op.action == "add"}
+        for project in phantoms:
+            cleanup.defer("projects", project)
+        cleanup.finish()
+
+    start = time.perf_counter()
+    problems = []
+    for key, ops in histories(workload, history.ops).items():
+        if not linearizable(ops):
+            problems.append((key, classify(ops), len(ops)))
+    checked = time.perf_counter() - start
+
+    print(format_throughput(history.ops, args.duration))
+    print(f"\n{len(history.ops)} operations on {len(workload.keys)} links from {args.workers} workers, "
+          f"checked in {checked:.2f}s")
+    if phantoms:
+        print(f"{len(phantoms)} phantom projects created by todo-side adds racing the delete")
+    for key, kind, count in problems:
+        print(f"FAILED: {'/'.join(key)}: {kind} ({count} operations)")
+    if not problems:
+        print("Every link history is linearizable: no lost or dangling links")
+    if args.history:
+        with open(args.history, "w") as f:
+            json.dump({"project": workload.project, "todos": workload.todos, "categories": workload.categories,
+                       "ops": [op.to_dict() for op in history.ops]}, f)
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
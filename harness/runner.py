@@ -0,0 +1,187 @@
+"""One runner for every test module.
+
+It discovers the test_*.py and tests_*.py modules, runs each test exactly
+once against one warm server and one connection pool, prints the usual
+PASSED/FAILED lines and summary, and writes a JSON results file.
+
+Arguments select what to run: module paths, directories or single test ids
+("<dir>/<file>.py::<function>"); nothing means every module. With -n above
+1 the tests are sharded across workers by harness.scheduler instead, and
+with --profile each test runs under harness.profiling. --restore test (or
+module) puts the server's data back after every test (or module) with
+harness.snapshot.
+
+    python -m harness.runner
+    python -m harness.runner Projects_tests/test_projects.py --random --seed 42
+    python -m harness.runner -k categories --results results.json
+    TODO_SERVER=stub python -m harness.runner -n 4
+    python -m harness.runner --profile --stacks profile.folded
+    python -m harness.runner Projects_tests --restore test
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+from harness import (cassette, client, latency, lifecycle, parallel, profiling, scheduler, snapshot, suite,
+                     teardown, trace)
+
+DEFAULT_RESULTS = "results.json"
+
+
+def select(arguments, keyword=None, root=suite.ROOT):
+    """Test ids named by module paths, directories or test ids, filtered by keyword."""
+    if not arguments:
+        test_ids = suite.discover_tests(root=root)
+    else:
+        test_ids = []
+        for argument in arguments:
+            path, _, name = argument.partition("::")
+            path = os.path.relpath(os.path.abspath(path), root).replace(os.sep, "/")
+            if name:
+                test_ids.append(f"{path}::{name}")
+            elif os.path.isdir(os.path.join(root, path)):
+                test_ids.extend(test_id for test_id in suite.discover_tests(root=root)
+                                if test_id.startswith(path.rstrip("/") + "/"))
+            else:
+                test_ids.extend(suite.module_test_ids(path, root))
+    if keyword:
+        test_ids = [test_id for test_id in test_ids if keyword in test_id]
+    return list(dict.fromkeys(test_ids))
+
+
+def run_serial(test_ids, restore=None):
+    """Run the tests once each in this process, flushing deferred cleanup per module.
+
+    With restore="test" or "module" the snapshot taken before the first test
+    is restored after each test or module instead.
+    """
+    if restore:
+        snapshot.capture(client.API_URL)
+    results = []
+    module = None
+    for test_id in test_ids:
+        path = test_id.split("::")[0]
+        if module is not None and path != module:
+            if restore == "module":
+                teardown.discard()
+                snapshot.restore()
+            else:
+                teardown.flush()
+        module = path
+        results.append(suite.run_test(test_id))
+        if restore == "test":
+            teardown.discard()
+            snapshot.restore()
+    if restore:
+        teardown.discard()
+        snapshot.restore()
+    teardown.finish()
+    return results
+
+
+def write_results(results, path, elapsed, seed=None, workers=1):
+    counts = {}
+    for result in results:
+        counts[result.outcome] = counts.get(result.outcome, 0) + 1
+    data = {
+        "summary": {
+            "total": len(results),
+            "passed": counts.get("passed", 0),
+            "failed": counts.get("failed", 0),
+            "error": counts.get("error", 0),
+            "skipped": counts.get("skipped", 0),
+            "duration": round(elapsed, 6),
+            "server": client.API_URL,
+            "workers": workers,
+            "seed": seed,
+        },
+        "tests": [result.to_dict() for result in results],
+    }
+    with open(path, "w") as f:
+        json.dump(data, f, indent=2)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the todo manager tests once each")
+    parser.add_argument("tests", nargs="*", help="module paths, directories or test ids (default: all)")
+    parser.add_argument("-k", dest="keyword", help="only tests whose id contains this text")
+    parser.add_argument("--random", action="store_true", help="shuffle the tests (serial runs only)")
+    parser.add_argument("--seed", type=int, help="seed for --random (printed when not given)")
+    parser.add_argument("-n", "--workers", type=int, default=1)
+    parser.add_argument("--url", action="append", default=[], dest="urls",
+                        help="server URL for one worker (repeat once per worker)")
+    parser.add_argument("--results", default=DEFAULT_RESULTS, help="JSON results file ('' to skip)")
+    parser.add_argument("--profile", action="store_true",
+                        help="profile each test: client, network, server and idle time (serial runs only)")
+    parser.add_argument("--stacks", default=profiling.DEFAULT_STACKS,
+                        help="folded stack file written by --profile ('' to skip)")
+    parser.add_argument("--restore", choices=("test", "module"),
+                        help="restore the server's data after every test or module (serial runs only)")
+    parser.add_argument("-q", "--quiet", action="store_true", help="only print failures and the summary")
+    args = parser.parse_args(argv)
+    if args.workers > 1 and (args.profile or args.restore):
+        parser.error("--profile and --restore only work in serial runs, not with -n")
+
+    test_ids = select(args.tests, args.keyword)
+    seed = None
+    if args.random:
+        seed = args.seed if args.seed is not None else random.randrange(1 << 32)
+        random.Random(seed).shuffle(test_ids)
+        print(f"Random order, seed {seed}")
+
+    history = scheduler.TimingHistory().load()
+    start = time.perf_counter()
+    if args.workers > 1:
+        shards, _ = scheduler.plan(test_ids, args.workers, history)
+        try:
+            results = parallel.run_batches(shards, len(shards), args.urls, pinned=True)
+        except parallel.IsolationError as e:
+            print(f"Cannot run in parallel: {e}")
+            return 2
+    else:
+        try:
+            lifecycle.session_server()
+        except AssertionError as e:
+            print(f"System not ready: {e}")
+            print("Tests skipped: API is not running or could not be reached.")
+            return 2
+        if args.profile:
+            results, profiles, functions = profiling.run_profiled(test_ids, args.stacks)
+            teardown.finish()
+        else:
+            results = run_serial(test_ids, None if cassette.replaying() else args.restore)
+    elapsed = time.perf_counter() - start
+    if not cassette.replaying():
+        history.update(results)
+        history.save()
+
+    suite.print_results([result for result in results if not (args.quiet and result.passed)])
+    suite.print_summary(results)
+    if args.workers <= 1:
+        print(lifecycle.session_report())
+        print(f"Connections: {client.stats()}")
+        print(teardown.report())
+        if snapshot.current is not None:
+            print(snapshot.report())
+    print(latency.report())
+    if trace.tracer is not None:
+        print(trace.report())
+    if args.profile and args.workers <= 1:
+        print()
+        print(profiling.format_profiles(profiles))
+        print()
+        print(profiling.format_functions(functions))
+        if args.stacks:
+            print(f"Folded stacks written to {args.stacks}")
+    print(f"Ran {len(results)} tests in {elapsed:.2f}s")
+    if args.results:
+        write_results(results, args.results, elapsed, seed, max(args.workers, 1))
+        print(f"Results written to {args.results}")
+    return 0 if all(result.passed for result in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
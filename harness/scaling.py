@@ -0,0 +1,217 @@
+"""How do GET /todos and GET /projects scale with the collection size?
+
+The list tests only ever see a handful of entities. This benchmark grows
+each collection through the given sizes (10, 100, 1k, 10k, 100k by default)
+with harness.seeding, and at each size times `repeats` full GETs of the list
+and records the response size. It then fits an empirical complexity curve:
+
+- the exponent k of latency ~ n^k, from a log-log fit over the sizes of at
+  least --fit-from entities (below that the fixed per-request cost hides
+  the growth), plus the local exponent between consecutive sizes;
+- the best of the models a + b*f(n) for f = 1, log n, n, n log n, n^2.
+
+An exponent above 1 + --tolerance is flagged as worse than linear and fails
+the run. The fit also gives the size at which one GET would exceed the
+latency budget (--budget-ms). When fewer than two sizes reach --fit-from,
+the exponent is reported as unreliable and neither the usable size nor a
+verdict is given. The seeded entities are deleted at the end.
+
+    python -m harness.scaling
+    TODO_SERVER=stub python -m harness.scaling --sizes 10 100 1000 10000 --kind todos
+"""
+import argparse
+import json
+import math
+import sys
+import time
+
+from harness import aio, client, lifecycle, seeding, teardown
+from harness.stats import format_table, percentile
+
+DEFAULT_SIZES = (10, 100, 1000, 10000, 100000)
+KINDS = ("todos", "projects")
+MODELS = {
+    "O(1)": lambda n: 1.0,
+    "O(log n)": lambda n: math.log(n),
+    "O(n)": lambda n: float(n),
+    "O(n log n)": lambda n: n * math.log(n),
+    "O(n^2)": lambda n: float(n) * n,
+}
+
+
+class ScalePoint:
+    __slots__ = ("kind", "size", "latencies", "bytes")
+
+    def __init__(self, kind, size, latencies, size_bytes):
+        self.kind = kind
+        self.size = size
+        self.latencies = sorted(latencies)
+        self.bytes = size_bytes
+
+    @property
+    def median(self):
+        return percentile(self.latencies, 50)
+
+    def to_dict(self):
+        return {"kind": self.kind, "size": self.size, "median": self.median, "min": self.latencies[0],
+                "bytes": self.bytes}
+
+
+class Fit:
+    """exponent is None when fewer than two sizes were large enough to fit it."""
+
+    __slots__ = ("kind", "exponent", "model", "points")
+
+    def __init__(self, kind, exponent, model, points):
+        self.kind = kind
+        self.exponent = exponent
+        self.model = model
+        self.points = points
+
+    def usable_size(self, budget):
+        """Largest collection one GET can list within budget seconds, extrapolated along n^exponent."""
+        last = self.points[-1]
+        if self.exponent <= 0:
+            return math.inf
+        return last.size * (budget / last.median) ** (1 / self.exponent)
+
+
+def count(url, kind):
+    return len(client.get(f"{url}/{kind}").json()[kind])
+
+
+def grow(url, kind, existing, size, concurrency, cleanup):
+    """Seed the collection up to size entities, deferring them to cleanup; returns the new size."""
+    missing = size - existing
+    if missing <= 0:
+        return existing
+    created = seeding.seed(**{kind: missing}, url=url, concurrency=concurrency, prefix="Scale")
+    for entity_id in getattr(created, kind):
+        cleanup.defer(kind, entity_id)
+    return size
+
+
+def measure(url, kind, size, repeats):
+    response = client.get(f"{url}/{kind}")  # warm-up
+    latencies = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        response = client.get(f"{url}/{kind}")
+        latencies.append(time.perf_counter() - start)
+        assert response.status_code == 200, f"GET /{kind} returned {response.status_code}"
+    return ScalePoint(kind, size, latencies, len(response.content))
+
+
+def least_squares(xs, ys):
+    """(intercept, slope) of the least-squares line through the points."""
+    mean_x, mean_y = sum(xs) / len(xs), sum(ys) / len(ys)
+    spread = sum((x - mean_x) ** 2 for x in xs)
+    slope = sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / spread if spread else 0.0
+    return mean_y - slope * mean_x, slope
+
+
+def power_exponent(points):
+    """k in latency ~ n^k, from a least-squares fit on log-log scale."""
+    if len(points) < 2:
+        return 0.0
+    return least_squares([math.log(point.size) for point in points],
+                         [math.log(point.median) for point in points])[1]
+
+
+def best_model(points):
+    """Name of the model a + b*f(n), b >= 0, with the smallest squared error."""
+    errors = {}
+    for name, model in MODELS.items():
+        xs = [model(point.size) for point in points]
+        ys = [point.median for point in points]
+        intercept, slope = least_squares(xs, ys)
+        if slope < 0:
+            intercept, slope = sum(ys) / len(ys), 0.0
+        errors[name] = sum((intercept + slope * x - y) ** 2 for x, y in zip(xs, ys))
+    return min(errors, key=errors.get)
+
+
+def fit(kind, points, fit_from):
+    large = [point for point in points if point.size >= fit_from]
+    exponent = power_exponent(large) if len(large) >= 2 else None
+    return Fit(kind, exponent, best_model(points), points)
+
+
+def run_scaling(url, kinds, sizes, repeats=5, concurrency=aio.DEFAULT_CONCURRENCY, fit_from=1000):
+    """Grow each collection through the sizes; returns {kind: Fit}."""
+    fits = {}
+    cleanup = teardown.TeardownRegistry(url, concurrency)
+    try:
+        for kind in kinds:
+            existing = count(url, kind)
+            points = []
+            for size in sorted(sizes):
+                existing = grow(url, kind, existing, size, concurrency, cleanup)
+                points.append(measure(url, kind, existing, repeats))
+                print(f"  {kind}: {existing} entities, median {points[-1].median * 1000:.2f}ms, "
+                      f"{points[-1].bytes} bytes", flush=True)
+            fits[kind] = fit(kind, points, fit_from)
+            # Back to the original size before the next collection is grown
+            cleanup.finish()
+    finally:
+        cleanup.finish()
+    return fits
+
+
+def format_points(fits):
+    rows = []
+    for kind, result in fits.items():
+        previous = None
+        for point in result.points:
+            local = "-"
+            if previous is not None and point.size > previous.size:
+                local = f"{math.log(point.median / previous.median) / math.log(point.size / previous.size):.2f}"
+            rows.append([f"GET /{kind}", point.size, f"{point.latencies[0] * 1000:.2f}",
+                         f"{point.median * 1000:.2f}", point.bytes, f"{point.bytes / max(point.size, 1):.0f}", local])
+            previous = point
+    return format_table(["route", "entities", "min ms", "median ms", "bytes", "bytes/entity", "local exponent"], rows)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure how the list endpoints scale with the collection size")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES))
+    parser.add_argument("--kind", action="append", choices=KINDS, dest="kinds", help="collection (default: both)")
+    parser.add_argument("--repeats", type=int, default=5, help="timed GETs per size")
+    parser.add_argument("--fit-from", type=int, default=1000, help="smallest size used for the exponent fit")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed exponent above 1 (linear)")
+    parser.add_argument("--budget-ms", type=float, default=500.0, help="latency one list GET may take")
+    parser.add_argument("-c", "--concurrency", type=int, default=aio.DEFAULT_CONCURRENCY)
+    parser.add_argument("--output", default="", help="write the points and fits to this JSON file")
+    parser.add_argument("--url", default=client.API_URL)
+    args = parser.parse_args(argv)
+
+    url = args.url.rstrip("/")
+    if url == client.API_URL:
+        lifecycle.session_server()
+    fits = run_scaling(url, args.kinds or KINDS, args.sizes, args.repeats, args.concurrency, args.fit_from)
+
+    print()
+    print(format_points(fits))
+    print()
+    worse = []
+    for kind, result in fits.items():
+        if result.exponent is None:
+            print(f"GET /{kind}: fit unreliable, fewer than two sizes of at least {args.fit_from} entities "
+                  f"(best model {result.model}); no usable size or verdict")
+            continue
+        usable = result.usable_size(args.budget_ms / 1000)
+        verdict = "worse than linear" if result.exponent > 1 + args.tolerance else "ok"
+        print(f"GET /{kind}: latency ~ n^{result.exponent:.2f} (best model {result.model}), "
+              f"~{usable:,.0f} entities within {args.budget_ms:g}ms: {verdict}")
+        if verdict != "ok":
+            worse.append(kind)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"url": url, "fits": {kind: {"exponent": result.exponent, "model": result.model,
+                                                   "points": [point.to_dict() for point in result.points]}
+                                            for kind, result in fits.items()}}, f, indent=1)
+    return 1 if worse else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,166 @@
+"""Duration-aware sharding of the tests across parallel workers.
+
+Test costs differ by orders of magnitude: test_get_projects_incorrect_categories
+sleeps a second and creates and deletes a project, while a 405 check is one
+request. Splitting by module leaves one worker with the slow module while
+the others sit idle. Instead, the scheduler keeps each test's duration from
+earlier runs and bin-packs the tests onto the workers longest first, each
+test going to the currently least loaded worker. Each worker then runs its
+tests in suite order on its own isolated server. Modules in WHOLE_MODULE_DIRS
+are packed as one unit: the Todos tests build on each other's changes to
+/todos/1 (test_delete_categories_1_fail expects the link that
+test_delete_categories_1_success removed), so they must share a server.
+
+The history (TODO_TIMINGS, default .test_timings.json at the repository
+root) is refreshed after every scheduled run and every pytest session, as a
+moving average so one slow run does not reshuffle everything. Tests without
+history are estimated at the median known duration.
+
+    TODO_SERVER=stub python -m harness.scheduler -n 4
+    TODO_SERVER=stub python -m harness.scheduler -n 4 --plan
+"""
+import argparse
+import heapq
+import json
+import os
+import sys
+import time
+
+from harness import latency, parallel, suite
+from harness.stats import format_table, percentile
+
+DEFAULT_PATH = os.environ.get("TODO_TIMINGS", os.path.join(suite.ROOT, ".test_timings.json"))
+DEFAULT_DURATION = 0.05
+WHOLE_MODULE_DIRS = ("Todos_tests",)
+# Weight of the newest sample in the moving average
+SMOOTHING = 0.5
+
+
+class TimingHistory:
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        self.durations = {}
+        self.runs = {}
+
+    def load(self):
+        if os.path.exists(self.path):
+            with open(self.path) as f:
+                tests = json.load(f).get("tests", {})
+            self.durations = {test_id: entry["duration"] for test_id, entry in tests.items()}
+            self.runs = {test_id: entry["runs"] for test_id, entry in tests.items()}
+        return self
+
+    def save(self):
+        tests = {test_id: {"duration": round(duration, 6), "runs": self.runs.get(test_id, 1)}
+                 for test_id, duration in sorted(self.durations.items())}
+        with open(self.path, "w") as f:
+            json.dump({"tests": tests}, f, indent=1)
+
+    def record(self, test_id, duration):
+        previous = self.durations.get(test_id)
+        if previous is None:
+            self.durations[test_id] = duration
+        else:
+            self.durations[test_id] = previous + SMOOTHING * (duration - previous)
+        self.runs[test_id] = self.runs.get(test_id, 0) + 1
+
+    def update(self, results):
+        for result in results:
+            self.record(result.test_id, result.duration)
+
+    def default_estimate(self):
+        known = sorted(self.durations.values())
+        return percentile(known, 50) if known else DEFAULT_DURATION
+
+    def estimate(self, test_id, default=None):
+        duration = self.durations.get(test_id)
+        if duration is not None:
+            return duration
+        return self.default_estimate() if default is None else default
+
+
+def plan(test_ids, workers, history, by_module=False):
+    """Split test_ids into at most `workers` shards of similar estimated duration.
+
+    Returns (shards, loads): the test ids of each shard in suite order, and
+    each shard's estimated duration. With by_module=True every module is
+    packed whole, not only those in WHOLE_MODULE_DIRS.
+    """
+    order = {test_id: index for index, test_id in enumerate(test_ids)}
+    default = history.default_estimate()
+    units = {}
+    for test_id in test_ids:
+        path = test_id.split("::")[0]
+        key = path if by_module or path.split("/")[0] in WHOLE_MODULE_DIRS else test_id
+        units.setdefault(key, []).append(test_id)
+    costs = [(sum(history.estimate(test_id, default) for test_id in unit), unit) for unit in units.values()]
+    costs.sort(key=lambda item: -item[0])
+
+    bins = [(0.0, index) for index in range(max(1, workers))]
+    shards = [[] for _ in bins]
+    loads = [0.0 for _ in bins]
+    for cost, unit in costs:
+        load, index = heapq.heappop(bins)
+        shards[index].extend(unit)
+        loads[index] = load + cost
+        heapq.heappush(bins, (loads[index], index))
+
+    packed = [(sorted(shard, key=order.get), load) for shard, load in zip(shards, loads) if shard]
+    return [shard for shard, _ in packed], [load for _, load in packed]
+
+
+def format_plan(shards, loads):
+    rows = [[f"worker {index}", len(shard), f"{load:.2f}"]
+            for index, (shard, load) in enumerate(zip(shards, loads))]
+    return format_table(["shard", "tests", "estimated s"], rows)
+
+
+def run_scheduled(paths=None, workers=None, urls=(), history=None, by_module=False):
+    """Plan, run and record one scheduled run; returns (results, shards, loads)."""
+    history = history or TimingHistory().load()
+    test_ids = suite.discover_tests(paths)
+    shards, loads = plan(test_ids, workers or os.cpu_count() or 1, history, by_module)
+    results = parallel.run_batches(shards, len(shards), urls, pinned=True)
+    history.update(results)
+    history.save()
+    return results, shards, loads
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the tests on workers balanced by past durations")
+    parser.add_argument("modules", nargs="*", help="module paths or directories (default: every test module)")
+    parser.add_argument("-n", "--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--url", action="append", default=[], dest="urls",
+                        help="server URL for one worker (repeat once per worker)")
+    parser.add_argument("--by-module", action="store_true", help="keep each module on one worker")
+    parser.add_argument("--plan", action="store_true", help="only print the shards, do not run")
+    parser.add_argument("--timings", default=DEFAULT_PATH, help="timing history file")
+    args = parser.parse_args(argv)
+    try:
+        args.modules = suite.module_paths(args.modules)
+    except ValueError as e:
+        parser.error(str(e))
+
+    history = TimingHistory(args.timings).load()
+    if args.plan:
+        shards, loads = plan(suite.discover_tests(args.modules), args.workers, history, args.by_module)
+        print(format_plan(shards, loads))
+        return 0
+
+    start = time.perf_counter()
+    try:
+        results, shards, loads = run_scheduled(args.modules, args.workers, args.urls, history, args.by_module)
+    except parallel.IsolationError as e:
+        print(f"Cannot run in parallel: {e}")
+        return 2
+    suite.print_results(results)
+    suite.print_summary(results)
+    print(latency.report())
+    print(format_plan(shards, loads))
+    print(f"Wall time: {time.perf_counter() - start:.2f}s on {len(shards)} workers "
+          f"(estimated longest shard {max(loads, default=0):.2f}s)")
+    return 0 if all(result.passed for result in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,161 @@
+"""Concurrent bulk creation of projects, todos and categories.
+
+Instead of one create_project() round trip at a time, seed() sends every
+create over a pool of concurrent keep-alive connections:
+
+1. the projects;
+2. the todos, each created directly as a task of project i % P through
+   POST /projects/:id/tasks (one request creates and links it), and the
+   categories, each created under project j % P the same way;
+3. optionally, category j is also linked to todo j % T.
+
+The created ids come back as integer arrays, so seeding 10k+ entities stays
+small in memory and takes seconds. When a create fails partway, everything
+created so far is deleted again before SeedError is raised; the error's
+created attribute lists those (kind, id) pairs.
+
+    python -m harness.seeding --projects 1000 --todos 10000 --categories 100
+"""
+import argparse
+import sys
+import time
+from array import array
+
+from harness import aio, client, endpoints, teardown
+
+
+class SeedError(AssertionError):
+    def __init__(self, message, created=()):
+        super().__init__(message)
+        self.created = list(created)
+
+
+class SeedResult:
+    """Ids created by seed(); task i of task_projects belongs to todo i of todos."""
+
+    __slots__ = ("projects", "todos", "categories", "task_projects", "category_projects", "category_todos")
+
+    def __init__(self):
+        self.projects = array("q")
+        self.todos = array("q")
+        self.categories = array("q")
+        self.task_projects = array("q")
+        self.category_projects = array("q")
+        self.category_todos = array("q")
+
+    def __len__(self):
+        return len(self.projects) + len(self.todos) + len(self.categories)
+
+    def __repr__(self):
+        return (f"SeedResult({len(self.projects)} projects, {len(self.todos)} todos, "
+                f"{len(self.categories)} categories)")
+
+
+def _send(url, requests, expected, concurrency, kinds=None):
+    """Send the requests concurrently; a failure raises SeedError with the entities request i of kinds[i] created."""
+    responses = aio.run_requests(url, requests, concurrency)
+    error = None
+    for (method, path, _), response in zip(requests, responses):
+        if isinstance(response, Exception):
+            error = f"{method} {path} failed: {response}"
+            break
+        if response.status not in expected:
+            error = f"{method} {path} returned {response.status}, expected {expected}"
+            break
+    if error is not None:
+        created = [(kind, int(response.json()["id"]))
+                   for kind, response in zip(kinds or (), responses)
+                   if kind is not None and not isinstance(response, Exception) and response.status == 201]
+        raise SeedError(error, created)
+    return responses
+
+
+def _delete_created(url, error, created, concurrency):
+    """Delete what a failed seeding created and re-raise its error with all of it listed."""
+    registry = teardown.TeardownRegistry(url, concurrency)
+    created = list(created) + error.created
+    for kind, entity_id in created:
+        registry.defer(kind, entity_id)
+    registry.finish()
+    raise SeedError(str(error), created) from error
+
+
+def _created_ids(responses):
+    return array("q", (int(response.json()["id"]) for response in responses))
+
+
+def create_all(kind, payloads, url=None, concurrency=aio.DEFAULT_CONCURRENCY):
+    """Create one entity of a kind per payload concurrently; returns their ids in order."""
+    url = (url or client.API_URL).rstrip("/")
+    requests = [("POST", f"/{kind}", payload) for payload in payloads]
+    try:
+        return _created_ids(_send(url, requests, (201,), concurrency, [kind] * len(requests)))
+    except SeedError as e:
+        _delete_created(url, e, (), concurrency)
+
+
+def seed(projects=0, todos=0, categories=0, link_categories_to_todos=False, url=None,
+         concurrency=aio.DEFAULT_CONCURRENCY, prefix="Seed"):
+    """Create the entities concurrently and return a SeedResult with their ids."""
+    url = (url or client.API_URL).rstrip("/")
+    result = SeedResult()
+    try:
+        _seed(result, projects, todos, categories, link_categories_to_todos, url, concurrency, prefix)
+    except SeedError as e:
+        created = ([("projects", entity_id) for entity_id in result.projects]
+                   + [("todos", entity_id) for entity_id in result.todos]
+                   + [("categories", entity_id) for entity_id in result.categories])
+        _delete_created(url, e, created, concurrency)
+    return result
+
+
+def _seed(result, projects, todos, categories, link_categories_to_todos, url, concurrency, prefix):
+    project_requests = [("POST", "/projects", endpoints.project_payload(f"{prefix} Project {i}"))
+                        for i in range(projects)]
+    result.projects = _created_ids(_send(url, project_requests, (201,), concurrency, ["projects"] * projects))
+
+    owner = result.projects
+    todo_requests = []
+    for i in range(todos):
+        body = endpoints.todo_payload(f"{prefix} Todo {i}")
+        todo_requests.append(("POST", f"/projects/{owner[i % len(owner)]}/tasks", body) if owner
+                             else ("POST", "/todos", body))
+    category_requests = []
+    for j in range(categories):
+        body = endpoints.category_payload(f"{prefix} Category {j}")
+        category_requests.append(("POST", f"/projects/{owner[j % len(owner)]}/categories", body) if owner
+                                 else ("POST", "/categories", body))
+    responses = _send(url, todo_requests + category_requests, (201,), concurrency,
+                      ["todos"] * todos + ["categories"] * categories)
+    result.todos = _created_ids(responses[:todos])
+    result.categories = _created_ids(responses[todos:])
+    if owner:
+        result.task_projects = array("q", (owner[i % len(owner)] for i in range(todos)))
+        result.category_projects = array("q", (owner[j % len(owner)] for j in range(categories)))
+
+    if link_categories_to_todos and result.todos:
+        link_requests = [("POST", f"/todos/{result.todos[j % todos]}/categories", {"id": str(category_id)})
+                         for j, category_id in enumerate(result.categories)]
+        _send(url, link_requests, (200, 201), concurrency)
+        result.category_todos = array("q", (result.todos[j % todos] for j in range(categories)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk-create todo manager entities")
+    parser.add_argument("--projects", type=int, default=0)
+    parser.add_argument("--todos", type=int, default=0)
+    parser.add_argument("--categories", type=int, default=0)
+    parser.add_argument("--link-categories-to-todos", action="store_true")
+    parser.add_argument("-c", "--concurrency", type=int, default=aio.DEFAULT_CONCURRENCY)
+    parser.add_argument("--url", default=client.API_URL)
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    result = seed(args.projects, args.todos, args.categories, args.link_categories_to_todos,
+                  args.url, args.concurrency)
+    print(f"Created {result!r} in {time.perf_counter() - start:.2f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,317 @@
+"""Snapshot of the server's entity graph and differential restore.
+
+capture() reads every project, todo and category once, with their links
+(tasks/tasksof, categories, todos, projects), and from then on every write
+sent through harness.client or harness.aio is tracked: the entities it
+created, and the entities whose fields or links it may have changed. restore() brings the
+server back to the snapshot without restarting it, looking only at what
+the tracked writes touched:
+
+1. entities created since the snapshot are deleted, and the touched
+   snapshot entities are read back, in one concurrent batch;
+2. snapshot entities that were deleted are created again;
+3. changed fields are amended (POST /<kind>/<id> with the snapshot fields)
+   and missing links are added back, extra ones removed.
+
+A restore after a test that changed nothing sends no request at all, and a
+test that created one project costs one DELETE. The API assigns ids on
+creation, so an entity deleted and created again comes back under a new id;
+the snapshot follows it, so later restores compare against the new id.
+Writes sent some other way (another process) are not tracked:
+restore(full=True) reads the whole graph and diffs all of it.
+
+With TODO_RESTORE=test (or module) the pytest session restores the
+snapshot after every test (or module), so each one starts from the
+server's initial data. Tests that rely on an earlier test's changes, like
+test_delete_categories_1_fail, then fail.
+
+    TODO_RESTORE=test python -m pytest Projects_tests
+    python -m harness.runner --restore module
+"""
+import json
+import threading
+import time
+from urllib.parse import urlsplit
+
+from harness import aio
+from harness.endpoints import COLLECTIONS
+
+DEFAULT_CONCURRENCY = 32
+
+# (entity type, relationship) -> target entity type
+RELATIONSHIPS = {
+    ("todos", "tasksof"): "projects",
+    ("todos", "categories"): "categories",
+    ("projects", "tasks"): "todos",
+    ("projects", "categories"): "categories",
+    ("categories", "todos"): "todos",
+    ("categories", "projects"): "projects",
+}
+# A todo's tasksof link is the same link as its project's tasks link
+MIRRORED = {("todos", "tasksof"): "tasks"}
+BOOLEAN_FIELDS = ("doneStatus", "completed", "active")
+READ_ONLY = ("GET", "HEAD", "OPTIONS")
+
+
+class SnapshotError(AssertionError):
+    pass
+
+
+def _link(kind, entity_id, rel, target_id):
+    """Canonical (kind, id, rel, target id) of a link, the same whichever end it is seen from."""
+    if (kind, rel) in MIRRORED:
+        return (RELATIONSHIPS[(kind, rel)], target_id, MIRRORED[(kind, rel)], entity_id)
+    return (kind, entity_id, rel, target_id)
+
+
+def _ends(link):
+    kind, entity_id, rel, target_id = link
+    return (kind, entity_id), (RELATIONSHIPS[(kind, rel)], target_id)
+
+
+def parse(kind, body):
+    """(key, fields, links) of an entity as the server renders it."""
+    key = (kind, body["id"])
+    fields = {name: value for name, value in body.items()
+              if name != "id" and (kind, name) not in RELATIONSHIPS}
+    links = {_link(kind, body["id"], rel, item["id"])
+             for (owner, rel) in RELATIONSHIPS if owner == kind
+             for item in body.get(rel, [])}
+    return key, fields, links
+
+
+def payload(fields):
+    """Request body that sets the rendered fields again (booleans are rendered as strings)."""
+    return {name: value == "true" if name in BOOLEAN_FIELDS else value for name, value in fields.items()}
+
+
+class ChangeTracker:
+    """Keys of the entities created or touched by the writes sent since the last drain()."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.touched = set()
+
+    def observe(self, method, url, body, status, content):
+        if method in READ_ONLY or status >= 400:
+            return
+        parts = [part for part in urlsplit(url).path.split("/") if part]
+        if not parts or parts[0] not in COLLECTIONS:
+            return
+        keys = []
+        if len(parts) == 1:
+            created = _created_id(content)
+            if created is not None:
+                keys.append((parts[0], created))
+        else:
+            keys.append((parts[0], parts[1]))
+            target_kind = RELATIONSHIPS.get((parts[0], parts[2])) if len(parts) > 2 else None
+            if target_kind is not None:
+                target_id = parts[3] if len(parts) > 3 else _created_id(content)
+                if target_id is None and isinstance(body, dict):
+                    target_id = body.get("id")
+                if target_id is not None:
+                    keys.append((target_kind, str(target_id)))
+        with self._lock:
+            self.touched.update(keys)
+
+    def drain(self):
+        with self._lock:
+            touched, self.touched = self.touched, set()
+        return touched
+
+
+def _created_id(content):
+    try:
+        return json.loads(content)["id"]
+    except (ValueError, TypeError, KeyError):
+        return None
+
+
+class RestoreResult:
+    __slots__ = ("deleted", "recreated", "amended", "linked", "unlinked", "requests", "elapsed")
+
+    def __init__(self):
+        self.deleted = 0
+        self.recreated = 0
+        self.amended = 0
+        self.linked = 0
+        self.unlinked = 0
+        self.requests = 0
+        self.elapsed = 0.0
+
+    def add(self, other):
+        for name in self.__slots__:
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+
+    def __str__(self):
+        return (f"{self.deleted} deleted, {self.recreated} recreated, {self.amended} amended, "
+                f"{self.linked} links added, {self.unlinked} removed in {self.requests} requests")
+
+
+class Snapshot:
+    def __init__(self, url, entities, links, concurrency=DEFAULT_CONCURRENCY):
+        self.url = url.rstrip("/")
+        self.concurrency = concurrency
+        self.entities = entities
+        # Entity key -> the canonical links it is an end of
+        self.links = {}
+        for link in links:
+            self._index(link)
+
+    @classmethod
+    def capture(cls, url, concurrency=DEFAULT_CONCURRENCY):
+        entities, links = {}, set()
+        for kind, response in zip(COLLECTIONS, _send(url, [("GET", f"/{kind}", None) for kind in COLLECTIONS],
+                                                     concurrency)):
+            for body in response.json().get(kind, []):
+                key, fields, entity_links = parse(kind, body)
+                entities[key] = fields
+                links |= entity_links
+        return cls(url, entities, links, concurrency)
+
+    def _index(self, link):
+        for end in _ends(link):
+            self.links.setdefault(end, set()).add(link)
+
+    def _rekey(self, old, new):
+        self.entities[new] = self.entities.pop(old)
+        for link in self.links.pop(old, set()):
+            for end in _ends(link):
+                if end != old:
+                    self.links[end].discard(link)
+            self._index(_replace(link, old, new))
+
+    def _read_all(self):
+        state = {}
+        responses = _send(self.url, [("GET", f"/{kind}", None) for kind in COLLECTIONS], self.concurrency)
+        for kind, response in zip(COLLECTIONS, responses):
+            for body in response.json().get(kind, []):
+                key, fields, links = parse(kind, body)
+                state[key] = (fields, links)
+        return state
+
+    def restore(self, touched=(), full=False):
+        """Undo the changes to the touched entities (to every entity with full=True)."""
+        result = RestoreResult()
+        start = time.perf_counter()
+        if full:
+            state = self._read_all()
+            result.requests += len(COLLECTIONS)
+            extra = [key for key in state if key not in self.entities]
+            current = {key: state.get(key) for key in self.entities}
+            result.requests += self._check(self._send_all([("DELETE", f"/{kind}/{entity_id}", None)
+                                                           for kind, entity_id in extra]))
+        else:
+            extra = [key for key in touched if key not in self.entities]
+            dirty = [key for key in touched if key in self.entities]
+            requests = ([("DELETE", f"/{kind}/{entity_id}", None) for kind, entity_id in extra]
+                        + [("GET", f"/{kind}/{entity_id}", None) for kind, entity_id in dirty])
+            responses = self._send_all(requests)
+            result.requests += self._check(responses[:len(extra)])
+            current = {}
+            for key, response in zip(dirty, responses[len(extra):]):
+                if response.status == 404:
+                    current[key] = None
+                else:
+                    _, fields, links = parse(key[0], response.json()[key[0]][0])
+                    current[key] = (fields, links)
+            result.requests += len(dirty)
+        result.deleted = len(extra)
+        extra = set(extra)
+
+        missing = [key for key, state in current.items() if state is None]
+        recreating = set(missing)
+        wanted, found = set(), set()
+        for key, state in current.items():
+            wanted |= self.links.get(key, set())
+            if state is not None:
+                found |= state[1]
+        # A link is only seen from its owner's side unless it is mirrored, so only
+        # links whose owner was read (or whose target is recreated) can be missing
+        add = {link for link in wanted - found
+               if _ends(link)[0] in current or _ends(link)[1] in recreating}
+        remove = {link for link in found - wanted if not extra.intersection(_ends(link))}
+
+        # Deleted snapshot entities come back under new ids
+        creates = [("POST", f"/{kind}", payload(self.entities[(kind, entity_id)])) for kind, entity_id in missing]
+        responses = self._send_all(creates)
+        self._check(responses, (201,))
+        for old, response in zip(missing, responses):
+            new = (old[0], response.json()["id"])
+            add = {_replace(link, old, new) for link in add}
+            self._rekey(old, new)
+        result.recreated = len(missing)
+        result.requests += len(missing)
+
+        fixes = [("POST", f"/{kind}/{entity_id}", payload(self.entities[(kind, entity_id)]))
+                 for (kind, entity_id), state in current.items()
+                 if state is not None and state[0] != self.entities[(kind, entity_id)]]
+        result.amended = len(fixes)
+        fixes += [("POST", f"/{kind}/{entity_id}/{rel}", {"id": target_id})
+                  for kind, entity_id, rel, target_id in sorted(add)]
+        fixes += [("DELETE", f"/{kind}/{entity_id}/{rel}/{target_id}", None)
+                  for kind, entity_id, rel, target_id in sorted(remove)]
+        result.linked, result.unlinked = len(add), len(remove)
+        result.requests += self._check(self._send_all(fixes), (200, 201, 404))
+        result.elapsed = time.perf_counter() - start
+        return result
+
+    def _send_all(self, requests):
+        return _send(self.url, requests, self.concurrency)
+
+    def _check(self, responses, expected=(200, 204, 404)):
+        failures = [str(response) if isinstance(response, Exception) else f"status {response.status}"
+                    for response in responses
+                    if isinstance(response, Exception) or response.status not in expected]
+        if failures:
+            raise SnapshotError(f"Restore failed for {len(failures)} requests (first: {failures[0]})")
+        return len(responses)
+
+
+def _replace(link, old, new):
+    first, second = _ends(link)
+    kind, entity_id, rel, target_id = link
+    return (kind, new[1] if first == old else entity_id, rel, new[1] if second == old else target_id)
+
+
+def _send(url, requests, concurrency):
+    # The restore's own writes are not changes to undo
+    responses = aio.run_requests(url, requests, concurrency, track=False)
+    for (method, path, _), response in zip(requests, responses):
+        if method == "GET" and (isinstance(response, Exception) or response.status not in (200, 404)):
+            raise SnapshotError(f"GET {path}: {response if isinstance(response, Exception) else response.status}")
+    return responses
+
+
+current = None
+tracker = None
+totals = RestoreResult()
+restores = 0
+
+
+def capture(url, concurrency=DEFAULT_CONCURRENCY):
+    """Take the snapshot and start tracking the writes sent through harness.client and harness.aio."""
+    global current, tracker
+    current = Snapshot.capture(url, concurrency)
+    tracker = ChangeTracker()
+    return current
+
+
+def restore(full=False):
+    """Restore the captured snapshot; returns the RestoreResult (None without a snapshot)."""
+    global restores
+    if current is None:
+        return None
+    result = current.restore(tracker.drain(), full)
+    totals.add(result)
+    restores += 1
+    return result
+
+
+def report():
+    if current is None:
+        return None
+    average = totals.elapsed / restores * 1000 if restores else 0.0
+    return (f"Snapshot: {len(current.entities)} entities, {restores} restores ({totals}), "
+            f"{average:.2f}ms per restore")
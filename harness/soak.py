@@ -0,0 +1,355 @@
+"""Soak test: cycle the Projects flows for hours and watch the server age.
+
+Each client coroutine repeats the create/read/update/delete cycle of the
+Projects tests on its own keep-alive connection: create a project, read it,
+amend and replace it, add a task and a category through the relationship
+routes, list them, unlink them, delete the todo, the category and the
+project, and check the project is gone. Every cycle deletes what it created,
+so the server's data stays the same size and any growth is the server's. A
+cycle that fails part-way leaves its entities to a teardown registry, which
+deletes them in the background at the next sample and at the end.
+
+Every --interval the soak samples the server process's resident memory and
+the latency of the requests sent since the last sample. At the end, once a
+warm-up (the first tenth of the run by default) is discarded, it compares
+the first and last quarter of the samples:
+
+- memory growth: the median RSS of the last quarter is more than
+  --max-memory-growth above the first quarter's (default 10%);
+- latency drift: the median p50 latency rose by more than
+  --max-latency-drift (default 25%) and at least --min-drift-ms.
+
+Either one, or any unexpected status, fails the run. The server process is
+the one lifecycle launched from TODO_SERVER_JAR, or the one listening on the
+URL's port (found through /proc), or --pid. With TODO_SERVER=stub the
+stand-in runs in this process, so its RSS includes the soak's own.
+
+    python -m harness.soak -d 4h --interval 60
+    TODO_SERVER=stub python -m harness.soak -d 2m --interval 5 -c 8 --output soak.json
+"""
+import argparse
+import asyncio
+import glob
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+from urllib.parse import urlsplit
+
+from harness import client, endpoints, lifecycle, teardown
+from harness.aio import AsyncConnection
+from harness.stats import format_table, summarize
+
+DEFAULT_INTERVAL = 60.0
+UNITS = {"s": 1, "m": 60, "h": 3600}
+
+
+def parse_duration(text):
+    """Seconds in "90", "90s", "30m" or "4h"."""
+    match = re.fullmatch(r"\s*([\d.]+)\s*([smh]?)\s*", text)
+    if not match:
+        raise argparse.ArgumentTypeError(f"invalid duration: {text!r}")
+    return float(match.group(1)) * UNITS[match.group(2) or "s"]
+
+
+def format_elapsed(seconds):
+    hours, rest = divmod(int(seconds), 3600)
+    minutes, seconds = divmod(rest, 60)
+    return f"{hours}h{minutes:02d}m{seconds:02d}s" if hours else f"{minutes}m{seconds:02d}s"
+
+
+def rss_bytes(pid):
+    """Resident set size of a process, or None if it cannot be read."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        output = subprocess.run(["ps", "-o", "rss=", "-p", str(pid)], capture_output=True, text=True).stdout
+    except OSError:
+        return None
+    return int(output.strip()) * 1024 if output.strip() else None
+
+
+def listening_pid(port):
+    """Pid of the local process listening on a TCP port (Linux /proc only)."""
+    inodes = set()
+    for table in ("/proc/net/tcp", "/proc/net/tcp6"):
+        try:
+            with open(table) as f:
+                next(f)
+                for line in f:
+                    fields = line.split()
+                    if int(fields[1].rsplit(":", 1)[1], 16) == port and fields[3] == "0A":
+                        inodes.add(f"socket:[{fields[9]}]")
+        except OSError:
+            continue
+    for fd in glob.glob("/proc/[0-9]*/fd/*"):
+        try:
+            if os.readlink(fd) in inodes:
+                return int(fd.split("/")[2])
+        except OSError:
+            continue
+    return None
+
+
+def server_pid(url, manager=None):
+    if manager is not None and manager.process is not None:
+        return manager.process.pid
+    if client.stub is not None and url == client.stub.url:
+        return os.getpid()
+    return listening_pid(urlsplit(url).port or 80)
+
+
+class Sample:
+    __slots__ = ("elapsed", "rss", "requests", "errors", "p50", "p95", "p99")
+
+    def __init__(self, elapsed, rss, requests, errors, p50, p95, p99):
+        self.elapsed = elapsed
+        self.rss = rss
+        self.requests = requests
+        self.errors = errors
+        self.p50 = p50
+        self.p95 = p95
+        self.p99 = p99
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __str__(self):
+        rss = f"{self.rss / 2 ** 20:8.1f} MB" if self.rss is not None else "       - MB"
+        return (f"{format_elapsed(self.elapsed):>10}  rss {rss}  {self.requests:7d} requests  "
+                f"p50 {self.p50 * 1000:6.2f}ms  p95 {self.p95 * 1000:6.2f}ms  p99 {self.p99 * 1000:6.2f}ms  "
+                f"errors {self.errors}")
+
+
+class SoakRecorder:
+    """Latencies since the last sample, and the samples taken so far."""
+
+    def __init__(self, pid):
+        self.pid = pid
+        self.latencies = []
+        self.errors = 0
+        self.failures = {}
+        self.cycles = 0
+        self.samples = []
+
+    def record(self, seconds):
+        self.latencies.append(seconds)
+
+    def record_error(self, message):
+        self.errors += 1
+        self.failures[message] = self.failures.get(message, 0) + 1
+
+    def sample(self, elapsed):
+        summary = summarize(self.latencies)
+        sample = Sample(elapsed, rss_bytes(self.pid) if self.pid else None, summary["count"], self.errors,
+                        summary["p50"], summary["p95"], summary["p99"])
+        self.latencies = []
+        self.errors = 0
+        self.samples.append(sample)
+        return sample
+
+
+class CycleError(Exception):
+    pass
+
+
+async def _call(connection, recorder, method, path, body=None, expected=200):
+    start = time.perf_counter()
+    status, content = await connection.request(method, path, body)
+    recorder.record(time.perf_counter() - start)
+    if status != expected:
+        raise CycleError(f"{method} {endpoints.route_template(path)}: expected {expected}, got {status}")
+    return json.loads(content) if content else None
+
+
+async def cycle(connection, recorder, cleanup):
+    """One pass through the Projects create/read/update/delete flows.
+
+    If it fails part-way, whatever it created so far is deferred to cleanup.
+    """
+    created = []
+    try:
+        project = await _call(connection, recorder, "POST", "/projects",
+                              endpoints.project_payload("Soak Project"), 201)
+        created.append(("projects", project["id"]))
+        path = f"/projects/{project['id']}"
+        await _call(connection, recorder, "GET", path)
+        await _call(connection, recorder, "POST", path, {"title": "Modified Project Title"})
+        await _call(connection, recorder, "PUT", path,
+                    endpoints.project_payload("Updated Project", "Updated description"))
+        todo = await _call(connection, recorder, "POST", path + "/tasks", endpoints.task_payload(), 201)
+        created.append(("todos", todo["id"]))
+        category = await _call(connection, recorder, "POST", path + "/categories", endpoints.category_payload(), 201)
+        created.append(("categories", category["id"]))
+        await _call(connection, recorder, "GET", path + "/tasks")
+        await _call(connection, recorder, "GET", path + "/categories")
+        await _call(connection, recorder, "DELETE", f"{path}/tasks/{todo['id']}")
+        await _call(connection, recorder, "DELETE", f"{path}/categories/{category['id']}")
+        await _call(connection, recorder, "DELETE", f"/todos/{todo['id']}")
+        await _call(connection, recorder, "DELETE", f"/categories/{category['id']}")
+        await _call(connection, recorder, "DELETE", path)
+        await _call(connection, recorder, "GET", path, expected=404)
+    except BaseException:
+        # Also on a timeout (the cycle is cancelled); a 404 for what was already deleted counts as done
+        for kind, entity_id in created:
+            cleanup.defer(kind, entity_id)
+        raise
+    recorder.cycles += 1
+
+
+async def _client(host, port, recorder, cleanup, deadline, timeout):
+    connection = AsyncConnection(host, port)
+    try:
+        while time.perf_counter() < deadline:
+            try:
+                await asyncio.wait_for(cycle(connection, recorder, cleanup), timeout)
+            except CycleError as e:
+                recorder.record_error(str(e))
+            except (OSError, ConnectionError, asyncio.IncompleteReadError, asyncio.TimeoutError, ValueError) as e:
+                recorder.record_error(type(e).__name__)
+                await connection.close()
+    finally:
+        await connection.close()
+
+
+async def _sampler(recorder, cleanup, start, deadline, interval, quiet):
+    while True:
+        now = time.perf_counter()
+        await asyncio.sleep(max(min(start + interval * (len(recorder.samples) + 1), deadline) - now, 0))
+        sample = recorder.sample(time.perf_counter() - start)
+        cleanup.flush()
+        if not quiet:
+            print(sample, flush=True)
+        if time.perf_counter() >= deadline:
+            return
+
+
+async def run_soak(url, duration, interval=DEFAULT_INTERVAL, concurrency=4, pid=None, timeout=client.DEFAULT_TIMEOUT,
+                   quiet=False):
+    """Cycle the flows on `concurrency` connections for `duration` seconds; returns the SoakRecorder."""
+    parts = urlsplit(url)
+    recorder = SoakRecorder(pid)
+    cleanup = teardown.TeardownRegistry(url)
+    start = time.perf_counter()
+    deadline = start + duration
+    try:
+        await asyncio.gather(
+            _sampler(recorder, cleanup, start, deadline, interval, quiet),
+            *[_client(parts.hostname, parts.port or 80, recorder, cleanup, deadline, timeout)
+              for _ in range(concurrency)],
+        )
+    finally:
+        cleanup.finish()
+    return recorder
+
+
+def slope_per_hour(samples, value):
+    """Least-squares slope of value(sample) over time, per hour."""
+    points = [(sample.elapsed, value(sample)) for sample in samples if value(sample) is not None]
+    if len(points) < 2:
+        return 0.0
+    mean_x = statistics.fmean(x for x, _ in points)
+    mean_y = statistics.fmean(y for _, y in points)
+    spread = sum((x - mean_x) ** 2 for x, _ in points)
+    if not spread:
+        return 0.0
+    return sum((x - mean_x) * (y - mean_y) for x, y in points) / spread * 3600
+
+
+def first_and_last(samples, value):
+    """Median of value over the first and the last quarter of the samples."""
+    values = [value(sample) for sample in samples if value(sample) is not None]
+    if len(values) < 2:
+        return None, None
+    window = max(1, len(values) // 4)
+    return statistics.median(values[:window]), statistics.median(values[-window:])
+
+
+def verdict(samples, warmup, max_memory_growth=0.10, max_latency_drift=0.25, min_drift=0.0005):
+    """Problems found in the samples taken after the warm-up, as a list of messages."""
+    steady = [sample for sample in samples if sample.elapsed > warmup and sample.requests]
+    problems = []
+    first, last = first_and_last(steady, lambda sample: sample.rss)
+    if first and last / first - 1 > max_memory_growth:
+        growth = slope_per_hour(steady, lambda sample: sample.rss) / 2 ** 20
+        problems.append(f"memory grew {last / first - 1:.0%} ({first / 2 ** 20:.1f} MB -> {last / 2 ** 20:.1f} MB, "
+                        f"{growth:+.1f} MB/h)")
+    first, last = first_and_last(steady, lambda sample: sample.p50)
+    if first and last / first - 1 > max_latency_drift and last - first >= min_drift:
+        problems.append(f"p50 latency drifted {last / first - 1:.0%} ({first * 1000:.2f}ms -> {last * 1000:.2f}ms)")
+    return problems
+
+
+def format_summary(recorder, warmup):
+    steady = [sample for sample in recorder.samples if sample.elapsed > warmup and sample.requests]
+    rows = []
+    for name, value, scale, unit in (("rss", lambda sample: sample.rss, 2 ** -20, "MB"),
+                                     ("p50", lambda sample: sample.p50, 1000, "ms"),
+                                     ("p95", lambda sample: sample.p95, 1000, "ms")):
+        first, last = first_and_last(steady, value)
+        if first is None:
+            rows.append([name, "-", "-", "-"])
+            continue
+        rows.append([name, f"{first * scale:.2f} {unit}", f"{last * scale:.2f} {unit}",
+                     f"{slope_per_hour(steady, value) * scale:+.2f} {unit}/h"])
+    return format_table(["metric", "first quarter", "last quarter", "trend"], rows)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Soak the server with the Projects flows and track its memory and latency")
+    parser.add_argument("-d", "--duration", type=parse_duration, default=parse_duration("1h"),
+                        help="how long to run: 90s, 30m, 4h (default 1h)")
+    parser.add_argument("--interval", type=parse_duration, default=DEFAULT_INTERVAL,
+                        help="seconds between samples (default 60)")
+    parser.add_argument("--warmup", type=parse_duration, default=None,
+                        help="samples ignored at the start (default: a tenth of the duration)")
+    parser.add_argument("-c", "--concurrency", type=int, default=4, help="clients cycling at once")
+    parser.add_argument("--max-memory-growth", type=float, default=0.10, help="allowed RSS growth (fraction)")
+    parser.add_argument("--max-latency-drift", type=float, default=0.25, help="allowed p50 increase (fraction)")
+    parser.add_argument("--min-drift-ms", type=float, default=0.5, help="ignore p50 increases smaller than this")
+    parser.add_argument("--pid", type=int, default=None, help="server process to sample (default: found from the URL)")
+    parser.add_argument("--output", default="", help="write the samples to this JSON file")
+    parser.add_argument("--url", default=client.API_URL)
+    parser.add_argument("-q", "--quiet", action="store_true", help="do not print each sample")
+    args = parser.parse_args(argv)
+
+    url = args.url.rstrip("/")
+    manager = lifecycle.session_server() if url == client.API_URL else lifecycle.ServerManager(url).start()
+    pid = args.pid or server_pid(url, manager)
+    warmup = args.warmup if args.warmup is not None else args.duration / 10
+    print(f"Soaking {url} for {format_elapsed(args.duration)} with {args.concurrency} clients, "
+          f"sampling every {args.interval:g}s" + (f", server pid {pid}" if pid else ", server memory not sampled"))
+
+    recorder = asyncio.run(run_soak(url, args.duration, args.interval, args.concurrency, pid, quiet=args.quiet))
+    problems = verdict(recorder.samples, warmup, args.max_memory_growth, args.max_latency_drift,
+                       args.min_drift_ms / 1000)
+    errors = sum(sample.errors for sample in recorder.samples)
+    if errors:
+        first = max(recorder.failures.items(), key=lambda item: item[1])
+        problems.append(f"{errors} failed cycles (most common: {first[0]}, {first[1]}x)")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"url": url, "pid": pid, "warmup": warmup, "cycles": recorder.cycles,
+                       "samples": [sample.to_dict() for sample in recorder.samples]}, f, indent=1)
+
+    print()
+    print(format_summary(recorder, warmup))
+    print(f"\n{recorder.cycles} cycles, {sum(sample.requests for sample in recorder.samples)} requests "
+          f"in {format_elapsed(args.duration)} (warm-up {format_elapsed(warmup)} ignored)")
+    for problem in problems:
+        print(f"FAILED: {problem}")
+    if not problems:
+        print("No memory growth or latency drift")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,561 @@
+"""Model-based stateful testing of the entity graph.
+
+Each test checks one request against a freshly created entity. This tool
+runs long random sequences of operations (create, amend, replace and delete
+projects, todos and categories; add and remove tasks, tasksof and
+categories links; read entities and link lists) and checks every response
+against an in-memory model of the graph as the API should have left it:
+
+- creates answer 201 and echo the payload; updates answer 200 with the
+  model's fields after the update, and 404 for an id that does not exist;
+- deletes answer 200 or 404 and take the entity's links with them;
+- link adds answer 201, also from the todo side of tasks/tasksof, and 404
+  for a missing parent; adding an unknown id creates the target from the
+  empty payload, so it answers 400 for todos and categories (title is
+  mandatory) and creates a new project for tasksof;
+- link removes answer 200 if the model has the link, 404 otherwise;
+- reads show exactly the model's fields and links.
+
+The model is kept small so that runs of 100k+ steps stay fast: one slotted
+record per entity, holding only its fields, in dicts keyed by integer id,
+and each relationship as a pair of integer-keyed indexes (owner -> targets,
+target -> owners). The tasks and tasksof sides share one index. Payloads
+come from the harness.endpoints helpers the tests use.
+
+Several sequences run at once, each on its own connection over its own
+entities, so their models are independent. A sequence stops at its first
+divergence from the model and reports the request, the answer, what the
+model expected and the steps that led there; --seed and the step number
+reproduce it. At the end every live entity is read back once more, and all
+of them are deleted.
+
+    python -m harness.stateful --steps 100000
+    TODO_SERVER=stub python -m harness.stateful --steps 20000 -w 4 --seed 7
+"""
+import argparse
+import asyncio
+import collections
+import json
+import random
+import sys
+import time
+from urllib.parse import urlsplit
+
+from harness import aio, client, endpoints, lifecycle, teardown
+from harness.endpoints import FIELDS
+from harness.stats import format_table
+
+HISTORY = 12
+MISSING_SHARE = 0.08
+
+# (entity type, relationship) -> (index name, True when seen from the target's side)
+LINKS = {
+    ("projects", "tasks"): ("tasks", False),
+    ("todos", "tasksof"): ("tasks", True),
+    ("projects", "categories"): ("project_categories", False),
+    ("todos", "categories"): ("todo_categories", False),
+}
+# Index name -> (owner type, target type)
+INDEXES = {
+    "tasks": ("projects", "todos"),
+    "project_categories": ("projects", "categories"),
+    "todo_categories": ("todos", "categories"),
+}
+
+
+class Record:
+    """Fields of one entity, as the model holds them (booleans as bools)."""
+
+    __slots__ = ()
+    kind = None
+
+    def __init__(self, fields=None):
+        for name, (field_type, _) in FIELDS[self.kind].items():
+            setattr(self, name, False if field_type == "boolean" else "")
+        if fields:
+            self.update(fields)
+
+    def update(self, fields, replace=False):
+        if replace:
+            Record.__init__(self)
+        for name, value in fields.items():
+            setattr(self, name, value)
+
+    def copy(self):
+        return type(self)(self.fields())
+
+    def fields(self):
+        return {name: getattr(self, name) for name in FIELDS[self.kind]}
+
+    def render(self):
+        return {name: ("true" if value else "false") if isinstance(value, bool) else value
+                for name, value in self.fields().items()}
+
+
+class Project(Record):
+    __slots__ = tuple(FIELDS["projects"])
+    kind = "projects"
+
+
+class Todo(Record):
+    __slots__ = tuple(FIELDS["todos"])
+    kind = "todos"
+
+
+class Category(Record):
+    __slots__ = tuple(FIELDS["categories"])
+    kind = "categories"
+
+
+RECORDS = {"projects": Project, "todos": Todo, "categories": Category}
+
+
+class IdPool:
+    """Integer ids with O(1) add, remove and random choice."""
+
+    __slots__ = ("ids", "positions")
+
+    def __init__(self):
+        self.ids = []
+        self.positions = {}
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, entity_id):
+        return entity_id in self.positions
+
+    def add(self, entity_id):
+        self.positions[entity_id] = len(self.ids)
+        self.ids.append(entity_id)
+
+    def remove(self, entity_id):
+        position = self.positions.pop(entity_id)
+        last = self.ids.pop()
+        if last != entity_id:
+            self.ids[position] = last
+            self.positions[last] = position
+
+    def choice(self, rng):
+        return self.ids[rng.randrange(len(self.ids))]
+
+
+class LinkIndex:
+    """One relationship: owner id -> target ids and target id -> owner ids; empty sets are dropped."""
+
+    __slots__ = ("forward", "backward")
+
+    def __init__(self):
+        self.forward = {}
+        self.backward = {}
+
+    @staticmethod
+    def _add(index, key, value):
+        index.setdefault(key, set()).add(value)
+
+    @staticmethod
+    def _discard(index, key, value):
+        values = index.get(key)
+        if values is not None:
+            values.discard(value)
+            if not values:
+                del index[key]
+
+    def add(self, owner, target):
+        self._add(self.forward, owner, target)
+        self._add(self.backward, target, owner)
+
+    def remove(self, owner, target):
+        self._discard(self.forward, owner, target)
+        self._discard(self.backward, target, owner)
+
+    def drop(self, entity_id, as_target):
+        """Remove every link of an entity on one side of the relationship."""
+        index, other = (self.backward, self.forward) if as_target else (self.forward, self.backward)
+        for linked in index.pop(entity_id, ()):
+            self._discard(other, linked, entity_id)
+
+    def __len__(self):
+        return sum(len(targets) for targets in self.forward.values())
+
+
+class Model:
+    """The entity graph one sequence should have left on the server."""
+
+    def __init__(self):
+        self.records = {kind: {} for kind in RECORDS}
+        self.pools = {kind: IdPool() for kind in RECORDS}
+        self.deleted = {kind: collections.deque(maxlen=64) for kind in RECORDS}
+        self.indexes = {name: LinkIndex() for name in INDEXES}
+
+    def exists(self, kind, entity_id):
+        return entity_id in self.records[kind]
+
+    def create(self, kind, entity_id, record):
+        self.records[kind][entity_id] = record
+        self.pools[kind].add(entity_id)
+
+    def delete(self, kind, entity_id):
+        del self.records[kind][entity_id]
+        self.pools[kind].remove(entity_id)
+        self.deleted[kind].append(entity_id)
+        for name, (owner, target) in INDEXES.items():
+            if owner == kind:
+                self.indexes[name].drop(entity_id, as_target=False)
+            if target == kind:
+                self.indexes[name].drop(entity_id, as_target=True)
+
+    def _index(self, kind, rel):
+        name, reverse = LINKS[(kind, rel)]
+        return self.indexes[name], reverse
+
+    def linked(self, kind, entity_id, rel):
+        index, reverse = self._index(kind, rel)
+        return (index.backward if reverse else index.forward).get(entity_id, ())
+
+    def link(self, kind, entity_id, rel, target_id):
+        index, reverse = self._index(kind, rel)
+        index.add(*((target_id, entity_id) if reverse else (entity_id, target_id)))
+
+    def unlink(self, kind, entity_id, rel, target_id):
+        index, reverse = self._index(kind, rel)
+        index.remove(*((target_id, entity_id) if reverse else (entity_id, target_id)))
+
+    def target_kind(self, kind, rel):
+        name, reverse = LINKS[(kind, rel)]
+        return INDEXES[name][0 if reverse else 1]
+
+    def pick(self, rng, kind, missing_share=MISSING_SHARE):
+        """A live id of the kind, or now and then one that was deleted (or never existed)."""
+        pool = self.pools[kind]
+        if not pool or rng.random() < missing_share:
+            deleted = self.deleted[kind]
+            return deleted[rng.randrange(len(deleted))] if deleted else 999999999
+        return pool.choice(rng)
+
+    def entities(self):
+        return sum(len(records) for records in self.records.values())
+
+    def links(self):
+        return sum(len(index) for index in self.indexes.values())
+
+    def footprint(self):
+        """Approximate bytes held by the model."""
+        size = 0
+        for kind, records in self.records.items():
+            size += sys.getsizeof(records) + sys.getsizeof(self.pools[kind].ids)
+            size += sys.getsizeof(self.pools[kind].positions)
+            size += sum(sys.getsizeof(record) for record in records.values())
+        for index in self.indexes.values():
+            for side in (index.forward, index.backward):
+                size += sys.getsizeof(side) + sum(sys.getsizeof(values) for values in side.values())
+        return size
+
+    def diff(self, kind, entity_id, document):
+        """What differs between an entity the server rendered and the model, or None."""
+        expected = self.records[kind][entity_id].render()
+        for name, value in expected.items():
+            if document.get(name) != value:
+                return f"{name}: expected {value!r:.60}, got {document.get(name)!r:.60}"
+        for (owner, rel) in LINKS:
+            if owner != kind:
+                continue
+            shown = {int(item["id"]) for item in document.get(rel, [])}
+            wanted = set(self.linked(kind, entity_id, rel))
+            if shown != wanted:
+                return f"{rel}: expected {sorted(wanted)}, got {sorted(shown)}"
+        return None
+
+
+class Divergence(AssertionError):
+    pass
+
+
+class Step:
+    __slots__ = ("number", "method", "path", "body", "status")
+
+    def __init__(self, number, method, path, body, status=None):
+        self.number = number
+        self.method = method
+        self.path = path
+        self.body = body
+        self.status = status
+
+    def __str__(self):
+        body = f" {json.dumps(self.body)}" if self.body is not None else ""
+        return f"#{self.number} {self.method} {self.path}{body} -> {self.status}"
+
+
+def _document(content):
+    try:
+        return json.loads(content) if content else None
+    except ValueError:
+        return None
+
+
+class Sequence:
+    """One random operation sequence checked against its own model."""
+
+    def __init__(self, connection, seed, population=30):
+        self.connection = connection
+        self.rng = random.Random(seed)
+        self.seed = seed
+        self.population = population
+        self.model = Model()
+        self.steps = 0
+        self.counts = collections.Counter()
+        self.recent = collections.deque(maxlen=HISTORY)
+        self.divergence = None
+        self.names = 0
+
+    async def send(self, action, method, path, body=None):
+        self.steps += 1
+        self.counts[action] += 1
+        step = Step(self.steps, method, path, body)
+        self.recent.append(step)
+        step.status, content = await self.connection.request(method, path, body)
+        return step.status, content
+
+    def expect(self, condition, message):
+        if not condition:
+            raise Divergence(message)
+
+    def expect_status(self, status, expected):
+        self.expect(status in expected, f"expected status {'/'.join(map(str, expected))}, got {status}")
+
+    def payload(self, kind, partial=False):
+        self.names += 1
+        rng = self.rng
+        title = f"Stateful {kind} {self.seed}.{self.names}"
+        description = rng.choice(("", "Description of new todo", f"Step {self.steps}", "B" * rng.randint(1, 300)))
+        body = {"projects": endpoints.project_payload, "todos": endpoints.todo_payload,
+                "categories": endpoints.category_payload}[kind](title, description)
+        for name, (field_type, _) in FIELDS[kind].items():
+            if field_type == "boolean" and rng.random() < 0.5:
+                body[name] = rng.random() < 0.5
+        if partial:
+            body = {name: value for name, value in body.items() if rng.random() < 0.5}
+        return body
+
+    # Operations
+
+    async def create(self, kind):
+        body = self.payload(kind)
+        status, content = await self.send("create", "POST", f"/{kind}", body)
+        self.expect_status(status, (201,))
+        document = _document(content)
+        self.expect(isinstance(document, dict) and "id" in document, f"no entity in {content[:80]!r}")
+        entity_id = int(document["id"])
+        self.expect(not self.model.exists(kind, entity_id), f"id {entity_id} handed out twice")
+        self.model.create(kind, entity_id, RECORDS[kind](body))
+        self.expect_entity(kind, entity_id, document)
+
+    async def update(self, kind, replace):
+        entity_id = self.model.pick(self.rng, kind)
+        body = self.payload(kind, partial=not replace)
+        status, content = await self.send("replace" if replace else "amend", "PUT" if replace else "POST",
+                                          f"/{kind}/{entity_id}", body)
+        if not self.model.exists(kind, entity_id):
+            return self.expect_status(status, (404,))
+        self.expect_status(status, (200,))
+        self.model.records[kind][entity_id].update(body, replace)
+        self.expect_entity(kind, entity_id, _document(content))
+
+    async def delete(self, kind):
+        entity_id = self.model.pick(self.rng, kind)
+        status, _ = await self.send("delete", "DELETE", f"/{kind}/{entity_id}")
+        if not self.model.exists(kind, entity_id):
+            return self.expect_status(status, (404,))
+        self.expect_status(status, (200,))
+        self.model.delete(kind, entity_id)
+
+    async def link(self, kind, rel):
+        model = self.model
+        target_kind = model.target_kind(kind, rel)
+        entity_id = model.pick(self.rng, kind, MISSING_SHARE / 2)
+        target_id = model.pick(self.rng, target_kind, 2 * MISSING_SHARE)
+        status, content = await self.send("link", "POST", f"/{kind}/{entity_id}/{rel}", {"id": str(target_id)})
+        if not model.exists(kind, entity_id):
+            return self.expect_status(status, (404,))
+        if model.exists(target_kind, target_id):
+            self.expect_status(status, (201,))
+            return model.link(kind, entity_id, rel, target_id)
+        if FIELDS[target_kind]["title"][1]:
+            # The unknown id falls back to creating the target from an empty payload
+            return self.expect_status(status, (400,))
+        self.expect_status(status, (201,))
+        document = _document(content)
+        self.expect(isinstance(document, dict) and "id" in document, f"no entity in {content[:80]!r}")
+        created = int(document["id"])
+        self.expect(not model.exists(target_kind, created), f"id {created} handed out twice")
+        model.create(target_kind, created, RECORDS[target_kind]())
+        model.link(kind, entity_id, rel, created)
+        self.expect_entity(target_kind, created, document)
+
+    async def unlink(self, kind, rel):
+        model = self.model
+        entity_id = model.pick(self.rng, kind)
+        linked = model.linked(kind, entity_id, rel)
+        if linked and self.rng.random() < 0.8:
+            target_id = self.rng.choice(tuple(linked))
+        else:
+            target_id = model.pick(self.rng, model.target_kind(kind, rel))
+        status, _ = await self.send("unlink", "DELETE", f"/{kind}/{entity_id}/{rel}/{target_id}")
+        if target_id not in linked:
+            return self.expect_status(status, (404,))
+        self.expect_status(status, (200,))
+        model.unlink(kind, entity_id, rel, target_id)
+
+    async def read(self, kind):
+        entity_id = self.model.pick(self.rng, kind)
+        status, content = await self.send("read", "GET", f"/{kind}/{entity_id}")
+        if not self.model.exists(kind, entity_id):
+            return self.expect_status(status, (404,))
+        self.expect_status(status, (200,))
+        document = _document(content)
+        self.expect(isinstance(document, dict) and len(document.get(kind, ())) == 1,
+                    f"expected one {kind} entity, got {content[:80]!r}")
+        self.expect_entity(kind, entity_id, document[kind][0])
+
+    async def read_links(self, kind, rel):
+        model = self.model
+        entity_id = model.pick(self.rng, kind)
+        status, content = await self.send("read links", "GET", f"/{kind}/{entity_id}/{rel}")
+        if not model.exists(kind, entity_id):
+            # The server answers 200 with an empty list for a missing parent
+            self.expect_status(status, (200, 404))
+            shown, wanted = set(), set()
+        else:
+            self.expect_status(status, (200,))
+            shown = {int(item["id"]) for item in (_document(content) or {}).get(model.target_kind(kind, rel), [])}
+            wanted = set(model.linked(kind, entity_id, rel))
+        self.expect(shown == wanted or status == 404, f"{rel}: expected {sorted(wanted)}, got {sorted(shown)}")
+
+    def expect_entity(self, kind, entity_id, document):
+        self.expect(isinstance(document, dict), f"no entity in the response for {kind}/{entity_id}")
+        problem = self.model.diff(kind, entity_id, document)
+        self.expect(problem is None, f"{kind}/{entity_id}: {problem}")
+
+    def next_operation(self):
+        rng = self.rng
+        kind = rng.choice(tuple(RECORDS))
+        size = len(self.model.pools[kind])
+        if size < 3:
+            return self.create(kind)
+        grow = size < self.population
+        rel = rng.choice([rel for (owner, rel) in LINKS if owner == kind] or [None])
+        operations = [
+            (2 if grow else 0.5, lambda: self.create(kind)),
+            (1.0, lambda: self.update(kind, replace=False)),
+            (0.5, lambda: self.update(kind, replace=True)),
+            (0.5 if grow else 2, lambda: self.delete(kind)),
+            (1.5, lambda: self.read(kind)),
+        ]
+        if rel is not None:
+            operations += [(3, lambda: self.link(kind, rel)), (2, lambda: self.unlink(kind, rel)),
+                           (1, lambda: self.read_links(kind, rel))]
+        weights, makers = zip(*operations)
+        return rng.choices(makers, weights)[0]()
+
+    async def run(self, steps, timeout):
+        while self.steps < steps:
+            try:
+                await asyncio.wait_for(self.next_operation(), timeout)
+            except Divergence as e:
+                self.divergence = str(e)
+                return
+            except (OSError, ConnectionError, asyncio.IncompleteReadError, asyncio.TimeoutError, ValueError) as e:
+                self.divergence = f"no answer: {e or type(e).__name__}"
+                return
+
+
+async def run_sequences(url, workers, steps, seed=0, population=30, timeout=client.DEFAULT_TIMEOUT):
+    parts = urlsplit(url)
+    sequences = [Sequence(aio.AsyncConnection(parts.hostname, parts.port or 80), seed * 1000 + worker, population)
+                 for worker in range(workers)]
+    share = -(-steps // workers)
+    try:
+        await asyncio.gather(*[sequence.run(share, timeout) for sequence in sequences])
+    finally:
+        for sequence in sequences:
+            await sequence.connection.close()
+    return sequences
+
+
+def final_check(url, sequences, concurrency):
+    """Read every live entity of the sequences that did not diverge; returns (checked, problems)."""
+    reads = [(sequence, kind, entity_id) for sequence in sequences if sequence.divergence is None
+             for kind, records in sequence.model.records.items() for entity_id in records]
+    responses = aio.run_requests(url, [("GET", f"/{kind}/{entity_id}", None) for _, kind, entity_id in reads],
+                                 concurrency)
+    problems = []
+    for (sequence, kind, entity_id), response in zip(reads, responses):
+        if isinstance(response, Exception) or response.status != 200:
+            problems.append((sequence, f"final read of {kind}/{entity_id}: {getattr(response, 'status', response)}"))
+            continue
+        entities = (_document(response.content) or {}).get(kind) or [None]
+        problem = sequence.model.diff(kind, entity_id, entities[0]) if isinstance(entities[0], dict) else "no entity"
+        if problem is not None:
+            problems.append((sequence, f"final read of {kind}/{entity_id}: {problem}"))
+    return len(reads), problems
+
+
+def cleanup(url, sequences, concurrency):
+    registry = teardown.TeardownRegistry(url, concurrency)
+    for sequence in sequences:
+        for kind, records in sequence.model.records.items():
+            for entity_id in records:
+                registry.defer(kind, entity_id)
+    registry.finish()
+    return registry
+
+
+def format_counts(sequences, elapsed):
+    totals = collections.Counter()
+    for sequence in sequences:
+        totals.update(sequence.counts)
+    rows = [[action, count, f"{count / elapsed:.0f}"] for action, count in totals.most_common()]
+    return format_table(["operation", "steps", "per s"], rows)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run random operation sequences against a model of the graph")
+    parser.add_argument("--steps", type=int, default=100000, help="steps over all sequences")
+    parser.add_argument("-w", "--workers", type=int, default=8, help="independent sequences run at once")
+    parser.add_argument("--population", type=int, default=30, help="entities of each type a sequence aims to keep")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-c", "--concurrency", type=int, default=aio.DEFAULT_CONCURRENCY,
+                        help="connections for the final read and the cleanup")
+    parser.add_argument("--url", default=client.API_URL)
+    args = parser.parse_args(argv)
+
+    url = args.url.rstrip("/")
+    if url == client.API_URL:
+        lifecycle.session_server()
+    start = time.perf_counter()
+    sequences = asyncio.run(run_sequences(url, args.workers, args.steps, args.seed, args.population))
+    elapsed = time.perf_counter() - start
+    try:
+        checked, problems = final_check(url, sequences, args.concurrency)
+    finally:
+        cleanup(url, sequences, args.concurrency)
+
+    print(format_counts(sequences, elapsed))
+    steps = sum(sequence.steps for sequence in sequences)
+    footprint = max(sequence.model.footprint() for sequence in sequences)
+    print(f"\n{steps} steps in {len(sequences)} sequences in {elapsed:.1f}s ({steps / elapsed:.0f}/s); "
+          f"final read of {checked} entities; largest model {footprint / 1024:.0f} KB")
+    diverged = [sequence for sequence in sequences if sequence.divergence is not None]
+    for sequence in diverged:
+        print(f"\nDIVERGED: sequence seed {sequence.seed} at step {sequence.steps}: {sequence.divergence}")
+        for step in sequence.recent:
+            print(f"  {step}")
+    for sequence, problem in problems:
+        print(f"DIVERGED: sequence seed {sequence.seed}: {problem}")
+    if not diverged and not problems:
+        print("Every response matched the model")
+    return 1 if diverged or problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,175 @@
+"""Entity-by-entity decoding of list responses.
+
+response.json() builds the whole {"todos": [...]} document before a test
+can look at the first todo; for a 100k-entity collection that is an 11 MB
+string plus the parsed dicts. The server sends lists chunked (see
+test_head_todos_success), so a response requested with stream=True can be
+decoded as it arrives instead: iter_entities() keeps one chunk of text and
+yields each entity as soon as it is complete, so a check like
+
+    response = client.get(BASE_URL + "?title=Test Todo", stream=True)
+    assert all(todo["title"] == "Test Todo" for todo in streaming.iter_entities(response, "todos"))
+
+runs in constant memory and stops reading at the first mismatch. The
+connection goes back to the pool when the iteration ends; abandoning it
+early closes the connection rather than reading the rest of the body.
+With stream=True the latency recorded for the request covers the response
+headers only; the body is read while iterating.
+
+    python -m harness.streaming /todos
+"""
+import argparse
+import codecs
+import json
+import re
+import sys
+import time
+import tracemalloc
+
+from harness import client
+
+CHUNK_SIZE = 64 * 1024
+WHITESPACE = re.compile(r"[ \t\n\r]*")
+SEPARATOR = re.compile(r"[ \t\n\r]*([,\]])[ \t\n\r]*")
+
+
+class StreamDecodeError(ValueError):
+    pass
+
+
+class _TextStream:
+    """Decoded text of a streamed body, read chunk by chunk; keeps only the unread part."""
+
+    def __init__(self, response, chunk_size):
+        self.chunks = response.iter_content(chunk_size)
+        self.decoder = codecs.getincrementaldecoder("utf-8")()
+        self.text = ""
+        self.position = 0
+        self.finished = False
+
+    def more(self):
+        """Append the next chunk; False at the end of the body."""
+        if self.finished:
+            return False
+        chunk = next(self.chunks, None)
+        if chunk is None:
+            self.finished = True
+            tail = self.decoder.decode(b"", final=True)
+        else:
+            tail = self.decoder.decode(chunk)
+        self.text = self.text[self.position:] + tail
+        self.position = 0
+        return chunk is not None or bool(tail)
+
+    def peek(self):
+        """Next non-whitespace character, or "" at the end of the body."""
+        while True:
+            self.position = WHITESPACE.match(self.text, self.position).end()
+            if self.position < len(self.text):
+                return self.text[self.position]
+            if not self.more():
+                return ""
+
+    def expect(self, characters):
+        found = self.peek()
+        if not found or found not in characters:
+            raise StreamDecodeError(f"Expected one of {characters!r} at offset {self.position}, found {found!r}")
+        self.position += 1
+        return found
+
+    def value(self, scan_once):
+        """Decode the next complete JSON value, reading more chunks until it is complete."""
+        self.peek()
+        while True:
+            try:
+                value, self.position = scan_once(self.text, self.position)
+                return value
+            except (StopIteration, ValueError):
+                if not self.more():
+                    raise StreamDecodeError(f"Truncated or invalid JSON at offset {self.position}") from None
+
+
+def iter_entities(response, kind=None, chunk_size=CHUNK_SIZE):
+    """Yield the entities of a {"<kind>": [...]} response one at a time.
+
+    The response should come from a request with stream=True (a fully read
+    one works too). kind checks the document's key; None accepts any.
+    """
+    scan_once = json.JSONDecoder().scan_once
+    stream = _TextStream(response, chunk_size)
+    try:
+        stream.expect("{")
+        key = stream.value(scan_once)
+        if kind is not None and key != kind:
+            raise StreamDecodeError(f"Expected a {kind!r} list, found {key!r}")
+        stream.expect(":")
+        stream.expect("[")
+        if stream.peek() == "]":
+            return
+        # Hot loop: decode entity after entity from the current text, refilling only at chunk ends
+        text, position = stream.text, stream.position
+        while True:
+            try:
+                entity, position = scan_once(text, position)
+            except (StopIteration, ValueError):
+                stream.position = position
+                if not stream.more():
+                    raise StreamDecodeError(f"Truncated or invalid JSON at offset {position}") from None
+                stream.peek()
+                text, position = stream.text, stream.position
+                continue
+            yield entity
+            separator = SEPARATOR.match(text, position)
+            if separator is None:
+                stream.position = position
+                if stream.expect(",]") == "]":
+                    return
+                stream.peek()
+                text, position = stream.text, stream.position
+            elif separator.group(1) == "]":
+                return
+            else:
+                position = separator.end()
+    finally:
+        response.close()
+
+
+def get_entities(url, kind=None, **kwargs):
+    """GET a list with stream=True and yield its entities; asserts a 200 first."""
+    response = client.get(url, stream=True, **kwargs)
+    if response.status_code != 200:
+        response.close()
+        raise AssertionError(f"GET {url} returned {response.status_code}")
+    return iter_entities(response, kind)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare response.json() with streamed decoding of a list")
+    parser.add_argument("route", help="list route, e.g. /todos or /projects?active=false")
+    parser.add_argument("--url", default=client.API_URL)
+    args = parser.parse_args(argv)
+
+    url = args.url.rstrip("/") + args.route
+    parts = args.route.split("?")[0].strip("/").split("/")
+    kind = parts[0] if len(parts) == 1 else None
+    decoders = {
+        "json": lambda: len(next(iter(client.get(url).json().values()))),
+        "stream": lambda: sum(1 for _ in get_entities(url, kind)),
+    }
+    rows = []
+    for mode, decode in decoders.items():
+        start = time.perf_counter()
+        count = decode()
+        elapsed = time.perf_counter() - start
+        # Peak memory from a second, traced run: tracing slows the first one down
+        tracemalloc.start()
+        decode()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        rows.append(f"{mode:>6}: {count} entities in {elapsed * 1000:.1f}ms, peak {peak / 2 ** 20:.1f} MB")
+    print("\n".join(rows))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,471 @@
+"""In-memory stand-in for the thingifier todo manager.
+
+Implements the /todos, /projects and /categories resources plus their
+relationship endpoints (/tasks, /tasksof, /categories, /todos, /projects) with
+the status codes and response shapes the test modules assert, including the
+quirks of the real server (200 with empty lists for missing parents, empty
+DELETE bodies, chunked list responses). It starts in a few milliseconds, so
+most of the suite can run on machines without a JVM.
+
+Select it for a test run with TODO_SERVER=stub, or run it standalone in place
+of the jar:
+
+    python -m harness.stub_server --port 4567
+    python -m harness.stub_server --port 4567 --instances 4   # 4567..4570
+"""
+import argparse
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+# Field name -> (type, mandatory, default) for every entity type
+SCHEMAS = {
+    "todos": {
+        "title": ("string", True, ""),
+        "doneStatus": ("boolean", False, False),
+        "description": ("string", False, ""),
+    },
+    "projects": {
+        "title": ("string", False, ""),
+        "completed": ("boolean", False, False),
+        "active": ("boolean", False, False),
+        "description": ("string", False, ""),
+    },
+    "categories": {
+        "title": ("string", True, ""),
+        "description": ("string", False, ""),
+    },
+}
+
+# (entity type, relationship) -> (target type, reverse relationship or None)
+RELATIONSHIPS = {
+    ("todos", "tasksof"): ("projects", "tasks"),
+    ("todos", "categories"): ("categories", None),
+    ("projects", "tasks"): ("todos", "tasksof"),
+    ("projects", "categories"): ("categories", None),
+    ("categories", "todos"): ("todos", None),
+    ("categories", "projects"): ("projects", None),
+}
+
+CHUNK_SIZE = 8192
+
+
+class ValidationError(Exception):
+    pass
+
+
+class TodoStore:
+    """Entity graph held by the stand-in server, guarded by a single lock."""
+
+    def __init__(self, seed=True):
+        self.lock = threading.RLock()
+        self.entities = {kind: {} for kind in SCHEMAS}
+        self.next_ids = {kind: 1 for kind in SCHEMAS}
+        if seed:
+            self.seed()
+
+    def seed(self):
+        """Load the same default data the thingifier jar starts with."""
+        self.create("todos", {"title": "scan paperwork"})
+        self.create("todos", {"title": "file paperwork"})
+        self.create("projects", {"title": "Office Work"})
+        self.create("categories", {"title": "Office"})
+        self.create("categories", {"title": "Home"})
+        self.link("projects", "1", "tasks", "1")
+        self.link("projects", "1", "tasks", "2")
+        self.link("todos", "1", "categories", "1")
+
+    def relationships_of(self, kind):
+        return [rel for (owner, rel) in RELATIONSHIPS if owner == kind]
+
+    def validate(self, kind, data, creating):
+        if not isinstance(data, dict):
+            raise ValidationError("Invalid payload: expected a JSON object")
+        schema = SCHEMAS[kind]
+        fields = {}
+        for name, value in data.items():
+            if name == "id":
+                continue
+            if name not in schema:
+                raise ValidationError(f"Could not find field: {name}")
+            field_type = schema[name][0]
+            if field_type == "boolean":
+                if not isinstance(value, bool):
+                    raise ValidationError(f"Failed Validation: {name} should be BOOLEAN")
+            elif isinstance(value, (dict, list)) or value is None:
+                raise ValidationError(f"Failed Validation: {name} should be STRING")
+            else:
+                value = str(value)
+            fields[name] = value
+        for name, (_, mandatory, _) in schema.items():
+            if mandatory and (creating or name in fields) and not fields.get(name):
+                raise ValidationError(f"Failed Validation: {name} : field is mandatory")
+        return fields
+
+    def create(self, kind, data):
+        if isinstance(data, dict) and "id" in data:
+            raise ValidationError("Invalid Creation: Failed Validation: Not allowed to create with id")
+        fields = self.validate(kind, data, creating=True)
+        with self.lock:
+            entity_id = str(self.next_ids[kind])
+            self.next_ids[kind] += 1
+            record = {name: default for name, (_, _, default) in SCHEMAS[kind].items()}
+            record.update(fields)
+            record["id"] = entity_id
+            for rel in self.relationships_of(kind):
+                record[rel] = []
+            self.entities[kind][entity_id] = record
+            return record
+
+    def get(self, kind, entity_id):
+        return self.entities[kind].get(entity_id)
+
+    def update(self, kind, entity_id, data, replace=False):
+        fields = self.validate(kind, data, creating=replace)
+        with self.lock:
+            record = self.entities[kind].get(entity_id)
+            if record is None:
+                return None
+            if replace:
+                for name, (_, _, default) in SCHEMAS[kind].items():
+                    record[name] = default
+            record.update(fields)
+            return record
+
+    def delete(self, kind, entity_id):
+        with self.lock:
+            record = self.entities[kind].pop(entity_id, None)
+            if record is None:
+                return False
+            # Drop every link that points at the deleted entity
+            for (owner, rel), (target, _) in RELATIONSHIPS.items():
+                if target != kind:
+                    continue
+                for other in self.entities[owner].values():
+                    if entity_id in other[rel]:
+                        other[rel].remove(entity_id)
+            return True
+
+    def link(self, kind, entity_id, rel, target_id):
+        target_kind, reverse = RELATIONSHIPS[(kind, rel)]
+        with self.lock:
+            record = self.entities[kind][entity_id]
+            if target_id not in record[rel]:
+                record[rel].append(target_id)
+            if reverse is not None:
+                target = self.entities[target_kind][target_id]
+                if entity_id not in target[reverse]:
+                    target[reverse].append(entity_id)
+
+    def unlink(self, kind, entity_id, rel, target_id):
+        target_kind, reverse = RELATIONSHIPS[(kind, rel)]
+        with self.lock:
+            record = self.entities[kind].get(entity_id)
+            if record is None or target_id not in record[rel]:
+                return False
+            record[rel].remove(target_id)
+            target = self.entities[target_kind].get(target_id)
+            if reverse is not None and target is not None and entity_id in target[reverse]:
+                target[reverse].remove(entity_id)
+            return True
+
+    def related(self, kind, entity_id, rel):
+        target_kind, _ = RELATIONSHIPS[(kind, rel)]
+        record = self.entities[kind].get(entity_id)
+        if record is None:
+            return []
+        return [self.entities[target_kind][target_id] for target_id in record[rel]
+                if target_id in self.entities[target_kind]]
+
+    def render(self, kind, record):
+        """Entity as the thingifier serialises it: string values, id-only links."""
+        body = {"id": record["id"]}
+        for name in SCHEMAS[kind]:
+            value = record[name]
+            body[name] = ("true" if value else "false") if isinstance(value, bool) else value
+        for rel in self.relationships_of(kind):
+            if record[rel]:
+                body[rel] = [{"id": target_id} for target_id in record[rel]]
+        return body
+
+    def query(self, kind, filters):
+        with self.lock:
+            records = list(self.entities[kind].values())
+            rendered = [self.render(kind, record) for record in records]
+        known = {name: value for name, value in filters.items()
+                 if name == "id" or name in SCHEMAS[kind]}
+        return [body for body in rendered
+                if all(body.get(name) == value for name, value in known.items())]
+
+
+class StubRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "TodoStub/1.0"
+    # Buffer each response and send it in one write; handle_one_request flushes
+    wbufsize = -1
+    disable_nagle_algorithm = True
+
+    started = None
+
+    def log_message(self, format, *args):
+        pass
+
+    @property
+    def store(self):
+        return self.server.store
+
+    # Response helpers
+
+    def send_empty(self, status, headers=None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def send_json(self, status, body, chunked=False):
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        if chunked:
+            self.send_header("Transfer-Encoding", "chunked")
+        else:
+            self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        if self.command == "HEAD":
+            return
+        if not chunked:
+            self.wfile.write(payload)
+            return
+        for start in range(0, len(payload), CHUNK_SIZE):
+            chunk = payload[start:start + CHUNK_SIZE]
+            self.wfile.write(f"{len(chunk):x}\r\n".encode("ascii") + chunk + b"\r\n")
+        self.wfile.write(b"0\r\n\r\n")
+
+    def end_headers(self):
+        # Time spent handling the request, read by harness.profiling
+        if self.started is not None:
+            self.send_header("Server-Timing", f"app;dur={(time.perf_counter() - self.started) * 1000:.3f}")
+        super().end_headers()
+
+    def send_error_messages(self, status, message):
+        self.send_json(status, {"errorMessages": [message]})
+
+    def not_allowed(self, allowed):
+        self.send_empty(405, {"Allow": allowed})
+
+    def read_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length) if length else b""
+        if not raw.strip():
+            return {}
+        return json.loads(raw)
+
+    # Dispatch
+
+    def do_GET(self):
+        self.dispatch()
+
+    def do_HEAD(self):
+        self.dispatch()
+
+    def do_POST(self):
+        self.dispatch()
+
+    def do_PUT(self):
+        self.dispatch()
+
+    def do_PATCH(self):
+        self.dispatch()
+
+    def do_DELETE(self):
+        self.dispatch()
+
+    def do_OPTIONS(self):
+        self.dispatch()
+
+    def dispatch(self):
+        self.started = time.perf_counter()
+        url = urlsplit(self.path)
+        parts = [part for part in url.path.split("/") if part]
+        method = self.command
+        # Always consume the request body so the connection stays usable
+        try:
+            body = self.read_body() if method in ("POST", "PUT", "PATCH", "DELETE") else {}
+        except ValueError:
+            body = None
+
+        if not parts:
+            if method in ("GET", "HEAD"):
+                return self.send_empty(200, {"Content-Type": "text/html"})
+            return self.send_empty(404)
+        if parts == ["shutdown"]:
+            self.send_empty(200)
+            threading.Thread(target=self.server.shutdown, daemon=True).start()
+            return
+        kind = parts[0]
+        if kind not in SCHEMAS or len(parts) > 4:
+            return self.send_empty(404)
+        if len(parts) > 2 and (kind, parts[2]) not in RELATIONSHIPS:
+            return self.send_empty(404)
+        if body is None:
+            return self.send_error_messages(400, "Invalid JSON payload")
+
+        try:
+            if len(parts) == 1:
+                # ?description= filters on the empty value rather than being ignored
+                filters = dict(parse_qsl(url.query, keep_blank_values=True))
+                return self.handle_collection(kind, method, body, filters)
+            if len(parts) == 2:
+                return self.handle_instance(kind, parts[1], method, body)
+            if len(parts) == 3:
+                return self.handle_relationship(kind, parts[1], parts[2], method, body)
+            return self.handle_link(kind, parts[1], parts[2], parts[3], method)
+        except ValidationError as e:
+            return self.send_error_messages(400, str(e))
+
+    def handle_collection(self, kind, method, body, filters):
+        if method in ("GET", "HEAD"):
+            return self.send_json(200, {kind: self.store.query(kind, filters)}, chunked=True)
+        if method == "POST":
+            record = self.store.create(kind, body)
+            return self.send_json(201, self.store.render(kind, record))
+        if method == "OPTIONS":
+            return self.send_empty(200, {"Allow": "OPTIONS, GET, HEAD, POST"})
+        return self.not_allowed("OPTIONS, GET, HEAD, POST")
+
+    def handle_instance(self, kind, entity_id, method, body):
+        if method == "OPTIONS":
+            return self.send_empty(200, {"Allow": "OPTIONS, GET, HEAD, POST, PUT, DELETE"})
+        if method == "PATCH":
+            return self.not_allowed("OPTIONS, GET, HEAD, POST, PUT, DELETE")
+        if method == "DELETE":
+            if self.store.delete(kind, entity_id):
+                return self.send_empty(200)
+            return self.send_error_messages(404, f"Could not find any instances with {kind}/{entity_id}")
+        if method in ("GET", "HEAD"):
+            record = self.store.get(kind, entity_id)
+            if record is None:
+                return self.send_error_messages(404, f"Could not find an instance with {kind}/{entity_id}")
+            return self.send_json(200, {kind: [self.store.render(kind, record)]}, chunked=True)
+        record = self.store.update(kind, entity_id, body, replace=(method == "PUT"))
+        if record is None:
+            return self.send_error_messages(404, f"No such {kind} entity instance with GUID or ID {entity_id} found")
+        return self.send_json(200, self.store.render(kind, record))
+
+    def handle_relationship(self, kind, entity_id, rel, method, body):
+        target_kind, _ = RELATIONSHIPS[(kind, rel)]
+        if method in ("GET", "HEAD"):
+            related = [self.store.render(target_kind, record)
+                       for record in self.store.related(kind, entity_id, rel)]
+            return self.send_json(200, {target_kind: related}, chunked=True)
+        if method == "OPTIONS":
+            return self.send_empty(200, {"Allow": "OPTIONS, GET, HEAD, POST"})
+        if method != "POST":
+            return self.not_allowed("OPTIONS, GET, HEAD, POST")
+        # The parent can be deleted by another request at any moment (harness.races
+        # does exactly that), so it is checked and linked under the store lock
+        with self.store.lock:
+            parent_exists = self.store.get(kind, entity_id) is not None
+            if parent_exists:
+                created = self.link_or_create(kind, entity_id, rel, target_kind, body)
+        if not parent_exists:
+            return self.send_error_messages(404, f"Could not find parent thing for relationship {kind}/{entity_id}/{rel}")
+        if created is None:
+            return self.send_error_messages(404, "Could not find thing matching value for id")
+        if created is False:
+            return self.send_empty(201)
+        return self.send_json(201, created)
+
+    def link_or_create(self, kind, entity_id, rel, target_kind, body):
+        """Link the target named by body["id"] (False), or create one from body and link it (its rendering).
+
+        Returns None when body["id"] is not a string. Called with the store lock held.
+        """
+        if not isinstance(body, dict):
+            raise ValidationError("Invalid payload: expected a JSON object")
+        target_id = body.get("id")
+        if target_id is not None and not isinstance(target_id, str):
+            return None
+        if target_id is not None and self.store.get(target_kind, target_id) is not None:
+            self.store.link(kind, entity_id, rel, target_id)
+            return False
+        # No existing target: create one from the payload and link it
+        data = {name: value for name, value in body.items() if name != "id"}
+        record = self.store.create(target_kind, data)
+        self.store.link(kind, entity_id, rel, record["id"])
+        return self.store.render(target_kind, record)
+
+    def handle_link(self, kind, entity_id, rel, target_id, method):
+        if method == "OPTIONS":
+            return self.send_empty(200, {"Allow": "OPTIONS, DELETE"})
+        if method in ("PUT", "PATCH"):
+            return self.not_allowed("OPTIONS, DELETE")
+        if method == "DELETE" and self.store.unlink(kind, entity_id, rel, target_id):
+            return self.send_empty(200)
+        return self.send_error_messages(404, f"Could not find any instances with {kind}/{entity_id}/{rel}/{target_id}")
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+    # Large accept backlog so bursts of new connections are not dropped
+    request_queue_size = 1024
+
+    def __init__(self, host="127.0.0.1", port=0, seed=True):
+        super().__init__((host, port), StubRequestHandler)
+        self.store = TodoStore(seed=seed)
+        self.thread = None
+
+    def handle_error(self, request, client_address):
+        # A client that stops reading a streamed list early just closes the connection
+        if not isinstance(sys.exc_info()[1], (BrokenPipeError, ConnectionResetError)):
+            super().handle_error(request, client_address)
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        """Serve from a background daemon thread and return self."""
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+def start(host="127.0.0.1", port=0, seed=True):
+    """Start a stand-in server on a background thread (port 0 picks a free port)."""
+    return StubServer(host, port, seed=seed).start()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="In-memory stand-in todo manager server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=4567)
+    parser.add_argument("--instances", type=int, default=1,
+                        help="independent servers on consecutive ports starting at --port")
+    args = parser.parse_args(argv)
+    # The extra instances serve from background threads, the first one from here
+    for offset in range(1, args.instances):
+        extra = start(args.host, args.port + offset)
+        print(f"Stand-in todo manager listening on {extra.url}")
+    server = StubServer(args.host, args.port)
+    print(f"Stand-in todo manager listening on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""Discovery and execution of the test functions in the test directories (TEST_DIRS).
+
+Tests are addressed by id, "<dir>/<file>.py::<function>", and run one at a
+time without pytest so that the harness runners (parallel workers, the
+scheduler, the order checker) can drive them directly.
+"""
+import contextlib
+import glob
+import importlib.util
+import io
+import os
+import sys
+import time
+import traceback
+
+import pytest
+
+from harness import trace
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TEST_DIRS = ("Projects_tests", "Todos_tests", "Contract_tests")
+MODULE_PATTERNS = ("test_*.py", "tests_*.py")
+
+
+class TestResult:
+    __test__ = False
+    __slots__ = ("test_id", "outcome", "duration", "message", "output")
+
+    def __init__(self, test_id, outcome, duration, message="", output=""):
+        self.test_id = test_id
+        self.outcome = outcome
+        self.duration = duration
+        self.message = message
+        self.output = output
+
+    @property
+    def passed(self):
+        return self.outcome in ("passed", "skipped")
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**data)
+
+
+def discover_modules(root=ROOT):
+    """Paths of every test module, relative to root, including tests_*.py files."""
+    paths = set()
+    for directory in TEST_DIRS:
+        for pattern in MODULE_PATTERNS:
+            for path in glob.glob(os.path.join(root, directory, pattern)):
+                paths.add(os.path.relpath(path, root).replace(os.sep, "/"))
+    return sorted(paths)
+
+
+def module_paths(arguments, root=ROOT):
+    """Module paths, relative to root, named by file or directory arguments (directories are expanded).
+
+    Raises ValueError for an argument that is neither a .py file nor a directory with test modules.
+    """
+    paths = []
+    for argument in arguments:
+        path = os.path.relpath(os.path.abspath(argument), root).replace(os.sep, "/")
+        if os.path.isdir(os.path.join(root, path)):
+            found = [module for module in discover_modules(root) if module.startswith(path.rstrip("/") + "/")]
+            if not found:
+                raise ValueError(f"{argument}: no test modules in this directory")
+            paths.extend(found)
+        elif path.endswith(".py") and os.path.isfile(os.path.join(root, path)):
+            paths.append(path)
+        else:
+            raise ValueError(f"{argument}: not a test module or directory")
+    return list(dict.fromkeys(paths))
+
+
+def load_module(path, root=ROOT):
+    name = os.path.splitext(os.path.basename(path))[0]
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    spec = importlib.util.spec_from_file_location(name, os.path.join(root, path))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    try:
+        spec.loader.exec_module(module)
+    except BaseException:
+        del sys.modules[name]
+        raise
+    return module
+
+
+def test_functions(module):
+    """(name, function) pairs for the module's tests, in definition order."""
+    functions = [
+        (name, value) for name, value in vars(module).items()
+        if name.startswith("test_") and callable(value)
+        and getattr(value, "__module__", None) == module.__name__
+    ]
+    return sorted(functions, key=lambda item: item[1].__code__.co_firstlineno)
+
+
+def module_test_ids(path, root=ROOT):
+    return [f"{path}::{name}" for name, _ in test_functions(load_module(path, root))]
+
+
+def discover_tests(paths=None, root=ROOT):
+    test_ids = []
+    for path in paths or discover_modules(root):
+        test_ids.extend(module_test_ids(path, root))
+    return test_ids
+
+
+def resolve(test_id, root=ROOT):
+    path, name = test_id.split("::")
+    return getattr(load_module(path, root), name)
+
+
+def run_test(test_id, root=ROOT):
+    """Run a single test function and return its TestResult; a module that fails to import is an error."""
+    output = io.StringIO()
+    message = ""
+    start = time.perf_counter()
+    try:
+        func = resolve(test_id, root)
+        with contextlib.redirect_stdout(output), trace.span(test_id):
+            func()
+        outcome = "passed"
+    except pytest.skip.Exception as e:
+        outcome = "skipped"
+        message = str(e)
+    except AssertionError as e:
+        outcome = "failed"
+        message = str(e) or (traceback.extract_tb(e.__traceback__)[-1].line or "AssertionError")
+    except Exception as e:
+        outcome = "error"
+        message = f"{type(e).__name__}: {e}"
+    duration = time.perf_counter() - start
+    return TestResult(test_id, outcome, duration, message, output.getvalue())
+
+
+def run_tests(test_ids, root=ROOT):
+    return [run_test(test_id, root) for test_id in test_ids]
+
+
+def print_results(results):
+    for result in results:
+        line = f"Test {result.test_id}: {result.outcome.upper()}"
+        if result.outcome != "passed" and result.message:
+            line += f" - {result.message.splitlines()[0]}"
+        print(line)
+
+
+def print_summary(results):
+    counts = {}
+    for result in results:
+        counts[result.outcome] = counts.get(result.outcome, 0) + 1
+    print("\nSummary:")
+    print(f"Total tests run: {len(results)}")
+    print(f"Passed: {counts.get('passed', 0)}")
+    print(f"Failed: {counts.get('failed', 0) + counts.get('error', 0)}")
+    if counts.get("skipped"):
+        print(f"Skipped: {counts['skipped']}")
@@ -0,0 +1,134 @@
+"""Deferred, batched and concurrent deletion of entities created by tests.
+
+Tests call defer("projects", project_id) for their cleanup instead of deleting
+inline. Nothing is sent until the scope ends (a pytest module, a module's
+summary run): flush() then hands the whole batch to a background thread,
+which deletes it over concurrent keep-alive connections while the next tests
+already run. finish() waits for every batch at session end, and sweep()
+clears all entities of a kind with bounded concurrency.
+
+A 404 while deleting counts as done: the entity was already gone. When a
+cassette is replayed there is no server, so nothing is deleted.
+"""
+import atexit
+import queue
+import threading
+
+from harness import aio, cassette, client
+
+DEFAULT_CONCURRENCY = 32
+
+
+class TeardownRegistry:
+    def __init__(self, url=None, concurrency=DEFAULT_CONCURRENCY):
+        self.url = (url or client.API_URL).rstrip("/")
+        self.concurrency = concurrency
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._batches = queue.Queue()
+        self._thread = None
+        self.deleted = 0
+        self.batches = 0
+        self.failures = []
+
+    def defer(self, kind, entity_id):
+        """Register an entity for deletion at the end of the current scope."""
+        with self._lock:
+            self._pending[(kind, str(entity_id))] = None
+
+    def pending(self):
+        with self._lock:
+            return list(self._pending)
+
+    def discard(self):
+        """Forget the registrations so far (a snapshot restore deletes those entities itself)."""
+        with self._lock:
+            self._pending = {}
+
+    def flush(self, wait=False):
+        """Delete everything registered so far, in the background unless wait=True."""
+        with self._lock:
+            batch = list(self._pending)
+            self._pending = {}
+        if batch:
+            self._ensure_thread()
+            self._batches.put(batch)
+        if wait:
+            self._batches.join()
+
+    def finish(self):
+        """Flush the remaining registrations and wait until every batch is deleted."""
+        self.flush(wait=True)
+
+    def sweep(self, kind):
+        """Delete every existing entity of a kind concurrently; returns how many were deleted."""
+        response = client.get(f"{self.url}/{kind}")
+        if response.status_code != 200:
+            return 0
+        entities = response.json().get(kind, [])
+        self._delete([(kind, entity["id"]) for entity in entities])
+        return len(entities)
+
+    def report(self):
+        line = f"Teardown: {self.deleted} entities deleted in {self.batches} batches"
+        if self.failures:
+            line += f", {len(self.failures)} failed (first: {self.failures[0]})"
+        return line
+
+    def _ensure_thread(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="teardown", daemon=True)
+                self._thread.start()
+                atexit.register(self.finish)
+
+    def _run(self):
+        while True:
+            batch = self._batches.get()
+            try:
+                self._delete(batch)
+            finally:
+                self._batches.task_done()
+
+    def _delete(self, entities):
+        if cassette.replaying():
+            return  # no server behind a replayed run
+        requests = [("DELETE", f"/{kind}/{entity_id}", None) for kind, entity_id in entities]
+        responses = aio.run_requests(self.url, requests, self.concurrency)
+        failures = []
+        for (_, path, _), response in zip(requests, responses):
+            if isinstance(response, Exception):
+                failures.append(f"DELETE {path}: {response}")
+            elif response.status not in (200, 204, 404):
+                failures.append(f"DELETE {path}: {response.status}")
+        with self._lock:
+            self.deleted += len(requests) - len(failures)
+            self.batches += 1
+            self.failures.extend(failures)
+
+
+registry = TeardownRegistry()
+
+
+def defer(kind, entity_id):
+    registry.defer(kind, entity_id)
+
+
+def discard():
+    registry.discard()
+
+
+def flush(wait=False):
+    registry.flush(wait)
+
+
+def finish():
+    registry.finish()
+
+
+def sweep(kind):
+    return registry.sweep(kind)
+
+
+def report():
+    return registry.report()
@@ -0,0 +1,177 @@
+"""Timeline of the test run in Chrome trace format (chrome://tracing, ui.perfetto.dev).
+
+With TODO_TRACE=trace.json the harness records:
+
+- a span per test (category "test"), from pytest, the runner or the workers;
+- a child span per HTTP request (category "http"), named after the helper
+  that sent it when that is not the test itself, e.g.
+  "create_project: POST /projects" for setup and
+  "delete_project: DELETE /projects/{id}" for cleanup;
+- the background cleanup deletes, on the teardown thread's own track;
+- the harness's waits (trace.sleep: server readiness polling, ...) as "idle"
+  spans;
+- inside a test, every stretch of at least IDLE_GAP_US that no request or
+  wait covers as an "idle" span too, so a test's own time.sleep() or slow
+  client-side work shows up instead of leaving an unexplained gap.
+
+Parallel workers send their events back to the parent, so one file holds
+every process. The file is written at exit.
+
+    TODO_TRACE=trace.json python -m harness.runner
+    TODO_SERVER=stub TODO_TRACE=trace.json python -m harness.parallel -n 4
+"""
+import atexit
+import contextlib
+import json
+import os
+import sys
+import threading
+import time
+
+from harness.endpoints import route_template
+
+HARNESS_DIR = os.path.dirname(os.path.abspath(__file__))
+# Shorter gaps between a test's requests are the client's own bookkeeping
+IDLE_GAP_US = 5000
+
+
+def now():
+    return time.perf_counter_ns() // 1000
+
+
+class Tracer:
+    def __init__(self, path):
+        self.path = path
+        self.events = []
+        self.threads = {}
+        self.current_test = threading.local()
+
+    def _ids(self):
+        thread = threading.current_thread()
+        key = (os.getpid(), thread.ident)
+        if key not in self.threads:
+            self.threads[key] = thread.name
+        return key
+
+    def add(self, name, category, start, end, args=None):
+        pid, tid = self._ids()
+        event = {"name": name, "cat": category, "ph": "X", "ts": start, "dur": max(end - start, 0),
+                 "pid": pid, "tid": tid}
+        if args:
+            event["args"] = args
+        self.events.append(event)
+
+    @contextlib.contextmanager
+    def span(self, name, category="test"):
+        previous = getattr(self.current_test, "name", None)
+        if category == "test":
+            self.current_test.name = name.rsplit("::", 1)[-1]
+        first = len(self.events)
+        start = now()
+        try:
+            yield
+        finally:
+            end = now()
+            if category == "test":
+                self.add_gaps(first, start, end)
+                self.current_test.name = previous
+            self.add(name, category, start, end)
+
+    def add_gaps(self, first, start, end):
+        """Record the parts of start..end on this thread that no event since events[first] covers."""
+        pid, tid = self._ids()
+        children = sorted((event["ts"], event["ts"] + event["dur"]) for event in self.events[first:]
+                          if event["pid"] == pid and event["tid"] == tid)
+        cursor = start
+        for child_start, child_end in children + [(end, end)]:
+            if child_start - cursor >= IDLE_GAP_US:
+                self.add(f"untraced {(child_start - cursor) / 1000:.0f}ms", "idle", cursor, child_start)
+            cursor = max(cursor, child_end)
+
+    def http(self, method, url, start, end, status=None):
+        """Record a request that ran from start to end (microseconds)."""
+        caller = _caller()
+        name = f"{method} {route_template(url)}"
+        if caller and caller != getattr(self.current_test, "name", None):
+            name = f"{caller}: {name}"
+        self.add(name, "http", start, end, {"url": url, "status": status, "caller": caller})
+
+    def extend(self, events, threads):
+        self.events.extend(events)
+        for pid, tid, thread_name in threads:
+            self.threads.setdefault((pid, tid), thread_name)
+
+    def thread_names(self):
+        return [(pid, tid, name) for (pid, tid), name in self.threads.items()]
+
+    def metadata(self):
+        events = []
+        for pid in sorted({pid for pid, _ in self.threads}):
+            label = "runner" if pid == os.getpid() else f"worker {pid}"
+            events.append({"name": "process_name", "ph": "M", "pid": pid, "args": {"name": label}})
+        for (pid, tid), name in self.threads.items():
+            events.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}})
+        return events
+
+    def write(self):
+        if self.path is None:
+            return  # a worker: its events went to the parent
+        with open(self.path, "w") as f:
+            json.dump({"traceEvents": self.metadata() + self.events, "displayTimeUnit": "ms"}, f)
+
+    def report(self):
+        """Share of the HTTP time per calling helper, largest first."""
+        totals = {}
+        for event in self.events:
+            if event["cat"] == "http":
+                caller = event["args"]["caller"] or "?"
+                totals[caller] = totals.get(caller, 0) + event["dur"]
+        total = sum(totals.values()) or 1
+        top = sorted(totals.items(), key=lambda item: -item[1])[:5]
+        shares = ", ".join(f"{caller} {duration / total:.0%}" for caller, duration in top)
+        return f"Trace: {len(self.events)} events written to {self.path}" + (f"; HTTP time by caller: {shares}" if top else "")
+
+
+def _caller():
+    """Name of the innermost calling function outside the harness package."""
+    frame = sys._getframe(1)
+    while frame is not None and os.path.dirname(os.path.abspath(frame.f_code.co_filename)) == HARNESS_DIR:
+        frame = frame.f_back
+    return frame.f_code.co_name if frame is not None else None
+
+
+tracer = None
+
+
+def enable(path):
+    """Start recording into path."""
+    global tracer
+    if tracer is None:
+        tracer = Tracer(path)
+        atexit.register(tracer.write)
+    return tracer
+
+
+def enabled():
+    return tracer is not None
+
+
+def span(name, category="test"):
+    return tracer.span(name, category) if tracer is not None else contextlib.nullcontext()
+
+
+def sleep(seconds):
+    """time.sleep, recorded as an idle span when tracing."""
+    if tracer is None:
+        time.sleep(seconds)
+        return
+    with tracer.span(f"sleep {seconds:g}s", "idle"):
+        time.sleep(seconds)
+
+
+def report():
+    return tracer.report() if tracer is not None else None
+
+
+if os.environ.get("TODO_TRACE"):
+    enable(os.environ["TODO_TRACE"])